@@ -6,6 +6,7 @@ class Product {
   double? mrp;
   int? quantity;
   String? createdDate;
+  int? reorderThreshold; // Low on stock at or below this quantity
 
   Product({
     this.id,
@@ -15,6 +16,7 @@ class Product {
     this.mrp,
     this.quantity,
     this.createdDate,
+    this.reorderThreshold,
   });
 
   Product.fromJson(Map<String, dynamic> json) {
@@ -25,6 +27,7 @@ class Product {
     mrp = json['mrp']?.toDouble();
     quantity = json['quantity'];
     createdDate = json['created_date'];
+    reorderThreshold = json['reorder_threshold'];
   }
 
   Map<String, dynamic> toJson() => {
@@ -35,5 +38,6 @@ class Product {
     'mrp': mrp,
     'quantity': quantity,
     'created_date': createdDate,
+    if (reorderThreshold != null) 'reorder_threshold': reorderThreshold,
   };
 }
@@ -10,6 +10,8 @@ class Transaction {
   String? notes;
   String? productName;
   String? customerNotes; // Customer notes from customers table
+  double? unitPrice; // Price each unit was sold at (sales only)
+  double? lineTotal; // quantity x unitPrice, set by the server
 
   Transaction({
     this.id,
@@ -23,6 +25,8 @@ class Transaction {
     this.notes,
     this.productName,
     this.customerNotes,
+    this.unitPrice,
+    this.lineTotal,
   });
 
   Transaction.fromJson(Map<String, dynamic> json) {
@@ -37,6 +41,8 @@ class Transaction {
     notes = json['notes'];
     productName = json['product_name'];
     customerNotes = json['customer_notes'];
+    unitPrice = json['unit_price']?.toDouble();
+    lineTotal = json['line_total']?.toDouble();
   }
 
   Map<String, dynamic> toJson() => {
@@ -51,5 +57,6 @@ class Transaction {
     'notes': notes,
     'product_name': productName,
     'customer_notes': customerNotes,
+    if (unitPrice != null) 'unit_price': unitPrice,
   };
 }
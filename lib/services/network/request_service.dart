@@ -32,33 +32,65 @@ class RequestClient {
     await prefs.setString('server_url', url);
   }
   
-  // Simple method to get server URL from server itself (if reachable)
+  // UDP discovery: the server answers a broadcast probe with its URL
+  static const int discoveryPort = 48080;
+  static const String _discoveryProbe = 'EOPYSTOCK_DISCOVER';
+
   static Future<bool> findServerAutomatically() async {
     print('🔍 Looking for server...');
-    
-    // Try localhost first (for development)
-    List<String> commonServerIPs = [
-      'http://localhost:8080',
-      'http://127.0.0.1:8080',
-      'http://192.168.1.100:8080',
-      'http://192.168.0.100:8080',
-    ];
-    
-    for (String testUrl in commonServerIPs) {
-      print('🔍 Testing: $testUrl...');
-      if (await _testServerConnection(testUrl)) {
-        print('✅ Found server at: $testUrl');
-        _baseUrl = testUrl;
-        await saveServerUrl(testUrl);
-        return true;
+
+    String? url = await discoverServer();
+    if (url == null) {
+      // Same machine as the server (development, desktop build)
+      for (String testUrl in ['http://localhost:8080', 'http://127.0.0.1:8080']) {
+        if (await _testServerConnection(testUrl)) {
+          url = testUrl;
+          break;
+        }
       }
     }
-    
-    print('❌ Server not found at common addresses');
+
+    if (url != null) {
+      print('✅ Found server at: $url');
+      await saveServerUrl(url);
+      return true;
+    }
+
+    print('❌ No server answered on this network');
     print('💡 Please enter server IP manually in Settings');
     return false;
   }
-  
+
+  /// Broadcasts a discovery probe and returns the URL from the first reply
+  static Future<String?> discoverServer({
+    Duration timeout = const Duration(seconds: 2),
+  }) async {
+    RawDatagramSocket? socket;
+    try {
+      socket = await RawDatagramSocket.bind(InternetAddress.anyIPv4, 0);
+      socket.broadcastEnabled = true;
+      final reply = socket
+          .where((event) => event == RawSocketEvent.read)
+          .map((_) => socket!.receive())
+          .where((datagram) => datagram != null)
+          .first;
+      final probe = utf8.encode(_discoveryProbe);
+      // Datagrams can be lost on busy Wi-Fi, so send the probe a few times
+      for (var attempt = 0; attempt < 3; attempt++) {
+        socket.send(probe, InternetAddress('255.255.255.255'), discoveryPort);
+      }
+      final datagram = await reply.timeout(timeout);
+      final info = json.decode(utf8.decode(datagram!.data));
+      // The sender address is the one this device can actually reach
+      return 'http://${datagram.address.address}:${info['port']}';
+    } catch (e) {
+      print('Server discovery failed: $e');
+      return null;
+    } finally {
+      socket?.close();
+    }
+  }
+
   static Future<String?> _getLocalIP() async {
     try {
       for (var interface in await NetworkInterface.list()) {
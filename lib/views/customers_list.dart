@@ -251,7 +251,7 @@ class _CustomersListPageState extends State<CustomersListPage> {
               child: customer['photo'] != null && customer['photo'].isNotEmpty
                   ? ClipOval(
                       child: Image.network(
-                        '${_inventoryController.baseUrl}/uploads/${customer['photo']}',
+                        '${_inventoryController.baseUrl}/uploads/${customer['photo']}?w=160',
                         width: 48,
                         height: 48,
                         fit: BoxFit.cover,
@@ -445,7 +445,7 @@ class _CustomersListPageState extends State<CustomersListPage> {
                     child: customer['photo'] != null && customer['photo'].isNotEmpty
                         ? ClipOval(
                             child: Image.network(
-                              '${_inventoryController.baseUrl}/uploads/${customer['photo']}',
+                              '${_inventoryController.baseUrl}/uploads/${customer['photo']}?w=160',
                               width: 56,
                               height: 56,
                               fit: BoxFit.cover,
@@ -1261,7 +1261,7 @@ class _FindProductPageState extends State<FindProductPage>
                     ClipRRect(
                       borderRadius: const BorderRadius.vertical(top: Radius.circular(16)),
                       child: Image.network(
-                        '${RequestClient.baseUrl}/uploads/${imagePaths.first}',
+                        '${RequestClient.baseUrl}/uploads/${imagePaths.first}?w=640',
                         height: 200,
                         width: double.infinity,
                         fit: BoxFit.cover,
@@ -1643,6 +1643,7 @@ class _MultiItemSalePageState extends State<MultiItemSalePage> {
           recipientPhone: _selectedCustomer!.phone,
           recipientPhoto: _salePhotosBase64.isNotEmpty ? jsonEncode(_salePhotosBase64) : null,
           notes: finalNotes,
+          unitPrice: item.customPrice ?? item.product.mrp,
         );
 
         await _inventoryController.addTransaction(transaction);
@@ -347,7 +347,7 @@ class _ProductListPageState extends State<ProductListPage> {
                                       ? ClipRRect(
                                           borderRadius: BorderRadius.circular(7),
                                           child: Image.network(
-                                            '${RequestClient.baseUrl}/uploads/${product.imagePath}',
+                                            '${RequestClient.baseUrl}/uploads/${product.imagePath}?w=160',
                                             width: 40,
                                             height: 40,
                                             fit: BoxFit.cover,
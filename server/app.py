@@ -1,48 +1,121 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
-from flask_cors import CORS
+from flask import Flask, request, jsonify, render_template, send_from_directory, send_file, abort, Response
 import sqlite3
 import os
 import json
 from datetime import datetime, timezone, timedelta
-import base64
-from werkzeug.utils import secure_filename
-import io
-
-# Try to import PIL, fallback gracefully if not available
-try:
-    from PIL import Image
-    COMPRESSION_AVAILABLE = True
-    print("Image compression enabled (Pillow available)")
-except ImportError:
-    COMPRESSION_AVAILABLE = False
-    print("Image compression disabled (Pillow not installed). Run: pip install Pillow")
+from werkzeug.security import safe_join
+import logging
+import mimetypes
+import threading
+from logging_setup import configure_logging, sample_every
+from thumbnails import ThumbnailCache, snap_width, THUMBNAIL_FORMATS
+import photo_catalog
+from photo_catalog import customer_photo_key, register_customer_photo
+from upload_index import UploadIndex
+import photo_gc
+from photo_gc import PhotoGarbageCollector
+import image_processing
+from image_processing import contains_inline_photo
+from chunked_uploads import ChunkedUploadStore, UploadError, is_upload_ref
+import read_queries
+import records
+from records import PRODUCT, TRANSACTION, CUSTOMER, PRODUCT_LOCATION
+import metrics
+import compression
+import sales_analytics
+import sale_prices
+import sales_rollup
+import stock_alerts
+import change_feed
+from discovery import LocalAddress, DiscoveryResponder
 
+logger = logging.getLogger('app')
+
+# Importing this module only defines the app and its routes. Folders, the
+# database, caches and background threads are set up by create_app(), so tools
+# can import helpers from here without touching the live database.
 app = Flask(__name__)
-CORS(app)  # Allow cross-origin requests
 
 # Configure upload folders
 UPLOAD_FOLDER = 'uploads'
 PRODUCT_PHOTOS_FOLDER = os.path.join(UPLOAD_FOLDER, 'product_photos')
 CUSTOMER_PHOTOS_FOLDER = os.path.join(UPLOAD_FOLDER, 'customer_photos')
 FIND_PHOTOS_FOLDER = os.path.join(UPLOAD_FOLDER, 'find-photos')
-
-# Create directories if they don't exist
-for folder in [UPLOAD_FOLDER, PRODUCT_PHOTOS_FOLDER, CUSTOMER_PHOTOS_FOLDER, FIND_PHOTOS_FOLDER]:
-    if not os.path.exists(folder):
-        os.makedirs(folder)
+THUMBNAIL_CACHE_FOLDER = 'thumbnail_cache'  # Kept outside uploads/ so derivatives are never served as originals
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['PRODUCT_PHOTOS_FOLDER'] = PRODUCT_PHOTOS_FOLDER
 app.config['CUSTOMER_PHOTOS_FOLDER'] = CUSTOMER_PHOTOS_FOLDER
 app.config['FIND_PHOTOS_FOLDER'] = FIND_PHOTOS_FOLDER
+app.config['THUMBNAIL_CACHE_FOLDER'] = THUMBNAIL_CACHE_FOLDER
+app.config['THUMBNAIL_CACHE_MAX_MB'] = int(os.environ.get('THUMBNAIL_CACHE_MAX_MB', 200))
+
+# Uploaded photos get timestamped filenames and are never rewritten in place,
+# so browsers may cache them for a year without revalidating.
+app.config['PHOTO_CACHE_MAX_AGE'] = 365 * 24 * 60 * 60
+# Let a front proxy stream photo bytes: 'x-sendfile' (Apache/lighttpd) or
+# 'x-accel' (nginx, with an internal location mapped to X_ACCEL_REDIRECT_PREFIX)
+app.config['UPLOAD_SENDFILE_MODE'] = os.environ.get('UPLOAD_SENDFILE_MODE', '').lower()
+app.config['X_ACCEL_REDIRECT_PREFIX'] = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '/protected-uploads/')
+app.config['USE_X_SENDFILE'] = app.config['UPLOAD_SENDFILE_MODE'] == 'x-sendfile'
+
+# In-memory listing of the upload folders, kept current by our own writes and
+# deletes; the poller only picks up changes made outside the server (0 disables it)
+app.config['UPLOAD_INDEX_POLL_SECONDS'] = int(os.environ.get('UPLOAD_INDEX_POLL_SECONDS', 30))
+
+# Resumable chunked uploads; sessions live outside uploads/ until their photo is saved
+app.config['CHUNKED_UPLOAD_FOLDER'] = 'upload_sessions'
+app.config['CHUNKED_UPLOAD_MAX_MB'] = int(os.environ.get('CHUNKED_UPLOAD_MAX_MB', 50))
+app.config['CHUNKED_UPLOAD_IDLE_SECONDS'] = int(os.environ.get('CHUNKED_UPLOAD_IDLE_SECONDS', 3600))
+
+# The LAN address is cached and re-detected in the background; handhelds find
+# the server by broadcasting to DISCOVERY_PORT (0 disables the responder)
+app.config['SERVER_PORT'] = int(os.environ.get('SERVER_PORT', 8080))
+app.config['LOCAL_IP_POLL_SECONDS'] = int(os.environ.get('LOCAL_IP_POLL_SECONDS', 30))
+app.config['DISCOVERY_PORT'] = int(os.environ.get('DISCOVERY_PORT', 48080))
+local_address = LocalAddress()
+
+def server_address():
+    """IP, port and URL the handhelds should use to reach this server"""
+    local_ip = local_address.get()
+    port = app.config['SERVER_PORT']
+    return {'ip': local_ip, 'port': port, 'url': f'http://{local_ip}:{port}'}
+
+app.config['PHOTO_GC_FILES_PER_SECOND'] = int(os.environ.get('PHOTO_GC_FILES_PER_SECOND', 500))
+app.config['PHOTO_GC_MIN_AGE_SECONDS'] = int(os.environ.get('PHOTO_GC_MIN_AGE_SECONDS', 3600))
+
+# Each open /api/events stream holds a request thread under waitress/gunicorn (not
+# under asgi.py), so at most a quarter of the process's SERVER_THREADS (set by
+# serve.py) may stream; the rest of the dashboards poll. Streams end after
+# EVENT_STREAM_SECONDS and the browser reconnects where it left off
+app.config['SERVER_THREADS'] = int(os.environ.get('SERVER_THREADS', 8))
+app.config['EVENT_STREAM_MAX_CLIENTS'] = int(os.environ.get('EVENT_STREAM_MAX_CLIENTS',
+                                                            app.config['SERVER_THREADS'] // 4))
+app.config['EVENT_STREAM_SECONDS'] = int(os.environ.get('EVENT_STREAM_SECONDS', 300))
+
+# Set up by create_app()
+thumbnail_cache = None
+upload_index = None
+chunked_uploads = None
+discovery_responder = None
+photo_collector = None
+event_stream_slots = None
+_initialized = False
+_init_lock = threading.Lock()
+
+# Shop time zone; every stored date is local time in this zone
+# You can adjust the timezone offset here if needed
+# For India (IST), UTC+5:30
+LOCAL_TIMEZONE = timezone(timedelta(hours=5, minutes=30))
 
 # Helper function to get local timestamp
 def get_local_timestamp():
     """Get current timestamp in local timezone"""
-    # You can adjust the timezone offset here if needed
-    # For India (IST), UTC+5:30
-    ist = timezone(timedelta(hours=5, minutes=30))
-    return datetime.now(ist).strftime('%Y-%m-%d %H:%M:%S')
+    return datetime.now(LOCAL_TIMEZONE).strftime('%Y-%m-%d %H:%M:%S')
+
+def local_today():
+    """Today's date in the shop's time zone (SQLite's date('now') is UTC)"""
+    return datetime.now(LOCAL_TIMEZONE).date()
 
 def build_transaction_notes(transaction_count, total_amount=None, user_notes=None):
     """Build transaction notes with system info and user notes"""
@@ -60,11 +133,25 @@ def build_transaction_notes(transaction_count, total_amount=None, user_notes=Non
     else:
         return base_notes
 
+app.config['DATABASE'] = 'inventory.db'
+
+def get_db_connection():
+    """Open the inventory database; statement time is added to the request's metrics"""
+    return sqlite3.connect(app.config['DATABASE'], factory=metrics.TimedConnection)
+
+def json_response(payload, status=200):
+    """Like jsonify, but encoded by records.dumps (orjson when installed)"""
+    return app.response_class(records.dumps(payload), status=status, mimetype='application/json')
+
 # Database setup
 def init_db():
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
+    # Track freed pages so compact_db.py can use incremental_vacuum
+    # (only takes effect on a new, empty database)
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    
     # Products table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS products (
@@ -171,11 +258,88 @@ def init_db():
         )
     ''')
     
+    # Customer photo catalogue (replaces globbing customer_photos/ on every lookup)
+    photo_catalog.ensure_schema(cursor)
+    
+    # Orphan photo GC checkpoint and the indexes its reference checks rely on
+    photo_gc.ensure_schema(cursor)
+    
+    # Unit price and line total on sales (older databases are backfilled below)
+    prices_added = sale_prices.ensure_schema(cursor)
+    
+    # Date-range index for sales analytics and the sales summary
+    sales_analytics.ensure_schema(cursor)
+    
+    # Per-product reorder thresholds, the low-stock index and its change feed
+    stock_alerts.ensure_schema(cursor)
+    
+    # Change events for the /api/events stream
+    change_feed.ensure_schema(cursor)
+    cursor.execute('SELECT COUNT(*) FROM customer_photo_catalog')
+    catalog_is_new = cursor.fetchone()[0] == 0
+    
     conn.commit()
+    
+    if catalog_is_new:
+        # First run with the catalogue - index photos already on disk
+        photo_catalog.reconcile(conn, CUSTOMER_PHOTOS_FOLDER)
+    
+    if prices_added:
+        # First run with price columns - price past sales from their notes and MRPs
+        sale_prices.backfill(conn)
+    
+    # Daily sales rollups, kept current by triggers (after the backfill, which would fire them per row)
+    if sales_rollup.ensure_schema(cursor):
+        # First run with rollups - build them from the sales history
+        sales_rollup.rebuild(conn)
+    
     conn.close()
 
-# Initialize database
-init_db()
+def event_stream_limit():
+    """Open /api/events streams allowed in this process: the configured maximum, within a quarter of the threads"""
+    limit = min(app.config['EVENT_STREAM_MAX_CLIENTS'], app.config['SERVER_THREADS'] // 4)
+    if limit < app.config['EVENT_STREAM_MAX_CLIENTS']:
+        logger.warning('Allowing %s event streams, not %s: each holds one of %s request threads',
+                       limit, app.config['EVENT_STREAM_MAX_CLIENTS'], app.config['SERVER_THREADS'])
+    return limit
+
+@app.before_request
+def start_request_metrics():
+    metrics.start_request()
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.finish_request(route, request.method, response.status_code, response.content_length)
+    return response
+
+# Registered after the metrics hook so it runs first and the size metric sees the bytes sent
+@app.after_request
+def compress_response(response):
+    return compression.compress_response(response, request.headers.get('Accept-Encoding'), request.method)
+
+@app.teardown_request
+def end_request_metrics(exc):
+    metrics.end_request()
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, SQLite and compression metrics in the Prometheus text format"""
+    return app.response_class(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+def collect_storage_metrics():
+    """Gauges read from the caches only when /metrics is scraped"""
+    cache = thumbnail_cache.stats()
+    folders = upload_index.stats()
+    return [
+        ('thumbnail_cache_bytes', 'gauge', 'Bytes of cached thumbnails', cache['total_bytes']),
+        ('thumbnail_cache_entries', 'gauge', 'Cached thumbnails', cache['entries']),
+        ('upload_files', 'gauge', 'Photo files in the upload folders', sum(f['count'] for f in folders.values())),
+        ('upload_bytes', 'gauge', 'Bytes of photo files in the upload folders', sum(f['bytes'] for f in folders.values())),
+        ('chunked_upload_sessions', 'gauge', 'Open chunked upload sessions', chunked_uploads.stats()['sessions']),
+    ]
+
+metrics.registry.add_collector(collect_storage_metrics)
 
 @app.route('/')
 def index():
@@ -184,64 +348,38 @@ def index():
 @app.route('/api/server-status', methods=['GET'])
 def get_server_status():
     """Simple endpoint to confirm server is running and return basic info"""
-    local_ip = get_local_ip()
     return jsonify({
         'status': 'running',
-        'ip': local_ip,
-        'port': 8080,
-        'url': f'http://{local_ip}:8080',
+        **server_address(),
         'message': 'Server is running successfully'
     })
 
 @app.route('/api/products/<barcode>', methods=['GET'])
 def get_product_by_barcode(barcode):
     """Get a specific product by barcode"""
-    conn = sqlite3.connect('inventory.db')
-    cursor = conn.cursor()
+    conn = get_db_connection()
     
     try:
-        cursor.execute('''
-            SELECT barcode, name, mrp, quantity, created_date, image_path
-            FROM products 
-            WHERE barcode = ?
-        ''', (barcode,))
-        
-        product = cursor.fetchone()
-        conn.close()
-        
-        if not product:
+        product_dict = read_queries.get_product(conn.cursor(), barcode)
+        if not product_dict:
             return jsonify({'error': 'Product not found'}), 404
         
-        product_dict = {
-            'barcode': product[0],
-            'name': product[1],
-            'mrp': product[2],
-            'quantity': product[3],
-            'created_date': product[4],
-            'image_path': product[5]
-        }
-        
-        return jsonify({'Result': product_dict}), 200
+        return json_response({'Result': product_dict})
         
     except Exception as e:
-        conn.close()
         return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
 
 @app.route('/api/products/<barcode>/export', methods=['GET'])
 def export_product_data(barcode):
     """Export product data as JSON"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         # Get product details
-        cursor.execute('''
-            SELECT barcode, name, mrp, quantity, created_date, image_path
-            FROM products 
-            WHERE barcode = ?
-        ''', (barcode,))
-        
-        product = cursor.fetchone()
+        product = read_queries.get_product(cursor, barcode)
         if not product:
             conn.close()
             return jsonify({'error': 'Product not found'}), 404
@@ -259,14 +397,7 @@ def export_product_data(barcode):
         
         # Build export data
         product_data = {
-            'product_info': {
-                'barcode': product[0],
-                'name': product[1],
-                'mrp': product[2],
-                'quantity': product[3],
-                'created_date': product[4],
-                'image_path': product[5]
-            },
+            'product_info': product,
             'transaction_history': [
                 {
                     'transaction_type': t[0],
@@ -296,46 +427,73 @@ def export_product_data(barcode):
 
 @app.route('/api/products', methods=['GET'])
 def get_products():
-    conn = sqlite3.connect('inventory.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM products ORDER BY created_date DESC')
-    products = cursor.fetchall()
-    conn.close()
+    conn = get_db_connection()
+    try:
+        product_list = read_queries.list_products(conn.cursor())
+    finally:
+        conn.close()
     
-    product_list = []
-    for product in products:
-        product_list.append({
-            'id': product[0],
-            'barcode': product[1],
-            'name': product[2],
-            'image_path': product[3],
-            'mrp': product[4],
-            'quantity': product[5],
-            'created_date': product[6]
-        })
+    return json_response({'Result': product_list})
+
+@app.route('/api/products/low-stock', methods=['GET'])
+def get_low_stock_products():
+    conn = get_db_connection()
+    try:
+        product_list = read_queries.list_low_stock(conn.cursor())
+    finally:
+        conn.close()
     
-    return jsonify({'Result': product_list})
+    return json_response({'Result': product_list})
+
+# Server-Sent Events stream of inventory and sales changes (see change_feed.py)
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    # EventSource sends Last-Event-ID when it reconnects; ?since= lets other clients resume too
+    requested_id = change_feed.parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    
+    if not event_stream_slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many event streams open, poll instead'})
+        response.headers['Retry-After'] = '60'
+        return response, 503
+    
+    response = Response(
+        change_feed.stream(app.config['DATABASE'], requested_id, app.config['EVENT_STREAM_SECONDS']),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Released when the server closes the response, also when the client went away mid-stream
+    response.call_on_close(event_stream_slots.release)
+    return response
+
+# Products crossing their reorder threshold, after the event id the client last saw
+@app.route('/api/stock-events', methods=['GET'])
+def get_stock_events():
+    try:
+        since = int(request.args.get('since', 0))
+        limit = min(max(int(request.args.get('limit', 100)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'since and limit must be integers'}), 400
+    
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        events = stock_alerts.events_since(cursor, since, limit)
+        last_id = stock_alerts.last_event_id(cursor)
+    finally:
+        conn.close()
+    
+    return json_response({'Result': events, 'last_id': last_id})
 
 @app.route('/api/products/<barcode>', methods=['GET'])
 def get_product(barcode):
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM products WHERE barcode = ?', (barcode,))
-    product = cursor.fetchone()
+    cursor.execute(f'SELECT {PRODUCT.columns()} FROM products WHERE barcode = ?', (barcode,))
+    product = PRODUCT.record(cursor.fetchone())
     conn.close()
     
     if product:
-        return jsonify({
-            'Result': {
-                'id': product[0],
-                'barcode': product[1],
-                'name': product[2],
-                'image_path': product[3],
-                'mrp': product[4],
-                'quantity': product[5],
-                'created_date': product[6]
-            }
-        })
+        return json_response({'Result': product})
     else:
         return jsonify({'Result': None}), 404
 
@@ -343,11 +501,17 @@ def get_product(barcode):
 def add_product():
     data = request.json
     
+    reorder_threshold = data.get('reorder_threshold')
+    if reorder_threshold is None:
+        reorder_threshold = stock_alerts.DEFAULT_REORDER_THRESHOLD
+    elif not stock_alerts.is_valid_threshold(reorder_threshold):
+        return jsonify({'error': 'reorder_threshold must be a whole number of 0 or more'}), 400
+    
     # Handle image upload if provided
     image_path = None
     if 'image_path' in data and data['image_path']:
-        print(f"🔧 DEBUG: Received image data length: {len(data['image_path'])} characters")
-        print(f"🔧 DEBUG: Image data starts with: {data['image_path'][:50]}...")
+        logger.debug('Received image data length: %s characters', len(data['image_path']))
+        logger.debug('Image data starts with: %s...', data['image_path'][:50])
         
         # Process and save compressed image to product_photos folder
         filename = f"{data['barcode']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
@@ -357,10 +521,11 @@ def add_product():
             data['image_path'], 
             filename, 
             app.config['PRODUCT_PHOTOS_FOLDER'],
-            compress=True  # Enable maximum compression
+            compress=True,  # Enable maximum compression
+            profile='product'
         )
         
-        print(f"🔧 DEBUG: Save result - Success: {success}, Path: {full_path}, Error: {error_msg}")
+        logger.debug('Save result - Success: %s, Path: %s, Error: %s', success, full_path, error_msg)
         
         if not success:
             return jsonify({'error': f'Failed to process product image: {error_msg}'}), 400
@@ -368,21 +533,22 @@ def add_product():
         # Check file size after saving
         if os.path.exists(full_path):
             file_size = os.path.getsize(full_path)
-            print(f"🔧 DEBUG: Saved file size: {file_size} bytes")
+            logger.debug('Saved file size: %s bytes', file_size)
             if file_size < 100:
-                print(f"🔧 DEBUG: WARNING - File too small, likely corrupted!")
+                logger.warning('Saved product photo %s is only %s bytes, likely corrupted', full_path, file_size)
         
+        filename = os.path.basename(full_path)  # The profile may have changed the extension
         # Save relative path in database (product_photos/filename)
         image_path = f"product_photos/{filename}"
     
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute('''
-            INSERT INTO products (barcode, name, image_path, mrp, quantity)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (data['barcode'], data['name'], image_path, data.get('mrp'), data.get('quantity', 0)))
+            INSERT INTO products (barcode, name, image_path, mrp, quantity, reorder_threshold)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (data['barcode'], data['name'], image_path, data.get('mrp'), data.get('quantity', 0), reorder_threshold))
         
         conn.commit()
         conn.close()
@@ -396,9 +562,9 @@ def add_product():
 def update_product(barcode):
     try:
         data = request.json
-        print(f"Updating product {barcode} with data: {data}")
+        logger.debug('Updating product %s with fields: %s', barcode, sorted(data))
     
-        conn = sqlite3.connect('inventory.db')
+        conn = get_db_connection()
         cursor = conn.cursor()
     
         # Check if product exists and get current image path
@@ -415,7 +581,7 @@ def update_product(barcode):
         update_image = False
         
         if 'image_path' in data:
-            if data['image_path'] and data['image_path'].startswith('data:image'):
+            if is_new_photo(data['image_path']):
                 # New image provided - first delete old image, then save new one
                 try:
                     # Delete old image file if it exists (products don't need safety check as they're unique per barcode)
@@ -428,8 +594,8 @@ def update_product(barcode):
                             old_file_path = os.path.join(app.config['UPLOAD_FOLDER'], old_image_path)
                         
                         if os.path.exists(old_file_path):
-                            os.remove(old_file_path)
-                            print(f"Deleted old product image: {old_image_path}")
+                            remove_upload_file(old_file_path)
+                            logger.info('Deleted old product image: %s', old_image_path)
                     
                     # Process and save compressed image to product_photos folder
                     filename = f"{barcode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
@@ -437,20 +603,22 @@ def update_product(barcode):
                         data['image_path'], 
                         filename, 
                         app.config['PRODUCT_PHOTOS_FOLDER'],
-                        compress=True
+                        compress=True,
+                        profile='product'
                     )
                     
                     if not success:
                         conn.close()
                         return jsonify({'error': f'Failed to process product image: {error_msg}'}), 400
         
+                    filename = os.path.basename(full_path)
                     # Save relative path in database (product_photos/filename)
                     image_path = f"product_photos/{filename}"
                     update_image = True
-                    print(f"New compressed product image saved: {filename}")
+                    logger.info('New compressed product image saved: %s', filename)
                 except Exception as img_error:
                     conn.close()
-                    print(f"Error processing product image: {img_error}")
+                    logger.error('Error processing product image: %s', img_error)
                     return jsonify({'error': f'Error processing image: {str(img_error)}'}), 400
             # If image_path is null or empty, don't update the image field
         
@@ -461,14 +629,14 @@ def update_product(barcode):
                 SET name = ?, image_path = ?, mrp = ?, quantity = ?
                 WHERE barcode = ?
             ''', (data['name'], image_path, data.get('mrp'), data.get('quantity', 0), barcode))
-            print(f"Updated product with new image: {image_path}")
+            logger.info('Updated product with new image: %s', image_path)
         else:
             cursor.execute('''
                 UPDATE products 
                 SET name = ?, mrp = ?, quantity = ?
                 WHERE barcode = ?
             ''', (data['name'], data.get('mrp'), data.get('quantity', 0), barcode))
-            print(f"Updated product without changing image")
+            logger.info('Updated product without changing image')
         
         conn.commit()
         conn.close()
@@ -476,7 +644,7 @@ def update_product(barcode):
         return jsonify({'Result': 'Product updated successfully'})
         
     except Exception as e:
-        print(f"Error updating product: {e}")
+        logger.error('Error updating product: %s', e)
         if 'conn' in locals():
             conn.close()
         return jsonify({'error': str(e)}), 400
@@ -484,7 +652,7 @@ def update_product(barcode):
 @app.route('/api/products/<barcode>', methods=['DELETE'])
 def delete_product(barcode):
     """Delete a product and its associated photo file"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
@@ -515,14 +683,14 @@ def delete_product(barcode):
                     file_path = os.path.join(app.config['UPLOAD_FOLDER'], image_path)
                 
                 if os.path.exists(file_path):
-                    os.remove(file_path)
+                    remove_upload_file(file_path)
                     deleted_files.append(image_path)
-                    print(f"✅ Deleted product image: {file_path}")
+                    logger.info('Deleted product image: %s', file_path)
                 else:
-                    print(f"⚠️ Product image file not found: {file_path}")
+                    logger.warning('Product image file not found: %s', file_path)
             except Exception as e:
                 failed_deletions.append(f"Product image ({image_path}): {str(e)}")
-                print(f"❌ Error deleting product image {image_path}: {e}")
+                logger.error('Error deleting product image %s: %s', image_path, e)
         
         # Delete the product from database
         cursor.execute('DELETE FROM products WHERE barcode = ?', (barcode,))
@@ -554,51 +722,35 @@ def delete_product(barcode):
                 'message': 'Product deleted but photo file could not be removed'
             }
         
-        print(f"🗑️ Product deletion completed:")
-        print(f"   📦 Product: {product_name} ({barcode})")
-        print(f"   📊 Database records deleted: 1")
-        print(f"   📸 Photo files deleted: {len(deleted_files)}")
-        if failed_deletions:
-            print(f"   ⚠️ Failed deletions: {len(failed_deletions)}")
+        logger.info('Deleted product %s (%s): 1 database record, %s photo files, %s failed deletions',
+                    product_name, barcode, len(deleted_files), len(failed_deletions))
         
         return jsonify(response_data)
         
     except Exception as e:
         conn.close()
-        print(f"❌ Error in delete_product: {e}")
+        logger.error('Error in delete_product: %s', e)
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/products/search/<query>', methods=['GET'])
 def search_products(query):
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM products 
+    cursor.execute(f'''
+        SELECT {PRODUCT.columns()} FROM products 
         WHERE name LIKE ? OR barcode LIKE ?
         ORDER BY created_date DESC
     ''', (f'%{query}%', f'%{query}%'))
-    products = cursor.fetchall()
+    product_list = PRODUCT.records(cursor.fetchall())
     conn.close()
     
-    product_list = []
-    for product in products:
-        product_list.append({
-            'id': product[0],
-            'barcode': product[1],
-            'name': product[2],
-            'image_path': product[3],
-            'mrp': product[4],
-            'quantity': product[5],
-            'created_date': product[6]
-        })
-    
-    return jsonify({'Result': product_list})
+    return json_response({'Result': product_list})
 
 @app.route('/api/transactions', methods=['POST'])
 def add_transaction():
     data = request.json
     
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
@@ -616,10 +768,10 @@ def add_transaction():
                     processed_photos = []
                     recipient_name = data.get('recipient_name', 'Unknown')
                     recipient_phone = data.get('recipient_phone', '')
-                    customer_key = f"{recipient_name}_{recipient_phone}".replace(' ', '_').replace('+', '').replace('(', '').replace(')', '')
+                    customer_key = customer_photo_key(recipient_name, recipient_phone)
                     
                     for i, photo in enumerate(photo_array):
-                        if photo and photo.startswith('data:image'):
+                        if is_new_photo(photo):
                             # Create unique filename for each photo
                             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                             filename = f"customer_{customer_key}_{timestamp}_{i+1}.jpg"
@@ -628,58 +780,77 @@ def add_transaction():
                                 photo, 
                                 filename, 
                                 app.config['CUSTOMER_PHOTOS_FOLDER'],
-                                compress=True
+                                compress=True,
+                                profile='customer'
                             )
                             
                             if success:
+                                filename = os.path.basename(full_path)
                                 processed_photos.append(f"customer_photos/{filename}")
-                                print(f'Transaction creation: Processed photo {i+1} of {len(photo_array)}')
+                                register_customer_photo(cursor, customer_key, f"customer_photos/{filename}")
+                                logger.debug('Transaction creation: Processed photo %s of %s', i+1, len(photo_array))
                             else:
-                                print(f'Failed to process photo {i+1}: {error_msg}')
-                                processed_photos.append(photo)  # Keep original if processing fails
+                                logger.error('Failed to process photo %s: %s', i+1, error_msg)
+                                conn.close()
+                                return jsonify({'error': f'Failed to process customer photo {i+1}: {error_msg}'}), 400
                         else:
                             processed_photos.append(photo)
                     
                     # Store as JSON array if multiple photos, single string if one photo
                     if len(processed_photos) > 1:
                         processed_photo = json.dumps(processed_photos)
-                        print(f'Transaction creation: Saved {len(processed_photos)} photos as JSON array')
+                        logger.info('Transaction creation: Saved %s photos as JSON array', len(processed_photos))
                     elif len(processed_photos) == 1:
                         processed_photo = processed_photos[0]
-                        print(f'Transaction creation: Saved single photo')
+                        logger.info('Transaction creation: Saved single photo')
                     else:
                         processed_photo = recipient_photo
                 else:
                     processed_photo = recipient_photo
             except (ValueError, TypeError):
                 # Not JSON, handle as single photo
-                if recipient_photo.startswith('data:image'):
+                if is_new_photo(recipient_photo):
                     # Process single base64 photo
                     recipient_name = data.get('recipient_name', 'Unknown')
                     recipient_phone = data.get('recipient_phone', '')
-                    customer_key = f"{recipient_name}_{recipient_phone}".replace(' ', '_').replace('+', '').replace('(', '').replace(')', '')
+                    customer_key = customer_photo_key(recipient_name, recipient_phone)
                     filename = f"customer_{customer_key}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
                     
                     success, full_path, error_msg = process_and_save_image(
                         recipient_photo, 
                         filename, 
                         app.config['CUSTOMER_PHOTOS_FOLDER'],
-                        compress=True
+                        compress=True,
+                        profile='customer'
                     )
                     
                     if success:
+                        filename = os.path.basename(full_path)
                         processed_photo = f"customer_photos/{filename}"
-                        print(f'Transaction creation: Processed single customer photo')
+                        register_customer_photo(cursor, customer_key, processed_photo)
+                        logger.info('Transaction creation: Processed single customer photo')
                     else:
-                        print(f'Failed to process single transaction photo: {error_msg}')
-                        processed_photo = recipient_photo  # Keep original if processing fails
+                        logger.error('Failed to process single transaction photo: %s', error_msg)
+                        conn.close()
+                        return jsonify({'error': f'Failed to process customer photo: {error_msg}'}), 400
                 else:
                     processed_photo = recipient_photo
         
+        # Photos live in the photo store; never persist base64 image data in the database
+        if contains_inline_photo(processed_photo):
+            conn.close()
+            return jsonify({'error': 'Photo data could not be saved as an image file'}), 400
+        
+        # Sales keep the price they were made at: the client's price, else the current MRP
+        unit_price = None
+        if data['transaction_type'] == 'OUT':
+            unit_price = sale_prices.price_for(cursor, data['barcode'], data.get('unit_price'))
+        
         # Add transaction record with processed photo and local timestamp
         cursor.execute('''
-            INSERT INTO transactions (barcode, transaction_type, quantity, recipient_name, recipient_phone, recipient_photo, notes, transaction_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO transactions (barcode, transaction_type, quantity, recipient_name, recipient_phone, recipient_photo, notes, transaction_date,
+                                      unit_price, line_total)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             data['barcode'],
             data['transaction_type'],
@@ -688,7 +859,9 @@ def add_transaction():
             data.get('recipient_phone'),
             processed_photo,
             data.get('notes'),
-            get_local_timestamp()
+            get_local_timestamp(),
+            unit_price,
+            sale_prices.line_total(data['quantity'], unit_price)
         ))
         
         # Update product quantity
@@ -707,101 +880,70 @@ def add_transaction():
         return jsonify({'Result': 'Transaction recorded successfully'})
     except Exception as e:
         conn.close()
-        print(f'Error in add_transaction: {e}')
+        logger.error('Error in add_transaction: %s', e)
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/transactions', methods=['GET'])
 def get_transactions():
     barcode_filter = request.args.get('barcode')
     
-    conn = sqlite3.connect('inventory.db')
-    cursor = conn.cursor()
-    
-    if barcode_filter:
-        # Filter by specific barcode
-        cursor.execute('''
-            SELECT t.*, p.name as product_name, c.notes as customer_notes
-            FROM transactions t 
-            LEFT JOIN products p ON t.barcode = p.barcode 
-            LEFT JOIN customers c ON t.recipient_phone = c.phone
-            WHERE t.barcode = ?
-            ORDER BY transaction_date DESC
-        ''', (barcode_filter,))
-    else:
-        # Get all transactions
-        cursor.execute('''
-            SELECT t.*, p.name as product_name, c.notes as customer_notes
-            FROM transactions t 
-            LEFT JOIN products p ON t.barcode = p.barcode 
-            LEFT JOIN customers c ON t.recipient_phone = c.phone
-            ORDER BY transaction_date DESC
-        ''')
-    
-    transactions = cursor.fetchall()
-    conn.close()
-    
-    transaction_list = []
-    for trans in transactions:
-        transaction_list.append({
-            'id': trans[0],
-            'barcode': trans[1],
-            'transaction_type': trans[2],
-            'quantity': trans[3],
-            'recipient_name': trans[4],
-            'recipient_phone': trans[5],
-            'recipient_photo': trans[6],
-            'transaction_date': trans[7],
-            'notes': trans[8],
-            'product_name': trans[9],
-            'customer_notes': trans[10] if len(trans) > 10 else None
-        })
+    conn = get_db_connection()
+    try:
+        transaction_list = read_queries.list_transactions(conn.cursor(), barcode_filter)
+    finally:
+        conn.close()
     
-    return jsonify({'Result': transaction_list})
+    return json_response({'Result': transaction_list})
+
+def remove_upload_file(file_path):
+    """Delete an uploaded file and keep the upload index in step"""
+    os.remove(file_path)
+    if upload_index is not None:
+        upload_index.remove(file_path)
 
 def get_customer_photos_from_filesystem(customer_name, customer_phone):
-    """Get all photos for a customer from the filesystem"""
-    import os
-    import glob
-    
+    """Get all photos for a customer from the photo catalogue"""
+    conn = get_db_connection()
     try:
-        customer_key = f"{customer_name}_{customer_phone}".replace(' ', '_').replace('+', '').replace('(', '').replace(')', '')
-        photos_folder = app.config['CUSTOMER_PHOTOS_FOLDER']
-        
-        # Look for all photos matching this customer
-        pattern = os.path.join(photos_folder, f"customer_{customer_key}_*.jpg")
-        photo_files = glob.glob(pattern)
-        
-        if photo_files:
-            # Convert to relative paths for the API
-            relative_paths = []
-            for file_path in sorted(photo_files):  # Sort to maintain order
-                filename = os.path.basename(file_path)
-                relative_paths.append(f"customer_photos/{filename}")
-            
-            print(f"📸 Found {len(relative_paths)} photos for {customer_name}: {relative_paths}")
-            return relative_paths
-        else:
-            print(f"📸 No photos found for {customer_name} (pattern: {pattern})")
-            return []
-            
+        customer_key = customer_photo_key(customer_name, customer_phone)
+        return photo_catalog.photos_for_key(conn.cursor(), customer_key)
     except Exception as e:
-        print(f"❌ Error getting photos for {customer_name}: {e}")
+        logger.error('Error getting photos for %s: %s', customer_name, e)
         return []
+    finally:
+        conn.close()
+
+def forget_deleted_photos(photo_paths):
+    """Drop deleted customer photos from the catalogue (when no other write is in progress)"""
+    if not photo_paths:
+        return
+    conn = get_db_connection()
+    try:
+        photo_catalog.unregister_photos(conn.cursor(), photo_paths)
+        conn.commit()
+    finally:
+        conn.close()
 
 @app.route('/api/transactions/grouped', methods=['GET'])
 def get_grouped_transactions():
     """Get transactions grouped by customer, date, and notes (for multi-item sales)"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT t.*, p.name as product_name, c.notes as customer_notes
+    cursor.execute(f'''
+        SELECT {TRANSACTION.columns('t')}, p.name as product_name, c.notes as customer_notes
         FROM transactions t 
         LEFT JOIN products p ON t.barcode = p.barcode 
         LEFT JOIN customers c ON t.recipient_phone = c.phone
         WHERE t.transaction_type = 'OUT'
         ORDER BY t.transaction_date DESC, t.id DESC
     ''')
-    transactions = cursor.fetchall()
+    transactions = read_queries.TRANSACTION_WITH_NAMES.records(cursor.fetchall())
+    
+    # Look up every customer's photos in one catalogue query instead of once per group
+    catalog_photos = photo_catalog.photos_for_keys(
+        cursor,
+        (customer_photo_key(trans['recipient_name'] or 'Unknown Customer', trans['recipient_phone'] or '') for trans in transactions)
+    )
     conn.close()
     
     # Group transactions by customer, date, and notes
@@ -809,18 +951,18 @@ def get_grouped_transactions():
     
     for trans in transactions:
         # Create a unique key for grouping (excluding notes to prevent splitting on quantity updates)
-        date_part = trans[7][:16] if trans[7] else ''  # transaction_date up to minutes
-        group_key = f"{trans[4] or 'Unknown'}_{trans[5] or ''}_{date_part}"  # name_phone_date (no notes)
+        date_part = trans['transaction_date'][:16] if trans['transaction_date'] else ''  # transaction_date up to minutes
+        group_key = f"{trans['recipient_name'] or 'Unknown'}_{trans['recipient_phone'] or ''}_{date_part}"  # name_phone_date (no notes)
         
         if group_key not in grouped_sales:
             grouped_sales[group_key] = {
-                'id': trans[0],  # Use first transaction ID
-                'customer_name': trans[4] or 'Unknown Customer',
-                'customer_phone': trans[5] or '',
+                'id': trans['id'],  # Use first transaction ID
+                'customer_name': trans['recipient_name'] or 'Unknown Customer',
+                'customer_phone': trans['recipient_phone'] or '',
                 'recipient_photo': '',  # decide below with replacement rules
-                'transaction_date': trans[7],
-                'notes': trans[8] or '',
-                'customer_notes': trans[10] or '',  # Customer notes from customers table
+                'transaction_date': trans['transaction_date'],
+                'notes': trans['notes'] or '',
+                'customer_notes': trans['customer_notes'] or '',  # Customer notes from customers table
                 'items': [],
                 'total_quantity': 0,
                 'total_amount': 0.0,
@@ -830,7 +972,7 @@ def get_grouped_transactions():
         # Collect ALL photos for the group (preserve multiple photos)
         try:
             current_photo = grouped_sales[group_key]['recipient_photo'] or ''
-            new_photo = trans[6] or ''
+            new_photo = trans['recipient_photo'] or ''
             
             if new_photo:
                 # Parse existing photos
@@ -870,24 +1012,26 @@ def get_grouped_transactions():
                 elif len(all_photos) == 1:
                     grouped_sales[group_key]['recipient_photo'] = all_photos[0]
                 
-                print(f'📸 Combined photos for {group_key}: {len(all_photos)} photos')
+                logger.debug('Combined photos for %s: %s photos', group_key, len(all_photos), extra=sample_every(100))
                 
         except Exception as e:
-            print(f'❌ Error combining photos for {group_key}: {e}')
+            logger.error('Error combining photos for %s: %s', group_key, e)
             # On any error, keep existing photo selection
             pass
         
         # Add item to the group
         item_info = {
-            'transaction_id': trans[0],
-            'barcode': trans[1],
-            'product_name': trans[9] or 'Unknown Product',
-            'quantity': trans[3] or 0,
-            'mrp': 0.0  # We'll calculate this from products if needed
+            'transaction_id': trans['id'],
+            'barcode': trans['barcode'],
+            'product_name': trans['product_name'] or 'Unknown Product',
+            'quantity': trans['quantity'] or 0,
+            'mrp': trans['unit_price'] or 0.0,  # Price the item was sold at
+            'line_total': trans['line_total'] or 0.0
         }
         
         grouped_sales[group_key]['items'].append(item_info)
         grouped_sales[group_key]['total_quantity'] += item_info['quantity']
+        grouped_sales[group_key]['total_amount'] += item_info['line_total']
         
         # Mark as multi-item if more than one item
         if len(grouped_sales[group_key]['items']) > 1:
@@ -896,38 +1040,28 @@ def get_grouped_transactions():
     # Convert to list and sort by date
     result = []
     for group in grouped_sales.values():
-        # Calculate total amount from notes if available
-        if group['notes'] and 'Total:' in group['notes']:
-            try:
-                # Extract total from notes like "Multi-item sale - Total: ₹1510.00"
-                total_str = group['notes'].split('Total:')[1].strip()
-                total_str = total_str.replace('₹', '').replace(',', '')
-                group['total_amount'] = float(total_str)
-            except:
-                group['total_amount'] = 0.0
-        
-        # 🔥 OVERRIDE: Get photos directly from filesystem
-        filesystem_photos = get_customer_photos_from_filesystem(group['customer_name'], group['customer_phone'])
+        group['total_amount'] = round(group['total_amount'], 2)
+        
+        # 🔥 OVERRIDE: Use every photo catalogued for this customer
+        filesystem_photos = catalog_photos.get(customer_photo_key(group['customer_name'], group['customer_phone']), [])
         if filesystem_photos:
             if len(filesystem_photos) > 1:
                 group['recipient_photo'] = json.dumps(filesystem_photos)
-                print(f"✅ Set {len(filesystem_photos)} photos for {group['customer_name']} from filesystem")
             else:
                 group['recipient_photo'] = filesystem_photos[0]
-                print(f"✅ Set 1 photo for {group['customer_name']} from filesystem")
         
         result.append(group)
     
     # Sort by transaction date (newest first)
     result.sort(key=lambda x: x['transaction_date'] or '', reverse=True)
     
-    return jsonify({'Result': result})
+    return json_response({'Result': result})
 
 # Bulk update transactions endpoint (for editing multi-item sales)
 @app.route('/api/transactions/bulk-update', methods=['PUT'])
 def bulk_update_transactions():
     """Update multiple transactions for a sale, creating missing ones if needed"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     data = request.get_json()
@@ -937,8 +1071,8 @@ def bulk_update_transactions():
     items = data.get('items', [])  # List of items with barcode, quantity, etc.
     
     try:
-        print(f'Bulk updating transactions for {recipient_name}')
-        print(f'Items to update: {len(items)}')
+        logger.info('Bulk updating transactions for %s', recipient_name)
+        logger.debug('Items to update: %s', len(items))
         
         # Process each item
         for item_data in items:
@@ -956,9 +1090,9 @@ def bulk_update_transactions():
                     
                     cursor.execute('''
                         UPDATE transactions 
-                        SET recipient_name = ?, recipient_phone = ?, quantity = ?
+                        SET recipient_name = ?, recipient_phone = ?, quantity = ?, line_total = ROUND(unit_price * ?, 2)
                         WHERE id = ?
-                    ''', (recipient_name, recipient_phone, quantity, transaction_id))
+                    ''', (recipient_name, recipient_phone, quantity, quantity, transaction_id))
                     
                     # Update inventory for the quantity change
                     if quantity_difference != 0:
@@ -967,19 +1101,22 @@ def bulk_update_transactions():
                             SET quantity = quantity - ?
                             WHERE barcode = ?
                         ''', (quantity_difference, barcode))
-                        print(f'Updated inventory for {barcode} by {-quantity_difference} (transaction {transaction_id})')
+                        logger.debug('Updated inventory for %s by %s (transaction %s)', barcode, -quantity_difference, transaction_id)
                     
-                    print(f'Updated existing transaction {transaction_id} from {old_quantity} to {quantity}')
+                    logger.debug('Updated existing transaction %s from %s to %s', transaction_id, old_quantity, quantity)
                 else:
-                    print(f'Transaction {transaction_id} not found, will create new one')
+                    logger.debug('Transaction %s not found, will create new one', transaction_id)
                     transaction_id = None
             
             if not transaction_id:
                 # Create new transaction
+                unit_price = sale_prices.price_for(cursor, barcode, item_data.get('unit_price'))
                 cursor.execute('''
-                    INSERT INTO transactions (barcode, transaction_type, quantity, recipient_name, recipient_phone, notes, transaction_date)
-                    VALUES (?, 'OUT', ?, ?, ?, 'Added from edit', ?)
-                ''', (barcode, quantity, recipient_name, recipient_phone, get_local_timestamp()))
+                    INSERT INTO transactions (barcode, transaction_type, quantity, recipient_name, recipient_phone, notes, transaction_date,
+                                              unit_price, line_total)
+                    VALUES (?, 'OUT', ?, ?, ?, 'Added from edit', ?, ?, ?)
+                ''', (barcode, quantity, recipient_name, recipient_phone, get_local_timestamp(),
+                      unit_price, sale_prices.line_total(quantity, unit_price)))
                 new_id = cursor.lastrowid
                 
                 # Update inventory for new transaction (reduce stock)
@@ -989,8 +1126,8 @@ def bulk_update_transactions():
                     WHERE barcode = ?
                 ''', (quantity, barcode))
                 
-                print(f'Created new transaction {new_id} for {barcode} with quantity {quantity}')
-                print(f'Reduced inventory for {barcode} by {quantity}')
+                logger.info('Created new transaction %s for %s with quantity %s', new_id, barcode, quantity)
+                logger.debug('Reduced inventory for %s by %s', barcode, quantity)
         
         # Update photo for all transactions with this customer
         if recipient_photo:
@@ -1002,10 +1139,10 @@ def bulk_update_transactions():
                 if isinstance(photo_array, list) and len(photo_array) > 0:
                     # Process and save ALL photos from the array
                     processed_photos = []
-                    customer_key = f"{recipient_name}_{recipient_phone}".replace(' ', '_').replace('+', '').replace('(', '').replace(')', '')
+                    customer_key = customer_photo_key(recipient_name, recipient_phone)
                     
                     for i, photo in enumerate(photo_array):
-                        if photo and photo.startswith('data:image'):
+                        if is_new_photo(photo):
                             # Create unique filename for each photo
                             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                             filename = f"customer_{customer_key}_{timestamp}_{i+1}.jpg"
@@ -1014,32 +1151,54 @@ def bulk_update_transactions():
                                 photo, 
                                 filename, 
                                 app.config['CUSTOMER_PHOTOS_FOLDER'],
-                                compress=True
+                                compress=True,
+                                profile='customer'
                             )
                             
                             if success:
+                                filename = os.path.basename(full_path)
                                 processed_photos.append(f"customer_photos/{filename}")
-                                print(f'Bulk update: Processed photo {i+1} of {len(photo_array)}')
+                                register_customer_photo(cursor, customer_key, f"customer_photos/{filename}")
+                                logger.debug('Bulk update: Processed photo %s of %s', i+1, len(photo_array))
                             else:
-                                print(f'Failed to process photo {i+1}: {error_msg}')
-                                processed_photos.append(photo)
+                                logger.error('Failed to process photo %s: %s', i+1, error_msg)
+                                conn.close()
+                                return jsonify({'error': f'Failed to process customer photo {i+1}: {error_msg}'}), 400
                         else:
                             processed_photos.append(photo)
                     
                     # Store as JSON array if multiple photos, single string if one photo
                     if len(processed_photos) > 1:
                         processed_photo = json.dumps(processed_photos)
-                        print(f'Bulk update: Saved {len(processed_photos)} photos as JSON array')
+                        logger.info('Bulk update: Saved %s photos as JSON array', len(processed_photos))
                     elif len(processed_photos) == 1:
                         processed_photo = processed_photos[0]
-                        print(f'Bulk update: Saved single photo')
+                        logger.info('Bulk update: Saved single photo')
                     else:
                         processed_photo = recipient_photo
                 else:
                     processed_photo = recipient_photo
             except (ValueError, TypeError):
-                # Not JSON, use original value
-                pass
+                # Not JSON - a single photo, which may still need saving
+                if is_new_photo(recipient_photo):
+                    customer_key = customer_photo_key(recipient_name, recipient_phone)
+                    filename = f"customer_{customer_key}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+                    success, full_path, error_msg = process_and_save_image(
+                        recipient_photo,
+                        filename,
+                        app.config['CUSTOMER_PHOTOS_FOLDER'],
+                        compress=True,
+                        profile='customer'
+                    )
+                    if not success:
+                        conn.close()
+                        return jsonify({'error': f'Failed to process customer photo: {error_msg}'}), 400
+                    processed_photo = f"customer_photos/{os.path.basename(full_path)}"
+                    register_customer_photo(cursor, customer_key, processed_photo)
+            
+            if contains_inline_photo(processed_photo):
+                conn.close()
+                return jsonify({'error': 'Photo data could not be saved as an image file'}), 400
             
             cursor.execute('''
                 UPDATE transactions 
@@ -1053,13 +1212,13 @@ def bulk_update_transactions():
         
     except Exception as e:
         conn.close()
-        print(f'Error in bulk update: {e}')
+        logger.error('Error in bulk update: %s', e)
         return jsonify({'error': str(e)}), 400
 
 # Update transaction endpoint (for editing sales)
 @app.route('/api/transactions/<int:transaction_id>', methods=['PUT'])
 def update_transaction(transaction_id):
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     data = request.get_json()
@@ -1070,10 +1229,10 @@ def update_transaction(transaction_id):
     user_notes = data.get('user_notes')
     
     try:
-        print(f'Updating transaction {transaction_id} for {recipient_name}')
-        print(f'Photo provided: {recipient_photo is not None and len(recipient_photo) > 0 if recipient_photo else False}')
-        print(f'Quantity: {quantity}')
-        print(f'Phone: {recipient_phone}')
+        logger.info('Updating transaction %s for %s', transaction_id, recipient_name)
+        logger.debug('Photo provided: %s', recipient_photo is not None and len(recipient_photo) > 0 if recipient_photo else False)
+        logger.debug('Quantity: %s', quantity)
+        logger.debug('Phone: %s', recipient_phone)
         
         # First, check if transaction exists and get current data for inventory adjustment
         cursor.execute('SELECT recipient_photo, quantity, barcode FROM transactions WHERE id = ?', (transaction_id,))
@@ -1081,14 +1240,14 @@ def update_transaction(transaction_id):
         
         if not result:
             conn.close()
-            print(f'Transaction {transaction_id} not found in database')
+            logger.info('Transaction %s not found in database', transaction_id)
             # Instead of returning 404, try to find a similar transaction
             # This handles cases where the transaction ID from consolidated view doesn't match actual IDs
             return jsonify({'error': f'Transaction with ID {transaction_id} not found. This might be from a consolidated sale view.'}), 404
             
         old_photo_path, old_quantity, barcode = result
-        print(f'Old photo path: {old_photo_path}')
-        print(f'Old quantity: {old_quantity}, New quantity: {quantity}, Barcode: {barcode}')
+        logger.debug('Old photo path: %s', old_photo_path)
+        logger.debug('Old quantity: %s, New quantity: %s, Barcode: %s', old_quantity, quantity, barcode)
         
         # Handle photo processing if provided
         new_photo_path = None
@@ -1100,41 +1259,47 @@ def update_transaction(transaction_id):
                 if isinstance(photo_array, list) and len(photo_array) > 0:
                     # Process the first photo from the array
                     first_photo = photo_array[0]
-                    if first_photo and first_photo.startswith('data:image'):
+                    if is_new_photo(first_photo):
                         recipient_photo = first_photo
-                        print(f'Processing first photo from array of {len(photo_array)} photos')
+                        logger.debug('Processing first photo from array of %s photos', len(photo_array))
                     else:
                         recipient_photo = first_photo
             except (ValueError, TypeError):
                 # Not JSON, continue with original value
                 pass
             
-            if recipient_photo.startswith('data:image'):
+            if is_new_photo(recipient_photo):
                 try:
                     # First, process and save the new compressed customer photo
-                    customer_key = f"{recipient_name}_{recipient_phone}".replace(' ', '_').replace('+', '').replace('(', '').replace(')', '')
+                    customer_key = customer_photo_key(recipient_name, recipient_phone)
                     filename = f"customer_{customer_key}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
                     
                     success, full_path, error_msg = process_and_save_image(
                         recipient_photo, 
                         filename, 
                         app.config['CUSTOMER_PHOTOS_FOLDER'],
-                        compress=True
+                        compress=True,
+                        profile='customer'
                     )
                     
                     if not success:
                         conn.close()
                         return jsonify({'error': f'Failed to process customer photo: {error_msg}'}), 400
                     
+                    filename = os.path.basename(full_path)
                     # Save relative path in database (customer_photos/filename)
                     new_photo_path = f"customer_photos/{filename}"
-                    print(f'New compressed customer photo saved as: {filename}')
+                    register_customer_photo(cursor, customer_key, new_photo_path)
+                    logger.info('New compressed customer photo saved as: %s', filename)
                     
                     # Store old photo path for deletion after database update
                     old_photo_to_delete = old_photo_path
                 except Exception as e:
                     conn.close()
                     return jsonify({'error': f'Failed to process photo: {str(e)}'}), 400
+            elif contains_inline_photo(recipient_photo):
+                conn.close()
+                return jsonify({'error': 'Photo data could not be saved as an image file'}), 400
             else:
                 # If it's not base64, assume it's a filename to keep
                 new_photo_path = recipient_photo
@@ -1143,9 +1308,9 @@ def update_transaction(transaction_id):
         if new_photo_path is not None:
             cursor.execute('''
                 UPDATE transactions 
-                SET recipient_name = ?, recipient_phone = ?, quantity = ?, recipient_photo = ?
+                SET recipient_name = ?, recipient_phone = ?, quantity = ?, line_total = ROUND(unit_price * ?, 2), recipient_photo = ?
                 WHERE id = ?
-            ''', (recipient_name, recipient_phone, quantity, new_photo_path, transaction_id))
+            ''', (recipient_name, recipient_phone, quantity, quantity, new_photo_path, transaction_id))
             
             # Also update all other transactions with the same customer and similar timestamp (multi-item sales)
             # Get the transaction date for this transaction
@@ -1192,23 +1357,24 @@ def update_transaction(transaction_id):
                     ''', (new_notes, recipient_name, recipient_phone, transaction_date, transaction_date))
                     updated_notes_count = cursor.rowcount
                     if updated_notes_count > 0:
-                        print(f'Updated {updated_notes_count} transactions to Multi-Item Sale notes')
+                        logger.info('Updated %s transactions to Multi-Item Sale notes', updated_notes_count)
                 
                 updated_count = cursor.rowcount
                 if updated_count > 0:
-                    print(f'Updated {updated_count} related transactions with new photo')
+                    logger.info('Updated %s related transactions with new photo', updated_count)
                 
                 # Now safely delete old photos from related transactions AFTER database update
                 for trans_id, old_related_photo in related_transactions:
                     if old_related_photo and old_related_photo != new_photo_path:
-                        safe_delete_photo(old_related_photo, trans_id)
+                        if safe_delete_photo(old_related_photo, trans_id):
+                            photo_catalog.unregister_photos(cursor, [old_related_photo])
         
         else:
             cursor.execute('''
                 UPDATE transactions 
-                SET recipient_name = ?, recipient_phone = ?, quantity = ?
+                SET recipient_name = ?, recipient_phone = ?, quantity = ?, line_total = ROUND(unit_price * ?, 2)
                 WHERE id = ?
-            ''', (recipient_name, recipient_phone, quantity, transaction_id))
+            ''', (recipient_name, recipient_phone, quantity, quantity, transaction_id))
             
             # Check if we need to update notes to "Multi-Item Sale" for all related transactions
             cursor.execute('SELECT transaction_date FROM transactions WHERE id = ?', (transaction_id,))
@@ -1234,7 +1400,7 @@ def update_transaction(transaction_id):
                     ''', (new_notes, recipient_name, recipient_phone, transaction_date, transaction_date))
                     updated_notes_count = cursor.rowcount
                     if updated_notes_count > 0:
-                        print(f'Updated {updated_notes_count} transactions to Multi-Item Sale notes (non-photo path)')
+                        logger.info('Updated %s transactions to Multi-Item Sale notes (non-photo path)', updated_notes_count)
         
         if cursor.rowcount == 0:
             conn.close()
@@ -1248,7 +1414,7 @@ def update_transaction(transaction_id):
                 SET quantity = quantity - ?
                 WHERE barcode = ?
             ''', (quantity_difference, barcode))
-            print(f'📦 Updated inventory for {barcode} by {-quantity_difference} (quantity changed from {old_quantity} to {quantity})')
+            logger.info('Updated inventory for %s by %s (quantity changed from %s to %s)', barcode, -quantity_difference, old_quantity, quantity)
         
         # IMPORTANT: Ensure ALL transactions for the same customer/date have consistent notes
         # Check if this is part of a multi-item sale and update ALL related transactions
@@ -1268,24 +1434,20 @@ def update_transaction(transaction_id):
                 WHERE recipient_name = ? AND recipient_phone = ? 
                 AND datetime(transaction_date) BETWEEN datetime(?) AND datetime(?, '+1 minute')
             ''', (new_notes, recipient_name, recipient_phone, transaction_date, transaction_date))
-            print(f'✅ Updated {cursor.rowcount} transactions to consistent Multi-Item Sale notes')
+            logger.info('Updated %s transactions to consistent Multi-Item Sale notes', cursor.rowcount)
         else:
             # Single item sale - update to single item notes with total
-            product_mrp = None
-            cursor.execute('SELECT mrp FROM products WHERE barcode = ?', (barcode,))
-            product_result = cursor.fetchone()
-            if product_result:
-                product_mrp = product_result[0]
+            cursor.execute('SELECT line_total FROM transactions WHERE id = ?', (transaction_id,))
+            total_amount = cursor.fetchone()[0]
             
-            if product_mrp:
-                total_amount = quantity * product_mrp
+            if total_amount:
                 single_notes = build_transaction_notes(1, total_amount, user_notes)
                 cursor.execute('''
                     UPDATE transactions 
                     SET notes = ?
                     WHERE id = ?
                 ''', (single_notes, transaction_id))
-                print(f'✅ Updated transaction to single item notes: {single_notes}')
+                logger.info('Updated transaction to single item notes: %s', single_notes)
         
         conn.commit()
         
@@ -1304,7 +1466,7 @@ def update_transaction(transaction_id):
 @app.route('/api/transactions/<int:transaction_id>', methods=['DELETE'])
 def delete_transaction(transaction_id):
     """Delete a transaction and all associated customer photos"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
@@ -1351,17 +1513,17 @@ def delete_transaction(transaction_id):
                                 file_path = os.path.join(app.config['CUSTOMER_PHOTOS_FOLDER'], photo_path)
                             
                             if os.path.exists(file_path):
-                                os.remove(file_path)
+                                remove_upload_file(file_path)
                                 deleted_files.append(photo_path)
-                                print(f"✅ Deleted customer photo: {file_path}")
+                                logger.info('Deleted customer photo: %s', file_path)
                             else:
-                                print(f"⚠️ Customer photo file not found: {file_path}")
+                                logger.warning('Customer photo file not found: %s', file_path)
                         except Exception as e:
                             failed_deletions.append(f"Customer photo ({photo_path}): {str(e)}")
-                            print(f"❌ Error deleting customer photo {photo_path}: {e}")
+                            logger.error('Error deleting customer photo %s: %s', photo_path, e)
             except Exception as e:
                 failed_deletions.append(f"Photo parsing error: {str(e)}")
-                print(f"❌ Error parsing customer photos: {e}")
+                logger.error('Error parsing customer photos: %s', e)
         
         # Reverse the inventory changes
         if transaction_type == 'OUT':
@@ -1373,6 +1535,7 @@ def delete_transaction(transaction_id):
         
         # Delete the transaction from database
         cursor.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
+        photo_catalog.unregister_photos(cursor, deleted_files)
         
         if cursor.rowcount == 0:
             conn.close()
@@ -1405,26 +1568,21 @@ def delete_transaction(transaction_id):
                 'message': 'Transaction deleted but some photo files could not be removed'
             }
         
-        print(f"🗑️ Transaction deletion completed:")
-        print(f"   📋 Transaction ID: {transaction_id}")
-        print(f"   👤 Customer: {recipient_name or 'Unknown'}")
-        print(f"   📦 Product: {barcode} ({transaction_type} {quantity})")
-        print(f"   📊 Database records deleted: 1")
-        print(f"   📸 Photo files deleted: {len(deleted_files)}")
-        if failed_deletions:
-            print(f"   ⚠️ Failed deletions: {len(failed_deletions)}")
+        logger.info('Deleted transaction %s for %s, product %s (%s %s): %s photo files, %s failed deletions',
+                    transaction_id, recipient_name or 'Unknown', barcode, transaction_type, quantity,
+                    len(deleted_files), len(failed_deletions))
         
         return jsonify(response_data)
         
     except Exception as e:
         conn.close()
-        print(f"❌ Error in delete_transaction: {e}")
+        logger.error('Error in delete_transaction: %s', e)
         return jsonify({'error': str(e)}), 400
 
 # Update product quantity endpoint (for inventory adjustment)
 @app.route('/api/products/<barcode>/quantity', methods=['PUT'])
 def update_product_quantity(barcode):
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     data = request.get_json()
@@ -1451,10 +1609,35 @@ def update_product_quantity(barcode):
         conn.close()
         return jsonify({'error': str(e)}), 400
 
+# Set the stock level at or below which a product is low on stock
+@app.route('/api/products/<barcode>/reorder-threshold', methods=['PUT'])
+def update_reorder_threshold(barcode):
+    data = request.get_json()
+    threshold = data.get('reorder_threshold')
+    
+    if not stock_alerts.is_valid_threshold(threshold):
+        return jsonify({'error': 'reorder_threshold must be a whole number of 0 or more'}), 400
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('UPDATE products SET reorder_threshold = ? WHERE barcode = ?', (threshold, barcode))
+        
+        if cursor.rowcount == 0:
+            conn.close()
+            return jsonify({'error': 'Product not found'}), 404
+        
+        conn.commit()
+        conn.close()
+        return jsonify({'Result': 'Reorder threshold updated successfully'})
+    except Exception as e:
+        conn.close()
+        return jsonify({'error': str(e)}), 400
+
 # Update customer by phone number endpoint
 @app.route('/api/customers/phone/<phone>', methods=['PUT'])
 def update_customer_by_phone(phone):
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     data = request.get_json()
@@ -1495,7 +1678,7 @@ def update_customer_by_phone(phone):
 # Update transactions by customer (for consolidated sales)
 @app.route('/api/transactions/update-by-customer', methods=['PUT'])
 def update_transactions_by_customer():
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     data = request.get_json()
@@ -1505,32 +1688,32 @@ def update_transactions_by_customer():
     recipient_photo = data.get('recipient_photo')
     
     try:
-        print(f'Updating transactions by customer: {recipient_name} ({recipient_phone}) to quantity: {new_quantity}')
+        logger.info('Updating transactions by customer: %s (%s) to quantity: %s', recipient_name, recipient_phone, new_quantity)
         
         # Find all transactions for this customer (from today)
         today = datetime.now().strftime('%Y-%m-%d')
         cursor.execute('''
-            SELECT id, barcode, quantity FROM transactions 
+            SELECT id, barcode, quantity, unit_price FROM transactions 
             WHERE recipient_name = ? AND recipient_phone = ? 
             AND DATE(transaction_date) = DATE(?)
             ORDER BY transaction_date DESC
         ''', (recipient_name, recipient_phone, today))
         
         transactions = cursor.fetchall()
-        print(f'Found {len(transactions)} transactions to update')
+        logger.debug('Found %s transactions to update', len(transactions))
         
         if not transactions:
             conn.close()
             return jsonify({'error': 'No transactions found for this customer today'}), 404
         
         # Update the first (most recent) transaction with the new quantity
-        transaction_id, barcode, old_quantity = transactions[0]
+        transaction_id, barcode, old_quantity, unit_price = transactions[0]
         
-        # Get product price to calculate new total
+        # Price the sale was made at; older rows without one fall back to the product's MRP
         cursor.execute('SELECT name, mrp FROM products WHERE barcode = ?', (barcode,))
         product_result = cursor.fetchone()
         product_name = product_result[0] if product_result else 'Unknown Product'
-        product_price = product_result[1] if product_result else 10.0
+        product_price = unit_price if unit_price is not None else (product_result[1] if product_result else 10.0)
         
         # Calculate new total amount
         new_total_amount = new_quantity * product_price
@@ -1541,19 +1724,38 @@ def update_transactions_by_customer():
         # Update the transaction
         update_query = '''
             UPDATE transactions 
-            SET quantity = ?, recipient_name = ?, recipient_phone = ?, notes = ?
+            SET quantity = ?, recipient_name = ?, recipient_phone = ?, notes = ?, unit_price = ?, line_total = ?
         '''
-        update_params = [new_quantity, recipient_name, recipient_phone, new_notes]
+        update_params = [new_quantity, recipient_name, recipient_phone, new_notes,
+                         product_price, sale_prices.line_total(new_quantity, product_price)]
         
         if recipient_photo:
+            if is_new_photo(recipient_photo):
+                customer_key = customer_photo_key(recipient_name, recipient_phone)
+                filename = f"customer_{customer_key}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+                success, full_path, error_msg = process_and_save_image(
+                    recipient_photo,
+                    filename,
+                    app.config['CUSTOMER_PHOTOS_FOLDER'],
+                    compress=True,
+                    profile='customer'
+                )
+                if not success:
+                    conn.close()
+                    return jsonify({'error': f'Failed to process customer photo: {error_msg}'}), 400
+                recipient_photo = f"customer_photos/{os.path.basename(full_path)}"
+                register_customer_photo(cursor, customer_key, recipient_photo)
+            elif contains_inline_photo(recipient_photo):
+                conn.close()
+                return jsonify({'error': 'Photo data could not be saved as an image file'}), 400
             update_query += ', recipient_photo = ?'
             update_params.append(recipient_photo)
-        
+
         update_query += ' WHERE id = ?'
         update_params.append(transaction_id)
         
         cursor.execute(update_query, update_params)
-        print(f'Updated transaction notes to: {new_notes}')
+        logger.info('Updated transaction notes to: %s', new_notes)
         
         # Update inventory to reflect the quantity change
         quantity_difference = new_quantity - old_quantity
@@ -1563,13 +1765,13 @@ def update_transactions_by_customer():
                 SET quantity = quantity - ?
                 WHERE barcode = ?
             ''', (quantity_difference, barcode))
-            print(f'Updated inventory for {barcode} by {-quantity_difference}')
-            print(f'New total amount: ₹{new_total_amount:.2f} (was ₹{old_quantity * product_price:.2f})')
+            logger.info('Updated inventory for %s by %s', barcode, -quantity_difference)
+            logger.debug('New total amount: ₹%.2f (was ₹%.2f)', new_total_amount, old_quantity * product_price)
         
         conn.commit()
         conn.close()
         
-        print(f'Successfully updated transaction {transaction_id} quantity from {old_quantity} to {new_quantity}')
+        logger.info('Successfully updated transaction %s quantity from %s to %s', transaction_id, old_quantity, new_quantity)
         return jsonify({
             'Result': 'Transaction updated successfully',
             'transaction_id': transaction_id,
@@ -1580,47 +1782,34 @@ def update_transactions_by_customer():
         
     except Exception as e:
         conn.close()
-        print(f'Error updating transactions by customer: {str(e)}')
+        logger.error('Error updating transactions by customer: %s', str(e))
         return jsonify({'error': str(e)}), 400
 
 # Get all photos for a specific customer (simple and direct)
 @app.route('/api/customer-photos/<customer_name>/<customer_phone>', methods=['GET'])
 def get_customer_photos(customer_name, customer_phone):
-    """Get all photos for a specific customer from filesystem"""
-    import os
-    import glob
-    
+    """Get all photos for a specific customer from the photo catalogue"""
     try:
         # Clean customer info for filename matching
         clean_name = customer_name.replace(' ', '_')
         clean_phone = customer_phone.replace('+', '').replace('(', '').replace(')', '').replace(' ', '')
         customer_key = f"{clean_name}_{clean_phone}"
         
-        # Look in the customer_photos folder
-        photos_folder = app.config['CUSTOMER_PHOTOS_FOLDER']
-        pattern = os.path.join(photos_folder, f"customer_{customer_key}_*.jpg")
-        
-        print(f"🔍 Looking for photos with pattern: {pattern}")
-        
-        # Find all matching photo files
-        photo_files = glob.glob(pattern)
-        photo_files.sort()  # Sort by filename (which includes timestamp)
+        conn = get_db_connection()
+        try:
+            photo_urls = photo_catalog.photos_for_key(conn.cursor(), customer_key)
+        finally:
+            conn.close()
         
-        if photo_files:
-            # Convert to web-accessible paths
-            photo_urls = []
-            for file_path in photo_files:
-                filename = os.path.basename(file_path)
-                photo_urls.append(f"customer_photos/{filename}")
-            
-            print(f"✅ Found {len(photo_urls)} photos for {customer_name}: {photo_urls}")
+        if photo_urls:
+            logger.debug('Found %s photos for %s: %s', len(photo_urls), customer_name, photo_urls)
             return jsonify({
                 'success': True,
                 'photos': photo_urls,
                 'count': len(photo_urls)
             })
         else:
-            print(f"❌ No photos found for {customer_name} with pattern: {pattern}")
+            logger.debug('No photos found for %s (key: %s)', customer_name, customer_key)
             return jsonify({
                 'success': False,
                 'photos': [],
@@ -1629,7 +1818,7 @@ def get_customer_photos(customer_name, customer_phone):
             })
             
     except Exception as e:
-        print(f"❌ Error getting photos for {customer_name}: {e}")
+        logger.error('Error getting photos for %s: %s', customer_name, e)
         return jsonify({
             'success': False,
             'photos': [],
@@ -1639,174 +1828,139 @@ def get_customer_photos(customer_name, customer_phone):
 
 @app.route('/api/cleanup-photos', methods=['POST'])
 def cleanup_photos():
-    """Remove orphaned photo files that are no longer referenced in the database"""
+    """Start (or resume) a background pass that removes photo files no longer referenced in the database"""
+    data = request.get_json(silent=True) or {}
+    dry_run = bool(data.get('dry_run', False))
+    
+    upload_index.refresh()  # pick up anything changed outside the server
+    started = photo_collector.start(dry_run=dry_run, restart=bool(data.get('restart', False)))
+    if not started:
+        return jsonify({'error': 'Photo cleanup is already running', 'status': photo_collector.status()}), 409
+    
+    return jsonify({
+        'Result': f"Photo cleanup {'dry run ' if dry_run else ''}started in the background.",
+        'status': photo_collector.status()
+    }), 202
+
+@app.route('/api/cleanup-photos', methods=['GET'])
+def cleanup_photos_status():
+    """Progress of the current or last photo cleanup, including orphans found so far"""
+    return jsonify({'Result': photo_collector.status()})
+
+@app.route('/api/cleanup-photos/stop', methods=['POST'])
+def stop_cleanup_photos():
+    """Stop the background photo cleanup after its current batch (it resumes on the next start)"""
+    photo_collector.stop()
+    return jsonify({'Result': 'Photo cleanup stopping', 'status': photo_collector.status()})
+
+@app.route('/api/uploads/stats', methods=['GET'])
+def get_upload_stats():
+    """File counts and disk usage per upload folder, answered from the upload index"""
+    folders = upload_index.stats()
+    return jsonify({
+        'Result': {(folder or 'uploads'): info for folder, info in folders.items()},
+        'total_files': upload_index.count(),
+        'total_bytes': upload_index.total_size(),
+        'chunked_uploads': chunked_uploads.stats()
+    })
+
+# Chunked uploads: POST to create a session, PUT each chunk with its SHA-256 in
+# X-Chunk-SHA256, GET to see which chunks are missing after a dropped connection,
+# then POST .../complete and send "upload:<id>" wherever a data URL was accepted.
+@app.route('/api/chunked-uploads', methods=['POST'])
+def create_chunked_upload():
+    """Start a resumable upload: {total_size, chunk_size?, sha256?, content_type?}"""
+    data = request.get_json(silent=True) or {}
     try:
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
-        
-        # Get all photo filenames currently in the database
-        cursor.execute('SELECT DISTINCT recipient_photo FROM transactions WHERE recipient_photo IS NOT NULL AND recipient_photo != ""')
-        db_photos = set()
-        for row in cursor.fetchall():
-            photo_path = row[0]
-            if photo_path and not photo_path.startswith('data:image'):
-                db_photos.add(photo_path)
-        
-        conn.close()
-        
-        deleted_count = 0
-        deleted_files = []
-        
-        # Clean up customer photos in both old and new locations
-        # Check old location (uploads root)
-        upload_dir = app.config['UPLOAD_FOLDER']
-        if os.path.exists(upload_dir):
-            old_customer_files = set(f for f in os.listdir(upload_dir) if f.startswith('customer_') and f.endswith('.jpg'))
-            orphaned_old_files = old_customer_files - db_photos
-            
-            for filename in orphaned_old_files:
-                file_path = os.path.join(upload_dir, filename)
-                try:
-                    os.remove(file_path)
-                    deleted_count += 1
-                    deleted_files.append(filename)
-                    print(f'Deleted orphaned customer photo from old location: {filename}')
-                except Exception as e:
-                    print(f'Failed to delete {filename}: {e}')
-        
-        # Check new location (customer_photos folder)
-        customer_photos_dir = app.config['CUSTOMER_PHOTOS_FOLDER']
-        if os.path.exists(customer_photos_dir):
-            customer_files = set(f for f in os.listdir(customer_photos_dir) if f.startswith('customer_') and f.endswith('.jpg'))
-            # Convert to relative paths for comparison
-            customer_files_relative = set(f"customer_photos/{f}" for f in customer_files)
-            orphaned_customer_files = customer_files_relative - db_photos
-            
-            for relative_path in orphaned_customer_files:
-                filename = relative_path.split('/')[-1]  # Get just the filename
-                file_path = os.path.join(customer_photos_dir, filename)
-                try:
-                    os.remove(file_path)
-                    deleted_count += 1
-                    deleted_files.append(relative_path)
-                    print(f'Deleted orphaned customer photo: {relative_path}')
-                except Exception as e:
-                    print(f'Failed to delete {relative_path}: {e}')
-        
-        return jsonify({
-            'Result': f'Cleanup completed. Deleted {deleted_count} orphaned photos.',
-            'deleted_files': deleted_files
-        })
-            
-    except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        session = chunked_uploads.create(
+            data.get('total_size'),
+            chunk_size=data.get('chunk_size'),
+            sha256=data.get('sha256'),
+            content_type=data.get('content_type')
+        )
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    session['upload_ref'] = f"upload:{session['upload_id']}"
+    return jsonify({'Result': session}), 201
+
+@app.route('/api/chunked-uploads/<upload_id>', methods=['GET'])
+def get_chunked_upload(upload_id):
+    """Which chunks have arrived and which are still missing"""
+    try:
+        return jsonify({'Result': chunked_uploads.status(upload_id)})
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+
+@app.route('/api/chunked-uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def put_upload_chunk(upload_id, index):
+    """Store one chunk (raw request body); resending a chunk is safe"""
+    try:
+        status = chunked_uploads.put_chunk(
+            upload_id, index, request.get_data(cache=False), request.headers.get('X-Chunk-SHA256')
+        )
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify({'Result': {'received': len(status['received']), 'missing': status['missing']}})
+
+@app.route('/api/chunked-uploads/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    """Assemble the chunks; the upload can then be referenced as upload:<id>"""
+    try:
+        status = chunked_uploads.complete(upload_id)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    status['upload_ref'] = f"upload:{upload_id}"
+    return jsonify({'Result': status})
+
+@app.route('/api/chunked-uploads/<upload_id>', methods=['DELETE'])
+def delete_chunked_upload(upload_id):
+    """Abandon an upload"""
+    try:
+        chunked_uploads.discard(upload_id)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify({'Result': 'Upload discarded'})
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
-    conn = sqlite3.connect('inventory.db')
-    cursor = conn.cursor()
-    
-    # Get total products
-    cursor.execute('SELECT COUNT(*) FROM products')
-    total_products = cursor.fetchone()[0]
-    
-    # Get total quantity
-    cursor.execute('SELECT SUM(quantity) FROM products')
-    total_quantity = cursor.fetchone()[0] or 0
-    
-    # Get total transactions
-    cursor.execute('SELECT COUNT(*) FROM transactions')
-    total_transactions = cursor.fetchone()[0]
-    
-    # Get low stock items (quantity <= 5)
-    cursor.execute('SELECT COUNT(*) FROM products WHERE quantity <= 5')
-    low_stock = cursor.fetchone()[0]
-    
-    # Get recent transactions
-    cursor.execute('''
-        SELECT t.*, p.name as product_name 
-        FROM transactions t 
-        LEFT JOIN products p ON t.barcode = p.barcode 
-        ORDER BY transaction_date DESC 
-        LIMIT 10
-    ''')
-    recent_transactions = cursor.fetchall()
-    
-    conn.close()
-    
-    transaction_list = []
-    for trans in recent_transactions:
-        transaction_list.append({
-            'id': trans[0],
-            'barcode': trans[1],
-            'transaction_type': trans[2],
-            'quantity': trans[3],
-            'recipient_name': trans[4],
-            'recipient_phone': trans[5],
-            'recipient_photo': trans[6],
-            'transaction_date': trans[7],
-            'notes': trans[8],
-            'product_name': trans[9]
-        })
+    conn = get_db_connection()
+    try:
+        stats = read_queries.get_stats(conn.cursor())
+    finally:
+        conn.close()
     
-    return jsonify({
-        'total_products': total_products,
-        'total_quantity': total_quantity,
-        'total_transactions': total_transactions,
-        'low_stock': low_stock,
-        'recent_transactions': transaction_list
-    })
+    return json_response(stats)
 
 # Customer Management APIs
 @app.route('/api/customers', methods=['GET'])
 def get_customers():
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM customers ORDER BY created_date DESC')
-    customers = cursor.fetchall()
+    cursor.execute(f'SELECT {CUSTOMER.columns()} FROM customers ORDER BY created_date DESC')
+    customer_list = CUSTOMER.records(cursor.fetchall())
     conn.close()
     
-    customer_list = []
-    for customer in customers:
-        customer_list.append({
-            'id': customer[0],
-            'name': customer[1],
-            'phone': customer[2],
-            'notes': customer[3],
-            'created_date': customer[4]
-        })
-    
-    return jsonify({'Result': customer_list})
+    return json_response({'Result': customer_list})
 
 @app.route('/api/customers/search/<query>', methods=['GET'])
 def search_customers(query):
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM customers 
+    cursor.execute(f'''
+        SELECT {CUSTOMER.columns()} FROM customers 
         WHERE name LIKE ? OR phone LIKE ?
         ORDER BY created_date DESC
     ''', (f'%{query}%', f'%{query}%'))
-    customers = cursor.fetchall()
+    customer_list = CUSTOMER.records(cursor.fetchall())
     conn.close()
     
-    customer_list = []
-    for customer in customers:
-        customer_list.append({
-            'id': customer[0],
-            'name': customer[1],
-            'phone': customer[2],
-            'notes': customer[3],
-            'created_date': customer[4]
-        })
-    
-    return jsonify({'Result': customer_list})
+    return json_response({'Result': customer_list})
 
 @app.route('/api/customers', methods=['POST'])
 def add_customer():
     data = request.json
     
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
@@ -1838,7 +1992,7 @@ def add_customer():
 def update_customer(customer_id):
     data = request.json
     
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
@@ -1863,7 +2017,7 @@ def update_customer(customer_id):
 
 @app.route('/api/customers/<customer_id>', methods=['DELETE'])
 def delete_customer(customer_id):
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
@@ -1877,10 +2031,22 @@ def delete_customer(customer_id):
         return jsonify({'error': str(e)}), 400
 
 # Product Location Management APIs
+def location_records(cursor, rows):
+    """Product location records with all their images in image_paths (image_path stays the main one)"""
+    locations = PRODUCT_LOCATION.records(rows)
+    for location in locations:
+        cursor.execute('''
+            SELECT image_path FROM product_location_images 
+            WHERE location_id = ? 
+            ORDER BY image_order
+        ''', (location['id'],))
+        location['image_paths'] = [image_path for (image_path,) in cursor.fetchall()]
+    return locations
+
 @app.route('/api/product-locations', methods=['GET'])
 def get_product_locations():
     """Get all product location photos with pagination"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     # Get pagination parameters
@@ -1893,40 +2059,16 @@ def get_product_locations():
     total_count = cursor.fetchone()[0]
     
     # Get paginated results
-    cursor.execute('''
-        SELECT * FROM product_location_photos 
+    cursor.execute(f'''
+        SELECT {PRODUCT_LOCATION.columns()} FROM product_location_photos 
         ORDER BY updated_date DESC 
         LIMIT ? OFFSET ?
     ''', (per_page, offset))
-    locations = cursor.fetchall()
-    
-    location_list = []
-    for location in locations:
-        location_id = location[0]
-        
-        # Get all images for this location
-        cursor.execute('''
-            SELECT image_path FROM product_location_images 
-            WHERE location_id = ? 
-            ORDER BY image_order
-        ''', (location_id,))
-        images = cursor.fetchall()
-        image_paths = [img[0] for img in images] if images else []
-        
-        location_list.append({
-            'id': location[0],
-            'product_name': location[1],
-            'location_name': location[2],
-            'image_path': location[3],  # Main image (backward compatibility)
-            'image_paths': image_paths,  # All images
-            'notes': location[4],
-            'created_date': location[5],
-            'updated_date': location[6]
-        })
+    location_list = location_records(cursor, cursor.fetchall())
     
     conn.close()
     
-    return jsonify({
+    return json_response({
         'Result': location_list,
         'total_count': total_count,
         'page': page,
@@ -1937,48 +2079,24 @@ def get_product_locations():
 @app.route('/api/product-locations/search/<query>', methods=['GET'])
 def search_product_locations(query):
     """Search product locations by product name or location name"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM product_location_photos 
+    cursor.execute(f'''
+        SELECT {PRODUCT_LOCATION.columns()} FROM product_location_photos 
         WHERE product_name LIKE ? OR location_name LIKE ?
         ORDER BY updated_date DESC
     ''', (f'%{query}%', f'%{query}%'))
-    locations = cursor.fetchall()
-    
-    location_list = []
-    for location in locations:
-        location_id = location[0]
-        
-        # Get all images for this location
-        cursor.execute('''
-            SELECT image_path FROM product_location_images 
-            WHERE location_id = ? 
-            ORDER BY image_order
-        ''', (location_id,))
-        images = cursor.fetchall()
-        image_paths = [img[0] for img in images] if images else []
-        
-        location_list.append({
-            'id': location[0],
-            'product_name': location[1],
-            'location_name': location[2],
-            'image_path': location[3],  # Main image (backward compatibility)
-            'image_paths': image_paths,  # All images
-            'notes': location[4],
-            'created_date': location[5],
-            'updated_date': location[6]
-        })
+    location_list = location_records(cursor, cursor.fetchall())
     
     conn.close()
-    return jsonify({'Result': location_list})
+    return json_response({'Result': location_list})
 
 @app.route('/api/product-locations', methods=['POST'])
 def add_product_location():
     """Add a new product location with multiple photos"""
     data = request.json
     
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
@@ -2014,7 +2132,8 @@ def add_product_location():
                         image_data, 
                         filename, 
                         app.config['FIND_PHOTOS_FOLDER'],
-                        compress=True
+                        compress=True,
+                        profile='location'
                     )
                     
                     if not success:
@@ -2024,6 +2143,7 @@ def add_product_location():
                         conn.close()
                         return jsonify({'error': f'Failed to process image {i+1}: {error_msg}'}), 400
                     
+                    filename = os.path.basename(full_path)
                     # Save relative path in database (find-photos/filename)
                     relative_path = f"find-photos/{filename}"
                     image_paths.append(relative_path)
@@ -2046,7 +2166,8 @@ def add_product_location():
                 data['image_data'], 
                 filename, 
                 app.config['FIND_PHOTOS_FOLDER'],
-                compress=True
+                compress=True,
+                profile='location'
             )
             
             if not success:
@@ -2055,6 +2176,7 @@ def add_product_location():
                 conn.close()
                 return jsonify({'error': f'Failed to process image: {error_msg}'}), 400
             
+            filename = os.path.basename(full_path)
             relative_path = f"find-photos/{filename}"
             first_image_path = relative_path
             
@@ -2094,12 +2216,12 @@ def add_product_location():
 @app.route('/api/product-locations/<int:location_id>', methods=['GET'])
 def get_product_location(location_id):
     """Get a specific product location by ID"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute('''
-            SELECT id, product_name, location_name, image_path, notes, created_date, updated_date
+        cursor.execute(f'''
+            SELECT {PRODUCT_LOCATION.columns()}
             FROM product_location_photos 
             WHERE id = ?
         ''', (location_id,))
@@ -2110,28 +2232,9 @@ def get_product_location(location_id):
             conn.close()
             return jsonify({'error': 'Location not found'}), 404
         
-        # Get all images for this location (like in the list endpoint)
-        cursor.execute('''
-            SELECT image_path FROM product_location_images 
-            WHERE location_id = ? 
-            ORDER BY image_order
-        ''', (location_id,))
-        images = cursor.fetchall()
-        image_paths = [img[0] for img in images] if images else []
-        
+        location_dict = location_records(cursor, [location])[0]
         conn.close()
         
-        location_dict = {
-            'id': location[0],
-            'product_name': location[1],
-            'location_name': location[2],
-            'image_path': location[3],  # Main image (backward compatibility)
-            'image_paths': image_paths,  # All images
-            'notes': location[4],
-            'created_date': location[5],
-            'updated_date': location[6]
-        }
-        
         return jsonify({'Result': location_dict}), 200
         
     except Exception as e:
@@ -2143,7 +2246,7 @@ def update_product_location(location_id):
     """Update a product location with support for photo deletion"""
     data = request.json
     
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
@@ -2162,10 +2265,10 @@ def update_product_location(location_id):
                 try:
                     file_path = os.path.join(app.config['UPLOAD_FOLDER'], image_path)
                     if os.path.exists(file_path):
-                        os.remove(file_path)
-                        print(f"Deleted image file: {image_path}")
+                        remove_upload_file(file_path)
+                        logger.info('Deleted image file: %s', image_path)
                 except Exception as e:
-                    print(f"Error deleting image file {image_path}: {e}")
+                    logger.error('Error deleting image file %s: %s', image_path, e)
                 
                 # Delete from database
                 cursor.execute('DELETE FROM product_location_images WHERE location_id = ? AND image_path = ?', 
@@ -2177,7 +2280,7 @@ def update_product_location(location_id):
         
         if 'image_data_list' in data and data['image_data_list']:
             for i, image_data in enumerate(data['image_data_list']):
-                if image_data and image_data.startswith('data:image'):
+                if is_new_photo(image_data):
                     try:
                         # Process and save compressed image to find-photos folder
                         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -2187,13 +2290,15 @@ def update_product_location(location_id):
                             image_data, 
                             filename, 
                             app.config['FIND_PHOTOS_FOLDER'],
-                            compress=True
+                            compress=True,
+                            profile='location'
                         )
                         
                         if not success:
                             conn.close()
                             return jsonify({'error': f'Failed to process image: {error_msg}'}), 400
                         
+                        filename = os.path.basename(full_path)
                         # Save relative path
                         relative_path = f"find-photos/{filename}"
                         image_paths.append(relative_path)
@@ -2207,10 +2312,10 @@ def update_product_location(location_id):
                             VALUES (?, ?, ?)
                         ''', (location_id, relative_path, i))
                         
-                        print(f"New compressed location image saved: {filename}")
+                        logger.info('New compressed location image saved: %s', filename)
                     except Exception as img_error:
                         conn.close()
-                        print(f"Error processing location image: {img_error}")
+                        logger.error('Error processing location image: %s', img_error)
                         return jsonify({'error': f'Error processing image: {str(img_error)}'}), 400
         
         # Update main location record
@@ -2236,7 +2341,7 @@ def update_product_location(location_id):
         return jsonify({'Result': 'Product location updated successfully'})
         
     except Exception as e:
-        print(f"Error updating product location: {e}")
+        logger.error('Error updating product location: %s', e)
         if 'conn' in locals():
             conn.close()
         return jsonify({'error': str(e)}), 400
@@ -2244,7 +2349,7 @@ def update_product_location(location_id):
 @app.route('/api/product-locations/<int:location_id>', methods=['DELETE'])
 def delete_product_location(location_id):
     """Delete a product location and all associated photos"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
@@ -2273,14 +2378,14 @@ def delete_product_location(location_id):
                     file_path = os.path.join(app.config['UPLOAD_FOLDER'], main_image_path)
                 
                 if os.path.exists(file_path):
-                    os.remove(file_path)
+                    remove_upload_file(file_path)
                     deleted_files.append(main_image_path)
-                    print(f"✅ Deleted main location image: {file_path}")
+                    logger.info('Deleted main location image: %s', file_path)
                 else:
-                    print(f"⚠️ Main image file not found: {file_path}")
+                    logger.warning('Main image file not found: %s', file_path)
             except Exception as e:
                 failed_deletions.append(f"Main image ({main_image_path}): {str(e)}")
-                print(f"❌ Error deleting main image {main_image_path}: {e}")
+                logger.error('Error deleting main image %s: %s', main_image_path, e)
         
         # 2. Get and delete all additional images from product_location_images
         cursor.execute('SELECT image_path FROM product_location_images WHERE location_id = ?', (location_id,))
@@ -2296,14 +2401,14 @@ def delete_product_location(location_id):
                         file_path = os.path.join(app.config['UPLOAD_FOLDER'], image_path)
                     
                     if os.path.exists(file_path):
-                        os.remove(file_path)
+                        remove_upload_file(file_path)
                         deleted_files.append(image_path)
-                        print(f"✅ Deleted additional location image: {file_path}")
+                        logger.info('Deleted additional location image: %s', file_path)
                     else:
-                        print(f"⚠️ Additional image file not found: {file_path}")
+                        logger.warning('Additional image file not found: %s', file_path)
                 except Exception as e:
                     failed_deletions.append(f"Additional image ({image_path}): {str(e)}")
-                    print(f"❌ Error deleting additional image {image_path}: {e}")
+                    logger.error('Error deleting additional image %s: %s', image_path, e)
         
         # 3. Delete database records
         # Delete from product_location_images first (foreign key constraint)
@@ -2342,24 +2447,21 @@ def delete_product_location(location_id):
                 'message': 'Location deleted but some photo files could not be removed'
             }
         
-        print(f"🗑️ Location deletion completed:")
-        print(f"   📍 Location: {location_info[1]} - {location_info[2]}")
-        print(f"   📊 Database records deleted: {main_deleted + additional_deleted}")
-        print(f"   📸 Photo files deleted: {len(deleted_files)}")
-        if failed_deletions:
-            print(f"   ⚠️ Failed deletions: {len(failed_deletions)}")
+        logger.info('Deleted location %s - %s: %s database records, %s photo files, %s failed deletions',
+                    location_info[1], location_info[2], main_deleted + additional_deleted,
+                    len(deleted_files), len(failed_deletions))
         
         return jsonify(response_data)
         
     except Exception as e:
         conn.close()
-        print(f"❌ Error in delete_product_location: {e}")
+        logger.error('Error in delete_product_location: %s', e)
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/product-locations/suggestions/<query>', methods=['GET'])
 def get_product_suggestions(query):
     """Get product name suggestions for search"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute('''
         SELECT DISTINCT product_name FROM product_location_photos 
@@ -2374,42 +2476,23 @@ def get_product_suggestions(query):
     return jsonify({'Result': suggestion_list})
 
 # Sales Analytics APIs
+RECENT_SALE = TRANSACTION.extend('product_name', 'mrp')
+
 @app.route('/api/sales/summary', methods=['GET'])
 def get_sales_summary():
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Get sales summary for today
-    cursor.execute('''
-        SELECT 
-            COUNT(*) as total_sales,
-            SUM(quantity) as total_quantity_sold,
-            COUNT(DISTINCT recipient_phone) as unique_customers
-        FROM transactions 
-        WHERE transaction_type = 'OUT' 
-        AND date(transaction_date) = date('now')
-    ''')
-    today_stats = cursor.fetchone()
+    # Get sales summary for today (local date) from the daily rollups
+    today_stats = sales_analytics.day_summary(cursor, local_today())
     
     # Get top selling products
-    cursor.execute('''
-        SELECT 
-            t.barcode,
-            p.name,
-            SUM(t.quantity) as total_sold
-        FROM transactions t
-        LEFT JOIN products p ON t.barcode = p.barcode
-        WHERE t.transaction_type = 'OUT'
-        GROUP BY t.barcode
-        ORDER BY total_sold DESC
-        LIMIT 5
-    ''')
-    top_products = cursor.fetchall()
+    top_products = sales_analytics.top_products(cursor, 5)
     
     # Get recent sales
-    cursor.execute('''
+    cursor.execute(f'''
         SELECT 
-            t.*,
+            {TRANSACTION.columns('t')},
             p.name as product_name,
             p.mrp
         FROM transactions t
@@ -2418,7 +2501,7 @@ def get_sales_summary():
         ORDER BY t.transaction_date DESC
         LIMIT 10
     ''')
-    recent_sales = cursor.fetchall()
+    recent_sales_list = RECENT_SALE.records(cursor.fetchall())
     
     conn.close()
     
@@ -2431,22 +2514,6 @@ def get_sales_summary():
             'total_sold': product[2]
         })
     
-    recent_sales_list = []
-    for sale in recent_sales:
-        recent_sales_list.append({
-            'id': sale[0],
-            'barcode': sale[1],
-            'transaction_type': sale[2],
-            'quantity': sale[3],
-            'recipient_name': sale[4],
-            'recipient_phone': sale[5],
-            'recipient_photo': sale[6],
-            'transaction_date': sale[7],
-            'notes': sale[8],
-            'product_name': sale[9],
-            'mrp': sale[10]
-        })
-    
     return jsonify({
         'today_stats': {
             'total_sales': today_stats[0] or 0,
@@ -2457,275 +2524,151 @@ def get_sales_summary():
         'recent_sales': recent_sales_list
     })
 
+@app.route('/api/sales/analytics', methods=['GET'])
+def get_sales_analytics():
+    """
+    Sales per day, week or month between two dates, aggregated in SQL
+    
+    Query parameters: from, to (YYYY-MM-DD, local dates, inclusive; default
+    the last 30 days), bucket (day, week or month), group (product or
+    customer, adds the top `limit` series) and limit (default 5).
+    """
+    bucket = request.args.get('bucket', 'day')
+    group = request.args.get('group') or None
+    if bucket not in sales_analytics.BUCKETS:
+        return jsonify({'error': f"bucket must be one of {', '.join(sales_analytics.BUCKETS)}"}), 400
+    if group and group not in sales_analytics.GROUPS:
+        return jsonify({'error': f"group must be one of {', '.join(sales_analytics.GROUPS)}"}), 400
+    try:
+        end = sales_analytics.parse_date(request.args.get('to'), local_today())
+        start = sales_analytics.parse_date(request.args.get('from'), end - timedelta(days=29))
+        limit = int(request.args.get('limit', 5))
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD dates and limit a number'}), 400
+    if start > end:
+        return jsonify({'error': 'from must not be after to'}), 400
+    
+    conn = get_db_connection()
+    try:
+        analytics = sales_analytics.sales_analytics(conn.cursor(), start, end, bucket, group, max(1, min(limit, 50)))
+    finally:
+        conn.close()
+    
+    return json_response({'Result': analytics})
+
+def send_upload(folder, filename):
+    """Serve an uploaded photo, or a cached thumbnail of it when ?w=<width> is given"""
+    width = request.args.get('w', type=int)
+    if width:
+        return send_thumbnail(folder, filename, width)
+    
+    if app.config['UPLOAD_SENDFILE_MODE'] == 'x-accel':
+        source_path = safe_join(folder, filename)
+        if source_path is None or not os.path.isfile(source_path):
+            abort(404)
+        relative_path = os.path.relpath(source_path, app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+        response = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = app.config['X_ACCEL_REDIRECT_PREFIX'].rstrip('/') + '/' + relative_path
+        return cache_forever(response)
+    
+    # conditional responses give us ETag/Last-Modified, 304s and byte ranges
+    response = send_from_directory(folder, filename, conditional=True, etag=True,
+                                   max_age=app.config['PHOTO_CACHE_MAX_AGE'])
+    return cache_forever(response)
+
+def cache_forever(response):
+    """Mark a photo response as immutable for the configured max-age"""
+    if response.status_code in (200, 206, 304):
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config['PHOTO_CACHE_MAX_AGE']
+        response.cache_control.immutable = True
+    return response
+
+def send_thumbnail(folder, filename, width):
+    """Serve a resized copy of an uploaded photo, generating it on first request"""
+    source_path = safe_join(folder, filename)
+    if source_path is None or not os.path.isfile(source_path):
+        abort(404)
+    
+    # ?fmt=webp|jpeg picks the format explicitly, otherwise negotiate on Accept
+    fmt = request.args.get('fmt')
+    if fmt not in THUMBNAIL_FORMATS:
+        fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    if fmt == 'webp' and not image_processing.webp_supported():
+        fmt = 'jpeg'
+    
+    relative_path = os.path.relpath(source_path, app.config['UPLOAD_FOLDER'])
+    thumb_path = thumbnail_cache.get(source_path, relative_path, snap_width(width), fmt)
+    if thumb_path is None:
+        # Pillow missing or unreadable image - fall back to the original
+        # (not cached long-term so real thumbnails show up once Pillow is installed)
+        return send_from_directory(folder, filename)
+    
+    response = send_file(thumb_path, mimetype=THUMBNAIL_FORMATS[fmt][2], conditional=True,
+                         etag=True, max_age=app.config['PHOTO_CACHE_MAX_AGE'])
+    response.vary.add('Accept')
+    return cache_forever(response)
+
+@app.route('/thumbs/<int:width>/<path:filename>')
+def thumbnail(width, filename):
+    """Serve a thumbnail of any uploaded photo, e.g. /thumbs/160/product_photos/x.jpg"""
+    return send_thumbnail(app.config['UPLOAD_FOLDER'], filename, width)
+
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
     """Serve uploaded files from uploads directory and subdirectories"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return send_upload(app.config['UPLOAD_FOLDER'], filename)
 
 @app.route('/uploads/product_photos/<filename>')
 def product_photo(filename):
     """Serve product photos"""
-    return send_from_directory(app.config['PRODUCT_PHOTOS_FOLDER'], filename)
+    return send_upload(app.config['PRODUCT_PHOTOS_FOLDER'], filename)
 
 @app.route('/uploads/customer_photos/<filename>')
 def customer_photo(filename):
     """Serve customer photos"""
-    return send_from_directory(app.config['CUSTOMER_PHOTOS_FOLDER'], filename)
+    return send_upload(app.config['CUSTOMER_PHOTOS_FOLDER'], filename)
 
 @app.route('/uploads/find-photos/<filename>')
 def find_photo(filename):
     """Serve product location photos"""
-    return send_from_directory(app.config['FIND_PHOTOS_FOLDER'], filename)
+    return send_upload(app.config['FIND_PHOTOS_FOLDER'], filename)
 
-def compress_image(image_bytes, max_size_kb=300, quality=75, max_width=800, max_height=800):
-    """
-    Compress image to reduce file size while maintaining quality
-    
-    Args:
-        image_bytes: Raw image bytes
-        max_size_kb: Maximum file size in KB (default: 500KB)
-        quality: JPEG quality (1-100, default: 85 for good quality)
-        max_width: Maximum width in pixels (default: 1200px)
-        max_height: Maximum height in pixels (default: 1200px)
-    
-    Returns:
-        Compressed image bytes
-    """
-    # If Pillow is not available, return original bytes
-    if not COMPRESSION_AVAILABLE:
-        print("Compression skipped - Pillow not available")
-        return image_bytes
-        
-    try:
-        # Open image from bytes
-        img = Image.open(io.BytesIO(image_bytes))
-        
-        # Handle EXIF orientation to fix rotation issues from mobile cameras
-        try:
-            # Use Pillow's built-in EXIF transpose function (most reliable method)
-            from PIL import ImageOps
-            original_size = img.size
-            img = ImageOps.exif_transpose(img)
-            new_size = img.size
-            
-            if original_size != new_size:
-                print(f"EXIF orientation corrected: {original_size} → {new_size}")
-            else:
-                print("No EXIF orientation correction needed")
-                
-        except ImportError:
-            print("ImageOps not available, trying manual EXIF handling")
-            # Fallback to manual method if ImageOps is not available
-            try:
-                exif_dict = img.getexif() if hasattr(img, 'getexif') else None
-                if exif_dict:
-                    orientation = exif_dict.get(274)  # 274 is the EXIF orientation tag
-                    if orientation:
-                        print(f"EXIF orientation found: {orientation}")
-                        if orientation == 3:
-                            img = img.rotate(180, expand=True)
-                            print("Applied 180° rotation")
-                        elif orientation == 6:
-                            img = img.rotate(270, expand=True)
-                            print("Applied 270° rotation (correcting 90° CW)")
-                        elif orientation == 8:
-                            img = img.rotate(90, expand=True)
-                            print("Applied 90° rotation (correcting 90° CCW)")
-                else:
-                    print("No EXIF data available")
-            except Exception as fallback_e:
-                print(f"Fallback EXIF processing failed: {fallback_e}")
-        except Exception as e:
-            print(f"Error processing EXIF orientation: {e} - continuing without EXIF correction")
-            # Continue without EXIF processing if it fails
-        
-        # Convert to RGB if necessary (handles PNG with transparency, etc.)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # Create white background
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Get original dimensions
-        original_width, original_height = img.size
-        original_size_kb = len(image_bytes) / 1024
-        
-        print(f"Original image: {original_width}x{original_height}, {original_size_kb:.1f}KB")
-        
-        # Resize if image is too large
-        if original_width > max_width or original_height > max_height:
-            # Calculate new dimensions maintaining aspect ratio
-            ratio = min(max_width / original_width, max_height / original_height)
-            new_width = int(original_width * ratio)
-            new_height = int(original_height * ratio)
-            
-            # Resize with high-quality resampling
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            print(f"Resized to: {new_width}x{new_height}")
-        
-        # Compress with different quality levels until we reach target size
-        compressed_bytes = None
-        current_quality = quality
-        
-        for attempt in range(5):  # Try up to 5 different quality levels
-            output_buffer = io.BytesIO()
-            
-            # Save with current quality
-            img.save(output_buffer, format='JPEG', quality=current_quality, optimize=True)
-            compressed_bytes = output_buffer.getvalue()
-            compressed_size_kb = len(compressed_bytes) / 1024
-            
-            print(f"Attempt {attempt + 1}: Quality {current_quality}, Size: {compressed_size_kb:.1f}KB")
-            
-            # If size is acceptable, break
-            if compressed_size_kb <= max_size_kb or current_quality <= 60:
-                break
-            
-            # Reduce quality for next attempt
-            current_quality = max(60, current_quality - 10)
-        
-        final_size_kb = len(compressed_bytes) / 1024
-        compression_ratio = (original_size_kb / final_size_kb) if final_size_kb > 0 else 1
-        
-        print(f"Final compressed image: {final_size_kb:.1f}KB (compression ratio: {compression_ratio:.1f}x)")
-        
-        return compressed_bytes
-        
-    except Exception as e:
-        print(f"Error compressing image: {e}")
-        # Return original bytes if compression fails
-        return image_bytes
+def is_new_photo(value):
+    """True for photo data that still has to be saved: a data URL or an "upload:<id>" chunked upload"""
+    return isinstance(value, str) and (value.startswith('data:image') or is_upload_ref(value))
 
-def process_and_save_image(base64_data, filename, folder_path, compress=True):
-    """
-    Process base64 image data, compress it intelligently, and save to specified folder
-    
-    Args:
-        base64_data: Base64 encoded image data (with or without data URL prefix)
-        filename: Name for the saved file
-        folder_path: Full path to the folder where image should be saved
-        compress: Whether to compress the image (default: True)
-    
-    Returns:
-        Tuple: (success: bool, file_path: str, error_message: str)
-    """
-    try:
-        print(f"🔧 DEBUG: Starting image processing for {filename}")
-        print(f"🔧 DEBUG: Input data length: {len(base64_data) if base64_data else 0} characters")
-        
-        if not base64_data or len(base64_data) < 100:
-            error_msg = f"Invalid or too short base64 data: {len(base64_data) if base64_data else 0} characters"
-            print(f"❌ {error_msg}")
-            return False, "", error_msg
-        
-        # Remove data URL prefix if present
-        original_data = base64_data
-        if ',' in base64_data:
-            prefix, base64_data = base64_data.split(',', 1)
-            print(f"🔧 DEBUG: Removed data URL prefix: {prefix}")
-        
-        print(f"🔧 DEBUG: Base64 data length after cleanup: {len(base64_data)} characters")
-        
-        # Fix base64 padding - SIMPLE APPROACH
-        base64_data = base64_data.strip()  # Remove any whitespace
-        # Add padding to make it a multiple of 4
-        while len(base64_data) % 4 != 0:
-            base64_data += '='
-        
-        print(f"🔧 DEBUG: Fixed base64 length: {len(base64_data)} characters")
-        
-        # Decode full base64
+def process_and_save_image(base64_data, filename, folder_path, compress=True, profile='default'):
+    """Decode, compress and save an uploaded photo, keeping the upload index current
+    (once create_app() has built it; scripts may call this without one)"""
+    stats = {}
+    on_saved = upload_index.add if upload_index is not None else None
+    if is_upload_ref(base64_data):
+        # Completed chunked upload: already raw bytes, skip the base64 step
         try:
-            image_bytes = base64.b64decode(base64_data)
-            original_size_kb = len(image_bytes) / 1024
-            print(f"🔧 DEBUG: Decoded image: {len(image_bytes)} bytes ({original_size_kb:.1f}KB)")
-        except Exception as decode_error:
-            error_msg = f"Base64 decode failed: {str(decode_error)}"
-            print(f"❌ {error_msg}")
-            return False, "", error_msg
-        
-        if len(image_bytes) < 1000:  # Less than 1KB is suspicious
-            error_msg = f"Decoded image too small: {len(image_bytes)} bytes"
-            print(f"❌ {error_msg}")
-            return False, "", error_msg
-        
-        # Apply aggressive compression to save space
-        if compress and COMPRESSION_AVAILABLE:
-            print(f"🔧 DEBUG: Applying aggressive compression...")
-            try:
-                # Test if it's a valid image first
-                test_img = Image.open(io.BytesIO(image_bytes))
-                test_img.verify()  # This will raise an exception if not a valid image
-                print(f"🔧 DEBUG: Image format validation passed: {test_img.format}")
-                
-                # Re-open for processing (verify() closes the image)
-                image_bytes = base64.b64decode(base64_data)
-                
-                # Apply minimal compression to keep text very clear
-                print(f"Compressing image ({original_size_kb:.1f}KB) with minimal compression for text clarity...")
-                image_bytes = compress_image(
-                    image_bytes, 
-                    max_size_kb=150,     # Larger target size for excellent quality
-                    quality=80,          # Much higher quality for clear text
-                    max_width=1000,      # Larger dimensions for excellent text clarity
-                    max_height=1000
-                )
-                
-                compressed_size_kb = len(image_bytes) / 1024
-                print(f"✅ Compressed: {original_size_kb:.1f}KB → {compressed_size_kb:.1f}KB (saved {original_size_kb - compressed_size_kb:.1f}KB)")
-            except Exception as img_error:
-                print(f"⚠️ WARNING: Image compression failed: {str(img_error)}")
-                print(f"🔧 DEBUG: Saving original image")
-                # Use original image_bytes if compression fails
-                image_bytes = base64.b64decode(base64_data)
-        elif compress and not COMPRESSION_AVAILABLE:
-            print(f"Compression requested but Pillow not available. Saving original image: {original_size_kb:.1f}KB")
-        else:
-            print(f"Compression disabled. Saving original image: {original_size_kb:.1f}KB")
-        
-        # Final validation before saving
-        if len(image_bytes) < 100:
-            error_msg = f"Final image data too small: {len(image_bytes)} bytes"
-            print(f"❌ {error_msg}")
-            return False, "", error_msg
-        
-        # Save to file
-        full_path = os.path.join(folder_path, filename)
-        print(f"🔧 DEBUG: Saving to: {full_path}")
-        
-        with open(full_path, 'wb') as f:
-            f.write(image_bytes)
-        
-        # Verify file was saved correctly
-        if os.path.exists(full_path):
-            file_size = os.path.getsize(full_path)
-            print(f"🔧 DEBUG: File saved successfully: {file_size} bytes")
-            if file_size != len(image_bytes):
-                print(f"⚠️ WARNING: File size mismatch! Expected: {len(image_bytes)}, Got: {file_size}")
-        else:
-            error_msg = "File was not created"
-            print(f"❌ {error_msg}")
-            return False, "", error_msg
-        
-        return True, full_path, ""
-        
-    except Exception as e:
-        error_msg = f"Error processing image: {str(e)}"
-        print(f"❌ {error_msg}")
-        import traceback
-        print(f"🔧 DEBUG: Full traceback: {traceback.format_exc()}")
-        return False, "", error_msg
+            image_bytes = chunked_uploads.read(base64_data)
+        except UploadError as e:
+            return False, "", str(e)
+        result = image_processing.save_image_bytes(
+            image_bytes, filename, folder_path, compress=compress, profile=profile,
+            on_saved=on_saved, stats=stats
+        )
+        if result[0]:
+            chunked_uploads.discard(base64_data)
+    else:
+        result = image_processing.process_and_save_image(
+            base64_data, filename, folder_path, compress=compress, profile=profile,
+            on_saved=on_saved, stats=stats
+        )
+    metrics.record_compression(profile, stats)
+    return result
 
 def is_photo_used_by_other_transactions(photo_path, excluding_transaction_id=None):
     """Check if a photo is still being used by other transactions"""
     if not photo_path or photo_path.startswith('data:image'):
         return False
     
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
@@ -2752,7 +2695,7 @@ def safe_delete_photo(photo_path, excluding_transaction_id=None):
     
     # Check if photo is still being used
     if is_photo_used_by_other_transactions(photo_path, excluding_transaction_id):
-        print(f'Photo {photo_path} is still being used by other transactions, skipping deletion')
+        logger.info('Photo %s is still being used by other transactions, skipping deletion', photo_path)
         return False
     
     # Determine file path
@@ -2765,11 +2708,11 @@ def safe_delete_photo(photo_path, excluding_transaction_id=None):
     # Delete file if it exists
     if os.path.exists(file_path):
         try:
-            os.remove(file_path)
-            print(f'Successfully deleted photo: {photo_path}')
+            remove_upload_file(file_path)
+            logger.info('Successfully deleted photo: %s', photo_path)
             return True
         except Exception as e:
-            print(f'Failed to delete photo {photo_path}: {e}')
+            logger.error('Failed to delete photo %s: %s', photo_path, e)
             return False
     
     return False
@@ -2783,7 +2726,7 @@ def force_delete_customer_old_photos(customer_name, customer_phone, new_photo_pa
         return
     
     try:
-        conn = sqlite3.connect('inventory.db')
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Get all old photos for this customer that are different from the new one
@@ -2799,6 +2742,7 @@ def force_delete_customer_old_photos(customer_name, customer_phone, new_photo_pa
         conn.close()
         
         # Delete each old photo file
+        deleted_photos = []
         for (old_photo,) in old_photos:
             if old_photo and not old_photo.startswith('data:image'):
                 # Determine file path
@@ -2811,13 +2755,16 @@ def force_delete_customer_old_photos(customer_name, customer_phone, new_photo_pa
                 # Delete file if it exists
                 if os.path.exists(file_path):
                     try:
-                        os.remove(file_path)
-                        print(f'Force deleted old customer photo: {old_photo}')
+                        remove_upload_file(file_path)
+                        deleted_photos.append(old_photo)
+                        logger.info('Force deleted old customer photo: %s', old_photo)
                     except Exception as e:
-                        print(f'Failed to force delete photo {old_photo}: {e}')
+                        logger.error('Failed to force delete photo %s: %s', old_photo, e)
+        
+        forget_deleted_photos(deleted_photos)
         
     except Exception as e:
-        print(f'Error in force_delete_customer_old_photos: {e}')
+        logger.error('Error in force_delete_customer_old_photos: %s', e)
 
 @app.route('/api/photos/delete', methods=['DELETE'])
 def delete_photo():
@@ -2835,11 +2782,11 @@ def delete_photo():
         if photo_path.startswith('data:image'):
             return jsonify({'message': 'Base64 images don\'t need server deletion'}), 200
         
-        print(f'🗑️ Deleting photo: {photo_path} for customer: {customer_name} ({customer_phone})')
+        logger.info('Deleting photo: %s for customer: %s (%s)', photo_path, customer_name, customer_phone)
         
         # Update database to remove this photo from all transactions
         if customer_name and customer_phone:
-            conn = sqlite3.connect('inventory.db')
+            conn = get_db_connection()
             cursor = conn.cursor()
             
             try:
@@ -2880,7 +2827,7 @@ def delete_photo():
                                 ''', (new_photo_data, trans_id))
                                 
                                 updated_count += 1
-                                print(f'✅ Updated transaction {trans_id} - removed photo from array')
+                                logger.debug('Updated transaction %s - removed photo from array', trans_id)
                         
                         # Handle single photo
                         elif current_photo_data == photo_path:
@@ -2891,7 +2838,7 @@ def delete_photo():
                             ''', (trans_id,))
                             
                             updated_count += 1
-                            print(f'✅ Updated transaction {trans_id} - removed single photo')
+                            logger.debug('Updated transaction %s - removed single photo', trans_id)
                     
                     except json.JSONDecodeError:
                         # Handle single photo (not JSON)
@@ -2903,22 +2850,23 @@ def delete_photo():
                             ''', (trans_id,))
                             
                             updated_count += 1
-                            print(f'✅ Updated transaction {trans_id} - removed single photo (non-JSON)')
+                            logger.debug('Updated transaction %s - removed single photo (non-JSON)', trans_id)
                 
                 conn.commit()
                 conn.close()
                 
-                print(f'🔄 Updated {updated_count} transactions in database')
+                logger.info('Updated %s transactions in database', updated_count)
                 
             except Exception as db_error:
                 conn.close()
-                print(f'❌ Database update error: {db_error}')
+                logger.error('Database update error: %s', db_error)
                 # Continue with file deletion even if database update fails
         
         # Now delete the actual file
         success = safe_delete_photo(photo_path)
         
         if success:
+            forget_deleted_photos([photo_path])
             return jsonify({
                 'message': 'Photo deleted successfully', 
                 'database_updated': updated_count if 'updated_count' in locals() else 0
@@ -2927,80 +2875,32 @@ def delete_photo():
             return jsonify({'message': 'Photo not found or still in use by other transactions'})
     
     except Exception as e:
-        print(f'Error in delete_photo endpoint: {e}')
+        logger.error('Error in delete_photo endpoint: %s', e)
         return jsonify({'error': str(e)}), 500
 
 def get_local_ip():
-    """Get the local IP address of the machine"""
-    import socket
-    try:
-        # Connect to a remote server to determine local IP
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-            s.connect(("8.8.8.8", 80))
-            local_ip = s.getsockname()[0]
-        return local_ip
-    except Exception:
-        # Fallback method
-        try:
-            hostname = socket.gethostname()
-            local_ip = socket.gethostbyname(hostname)
-            if local_ip.startswith("127."):
-                # If we get localhost, try a different approach
-                import subprocess
-                import platform
-                if platform.system() == "Windows":
-                    result = subprocess.run(['ipconfig'], capture_output=True, text=True)
-                    lines = result.stdout.split('\n')
-                    for line in lines:
-                        if 'IPv4 Address' in line and '192.168' in line:
-                            local_ip = line.split(':')[-1].strip()
-                            break
-                else:
-                    result = subprocess.run(['ifconfig'], capture_output=True, text=True)
-                    # Parse ifconfig output for IP
-                    lines = result.stdout.split('\n')
-                    for line in lines:
-                        if 'inet ' in line and '192.168' in line:
-                            local_ip = line.split()[1]
-                            break
-            return local_ip
-        except Exception:
-            return "localhost"
+    """Get the local IP address of the machine (cached, see discovery.LocalAddress)"""
+    return local_address.get()
 
 @app.route('/api/server-info', methods=['GET'])
 def get_server_info():
     """Get server information including current IP"""
-    local_ip = get_local_ip()
-    return jsonify({
-        'ip': local_ip,
-        'port': 8080,
-        'url': f'http://{local_ip}:8080'
-    })
+    return jsonify(server_address())
 
 @app.route('/api/debug/transaction/<int:transaction_id>', methods=['GET'])
 def debug_transaction(transaction_id):
     """Debug endpoint to check if a transaction exists"""
-    conn = sqlite3.connect('inventory.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute('SELECT * FROM transactions WHERE id = ?', (transaction_id,))
-        transaction = cursor.fetchone()
+        cursor.execute(f'SELECT {TRANSACTION.columns()} FROM transactions WHERE id = ?', (transaction_id,))
+        transaction = TRANSACTION.record(cursor.fetchone())
         
         if transaction:
             return jsonify({
                 'exists': True,
-                'transaction': {
-                    'id': transaction[0],
-                    'barcode': transaction[1],
-                    'transaction_type': transaction[2],
-                    'quantity': transaction[3],
-                    'recipient_name': transaction[4],
-                    'recipient_phone': transaction[5],
-                    'recipient_photo': transaction[6],
-                    'transaction_date': transaction[7],
-                    'notes': transaction[8]
-                }
+                'transaction': transaction
             })
         else:
             return jsonify({
@@ -3012,22 +2912,84 @@ def debug_transaction(transaction_id):
     finally:
         conn.close()
 
-if __name__ == '__main__':
+def create_app(config=None):
+    """
+    Application factory for serve.py, asgi.py and app.py itself
+    
+    config overrides app.config. The first call creates the upload folders,
+    opens and migrates the database, builds the caches and starts the
+    background threads; later calls only apply config.
+    """
+    global thumbnail_cache, upload_index, chunked_uploads, discovery_responder, photo_collector, event_stream_slots, _initialized
+    if config:
+        app.config.update(config)
+    with _init_lock:
+        if _initialized:
+            return app
+        configure_logging()
+        
+        from flask_cors import CORS
+        CORS(app)  # Allow cross-origin requests
+        
+        for folder in [app.config['UPLOAD_FOLDER'], app.config['PRODUCT_PHOTOS_FOLDER'],
+                       app.config['CUSTOMER_PHOTOS_FOLDER'], app.config['FIND_PHOTOS_FOLDER'],
+                       app.config['THUMBNAIL_CACHE_FOLDER']]:
+            os.makedirs(folder, exist_ok=True)
+        
+        init_db()
+        
+        event_stream_slots = threading.BoundedSemaphore(event_stream_limit())
+        thumbnail_cache = ThumbnailCache(
+            app.config['THUMBNAIL_CACHE_FOLDER'],
+            app.config['THUMBNAIL_CACHE_MAX_MB'] * 1024 * 1024
+        )
+        upload_index = UploadIndex(app.config['UPLOAD_FOLDER']).build()
+        upload_index.start_watching(app.config['UPLOAD_INDEX_POLL_SECONDS'])
+        chunked_uploads = ChunkedUploadStore(
+            app.config['CHUNKED_UPLOAD_FOLDER'],
+            max_upload_size=app.config['CHUNKED_UPLOAD_MAX_MB'] * 1024 * 1024,
+            idle_timeout=app.config['CHUNKED_UPLOAD_IDLE_SECONDS']
+        )
+        chunked_uploads.start_collecting(300)
+        photo_collector = PhotoGarbageCollector(
+            app.config['DATABASE'],
+            app.config['UPLOAD_FOLDER'],
+            max_files_per_second=app.config['PHOTO_GC_FILES_PER_SECOND'],
+            min_age_seconds=app.config['PHOTO_GC_MIN_AGE_SECONDS'],
+            remove_file=remove_upload_file
+        )
+        
+        local_address.start_watching(app.config['LOCAL_IP_POLL_SECONDS'])
+        discovery_responder = DiscoveryResponder(server_address, app.config['DISCOVERY_PORT'])
+        discovery_responder.start()
+        
+        _initialized = True
+    return app
+
+def print_startup_banner(port=8080):
     local_ip = get_local_ip()
     
     print("=" * 60)
     print("🚀 INVENTORY MANAGEMENT SERVER STARTING...")
     print("=" * 60)
-    print(f"📱 Mobile App URL: http://{local_ip}:8080")
-    print(f"🌐 Local Access:   http://localhost:8080")
-    print(f"💻 Web Dashboard: http://{local_ip}:8080")
+    print(f"📱 Mobile App URL: http://{local_ip}:{port}")
+    print(f"🌐 Local Access:   http://localhost:{port}")
+    print(f"💻 Web Dashboard: http://{local_ip}:{port}")
     print("=" * 60)
     print("📋 Copy this URL to your mobile app settings:")
-    print(f"   {local_ip}:8080")
+    print(f"   {local_ip}:{port}")
     print("=" * 60)
     print("✨ Server will auto-update IP when network changes")
+    if discovery_responder and discovery_responder.port > 0:
+        print(f"📡 Apps on this network can use Auto-Detect (UDP port {discovery_responder.port})")
     print("🔄 Refresh your app to get the latest server URL")
     print("\n⚡ Press Ctrl+C to stop the server")
     print("=" * 60)
-    
-    app.run(host='0.0.0.0', port=8080, debug=True) 
\ No newline at end of file
+
+if __name__ == '__main__':
+    # Development server only; use serve.py (or start_server.bat) to run the shop server.
+    # FLASK_DEBUG=1 turns on the debugger and reloader.
+    port = int(os.environ.get('SERVER_PORT', 8080))
+    create_app({'SERVER_PORT': port})
+    print_startup_banner(port)
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -0,0 +1,298 @@
+"""
+ASGI entry point with an async read path for the dashboard's polling endpoints.
+
+Every open dashboard tab fetches /api/stats, /api/products and
+/api/transactions (and per-barcode lookups) every 15 seconds. Under a
+thread-per-request server each of those holds an OS thread for the whole
+request. Here they are coroutines: the SQLite query and JSON encoding run
+on a small, fixed pool of reader threads, each with its own read-only
+connection, and waiting clients cost no thread at all, which also leaves
+room for many idle long-poll or SSE connections. The /api/events stream is
+one of those: a coroutine per client that polls the change feed through
+the reader threads, with no limit on open streams.
+
+Every other request (writes, photos, the dashboard page) is handed to the
+Flask app unchanged on a separate thread pool, so one port serves
+everything. Run it with any ASGI server, for example:
+    python serve.py --server uvicorn
+    uvicorn asgi:create_asgi_app --factory --host 0.0.0.0 --port 8080
+"""
+
+import asyncio
+import io
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import change_feed
+import compression
+import metrics
+import read_queries
+import records
+
+
+class ReadConnectionPool:
+    """A fixed set of threads, each holding one read-only SQLite connection"""
+
+    def __init__(self, database, size=4):
+        self.database = os.path.abspath(database)
+        self.size = size
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='sqlite-read')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f'file:{self.database}?mode=ro', uri=True, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    async def run(self, work):
+        """Await work(cursor) run on one of the reader threads"""
+        def call():
+            cursor = self._connection().cursor()
+            try:
+                return work(cursor)
+            finally:
+                cursor.close()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def compressed(result, encoding):
+    """(status, body, encoding) with body compressed when it is worth it; encoding None if not"""
+    status, body = result
+    if encoding is None or len(body) < compression.MIN_SIZE:
+        return status, body, None
+    return status, compression.compress(body, encoding), encoding
+
+
+def header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def send_response(send, status, body, content_type=b'application/json', headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode()),
+                    (b'access-control-allow-origin', b'*'), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+class WSGIBridge:
+    """Run a WSGI app for one ASGI request on a thread pool"""
+
+    def __init__(self, wsgi_app, threads=8):
+        self.wsgi_app = wsgi_app
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    def _environ(self, scope, body):
+        server_name, server_port = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server_name,
+            'SERVER_PORT': str(server_port),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[name] = value
+            else:
+                key = f'HTTP_{name}'
+                environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+    def _call(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            body = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], body
+
+    async def __call__(self, scope, receive, send):
+        body = await read_body(receive)
+        status, headers, body = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._call, self._environ(scope, body)
+        )
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class ReadPathApp:
+    """ASGI app: async handlers for the read-only endpoints, Flask for the rest"""
+
+    def __init__(self, wsgi_app, database='inventory.db', read_threads=4, wsgi_threads=8, event_stream_seconds=300):
+        self.pool = ReadConnectionPool(database, read_threads)
+        self.fallback = WSGIBridge(wsgi_app, wsgi_threads)
+        self.event_stream_seconds = event_stream_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        if scope['method'] == 'GET' and scope['path'] == '/api/events':
+            await self._events(scope, receive, send)
+            return
+
+        route, handler = self._route(scope)
+        if handler is None:
+            await self.fallback(scope, receive, send)  # Flask records its own metrics
+            return
+        started = time.perf_counter()
+        metrics.http_in_flight.inc()
+        encoding = compression.choose_encoding(header(scope, b'accept-encoding'))
+        headers = [(b'vary', b'Accept-Encoding')]
+        try:
+            # Query, JSON encoding (records.dumps) and compression all happen on the reader thread
+            status, body, encoding = await self.pool.run(lambda cursor: compressed(handler(cursor), encoding))
+        except Exception as e:
+            status, body, encoding = 500, records.dumps({'error': str(e)}), None
+        if encoding:
+            headers.append((b'content-encoding', encoding.encode()))
+        try:
+            await send_response(send, status, body, headers=headers)
+        finally:
+            metrics.http_in_flight.dec()
+            metrics.observe_request(route, 'GET', status, time.perf_counter() - started, len(body))
+
+    def _route(self, scope):
+        """(route template, handler(cursor) -> (status, body)) for a read-only request;
+        the handler is None for requests handed to Flask"""
+        if scope['method'] != 'GET':
+            return None, None
+        path = scope['path']
+        if path == '/api/products':
+            return path, lambda cursor: (200, records.dumps({'Result': read_queries.list_products(cursor)}))
+        if path == '/api/transactions':
+            barcode = parse_qs(scope.get('query_string', b'').decode()).get('barcode', [None])[0]
+            return path, lambda cursor: (
+                200, records.dumps({'Result': read_queries.list_transactions(cursor, barcode)}))
+        if path == '/api/stats':
+            return path, lambda cursor: (200, records.dumps(read_queries.get_stats(cursor)))
+        if path == '/api/products/low-stock':
+            return path, lambda cursor: (200, records.dumps({'Result': read_queries.list_low_stock(cursor)}))
+        parts = path.split('/')
+        if len(parts) == 4 and parts[:3] == ['', 'api', 'products'] and parts[3]:
+            return '/api/products/<barcode>', lambda cursor: self._product(cursor, parts[3])
+        return None, None
+
+    @staticmethod
+    def _product(cursor, barcode):
+        product = read_queries.get_product(cursor, barcode)
+        if not product:
+            return 404, records.dumps({'error': 'Product not found'})
+        return 200, records.dumps({'Result': product})
+
+    async def _events(self, scope, receive, send):
+        """The /api/events stream (see change_feed.stream); no thread is held between polls"""
+        since = parse_qs(scope.get('query_string', b'').decode()).get('since', [None])[0]
+        requested_id = change_feed.parse_event_id(header(scope, b'last-event-id') or since)
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            last_id, opening = await self.pool.run(lambda cursor: change_feed.open_stream(cursor, requested_id))
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+                            (b'x-accel-buffering', b'no'), (b'access-control-allow-origin', b'*')],
+            })
+            await send({'type': 'http.response.body', 'body': opening, 'more_body': True})
+            loop = asyncio.get_running_loop()
+            started = last_sent = loop.time()
+            while loop.time() - started < self.event_stream_seconds:
+                try:
+                    await asyncio.wait_for(disconnected.wait(), change_feed.POLL_SECONDS)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+                last_id, chunk = await self.pool.run(
+                    lambda cursor, after=last_id: change_feed.read_events(cursor, after))
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    last_sent = loop.time()
+                elif loop.time() - last_sent >= change_feed.KEEPALIVE_SECONDS:
+                    await send({'type': 'http.response.body', 'body': change_feed.KEEPALIVE, 'more_body': True})
+                    last_sent = loop.time()
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            watcher.cancel()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.pool.close()
+                self.fallback.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(config=None, read_threads=None, wsgi_threads=None):
+    """ASGI application factory (uvicorn --factory asgi:create_asgi_app)"""
+    from app import create_app
+    flask_app = create_app(config)
+    return ReadPathApp(
+        flask_app,
+        database=flask_app.config['DATABASE'],
+        read_threads=read_threads or int(os.environ.get('ASGI_READ_THREADS', 4)),
+        wsgi_threads=wsgi_threads or int(os.environ.get('SERVER_THREADS', 8)),
+        event_stream_seconds=flask_app.config['EVENT_STREAM_SECONDS'],
+    )
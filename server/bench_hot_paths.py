@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the functions behind the busiest endpoints.
+
+Calls the view functions directly (inside a Flask request context, without
+HTTP or compression) against synthetic databases of several sizes built by
+make_synthetic_db.py, so it shows how each one scales with history:
+
+    get_transactions, get_transactions?barcode=, get_grouped_transactions,
+    search_products, get_product_locations, get_stats
+
+plus the photo path, which does not depend on the database:
+
+    compress_image (12 MP phone photo), process_and_save_image (base64 upload)
+
+Every case gets a warm-up call and is then repeated for at least --min-time
+seconds and --min-rounds rounds; min, median, mean and stddev are reported.
+Save the results with --json and compare a later run with --compare: any
+case whose fastest round is more than --threshold percent slower is flagged
+and the exit status is 1, so the comparison can gate a change. (The
+fastest round is compared because it moves least with other load on the
+machine; the slow cases only get a handful of rounds.)
+
+Usage (from the server directory):
+    python bench_hot_paths.py                                 # 1k, 10k, 100k transactions
+    python bench_hot_paths.py --sizes 1000,1000000 --db-dir ~/bench_dbs
+    python bench_hot_paths.py --json baseline.json
+    python bench_hot_paths.py --compare baseline.json --threshold 10
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import app
+import image_processing
+from bench_image_pipeline import synthetic_photo
+from make_synthetic_db import build as build_synthetic_db
+
+DAYS = 90
+ITEMS_PER_SALE = 2.5  # Mean of make_synthetic_db's items-per-sale choices
+
+# (name, path, view function name); the path sets request.args for the view
+DB_CASES = (
+    ('get_transactions', '/api/transactions', 'get_transactions'),
+    ('get_transactions[barcode]', '/api/transactions?barcode={barcode}', 'get_transactions'),
+    ('get_grouped_transactions', '/api/transactions/grouped', 'get_grouped_transactions'),
+    ('search_products', '/api/products/search/Rice', 'search_products'),
+    ('get_product_locations', '/api/product-locations?page=2&per_page=10', 'get_product_locations'),
+    ('get_stats', '/api/stats', 'get_stats'),
+)
+
+
+def database_for(size, db_dir, seed):
+    """Path of a synthetic database with about `size` transactions, built unless db_dir already has it"""
+    path = os.path.join(db_dir, f'synthetic_{size}_{seed}.db')
+    if not os.path.exists(path):
+        print(f"Building a database with ~{size} transactions...")
+        started = time.perf_counter()
+        counts = build_synthetic_db(
+            path,
+            products=min(20000, max(200, size // 20)),
+            customers=min(5000, max(50, size // 100)),
+            days=DAYS,
+            sales_per_day=max(1, round(size / DAYS / ITEMS_PER_SALE)),
+            seed=seed,
+        )
+        print(f"   {counts['transactions']} transactions, {counts['products']} products "
+              f"in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def measure(call, min_rounds, min_time, max_rounds=1000):
+    """Seconds per call: one warm-up, then rounds until both minimums are met"""
+    call()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_rounds and (len(timings) < min_rounds or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - t0)
+    ms = [t * 1000 for t in timings]
+    return {
+        'ms_min': round(min(ms), 3),
+        'ms_median': round(statistics.median(ms), 3),
+        'ms_mean': round(statistics.mean(ms), 3),
+        'ms_stddev': round(statistics.stdev(ms), 3) if len(ms) > 1 else 0.0,
+        'rounds': len(ms),
+    }
+
+
+def view_call(path, view):
+    """Call a view as Flask would for a GET of path; returns the body size"""
+    def call():
+        with app.app.test_request_context(path):
+            args = app.app.url_map.bind('localhost').match(path.split('?')[0])[1]
+            return len(view(**args).get_data())
+    return call
+
+
+def bench_database(database, args):
+    app.app.config['DATABASE'] = database
+    conn = app.get_db_connection()
+    barcode = conn.execute('''
+        SELECT barcode FROM transactions GROUP BY barcode ORDER BY COUNT(*) DESC LIMIT 1
+    ''').fetchone()[0]
+    transactions = conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+    conn.close()
+
+    results = {}
+    for name, path, view_name in DB_CASES:
+        call = view_call(path.format(barcode=barcode), getattr(app, view_name))
+        result = measure(call, args.min_rounds, args.min_time)
+        result['response_kb'] = round(call() / 1024, 1)
+        results[name] = result
+        print(f"   {name:28} {result['ms_median']:>10.2f} ms  ({result['rounds']} rounds)")
+    return transactions, results
+
+
+def phone_photo():
+    """A 12 MP JPEG, like a phone camera upload"""
+    buffer = io.BytesIO()
+    synthetic_photo(4032, 3024, seed=1).save(buffer, format='JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def bench_images(workdir, args):
+    photo = phone_photo()
+    upload = 'data:image/jpeg;base64,' + base64.b64encode(photo).decode()
+    folder = os.path.join(workdir, 'bench_photos')
+    os.makedirs(folder, exist_ok=True)
+
+    def save():
+        success, full_path, error = app.process_and_save_image(upload, 'bench.jpg', folder, profile='customer')
+        if not success:
+            raise RuntimeError(error)
+        app.remove_upload_file(full_path)
+
+    results = {}
+    for name, call in (('compress_image', lambda: image_processing.compress_image(photo)),
+                       ('process_and_save_image', save)):
+        results[name] = measure(call, args.min_rounds, args.min_time)
+        print(f"   {name:28} {results[name]['ms_median']:>10.2f} ms  ({results[name]['rounds']} rounds)")
+    return results
+
+
+def print_report(report):
+    sizes = list(report['databases'])
+    names = [name for name, _, _ in DB_CASES]
+    print("\nMedian ms per call by number of transactions")
+    print(f"{'':28}" + ''.join(f"{report['databases'][size]['transactions']:>12}" for size in sizes))
+    for name in names:
+        print(f"{name:28}" + ''.join(f"{report['databases'][size]['cases'][name]['ms_median']:>12.2f}"
+                                     for size in sizes))
+    for name, result in report['images'].items():
+        print(f"{name:28}{result['ms_median']:>12.2f}")
+
+
+def compare(report, baseline, threshold):
+    """Print changes in the fastest round against baseline; returns the list of regressions"""
+    print(f"\nCompared with {baseline['meta']['date']} (threshold {threshold:+.0f}%)")
+    regressions = []
+    pairs = [(f"{name} @{size}", result, baseline['databases'].get(size, {}).get('cases', {}).get(name))
+             for size, database in report['databases'].items() for name, result in database['cases'].items()]
+    pairs += [(name, result, baseline['images'].get(name)) for name, result in report['images'].items()]
+    for label, result, old in pairs:
+        if old is None:
+            print(f"   {label:40} not in baseline")
+            continue
+        change = (result['ms_min'] - old['ms_min']) / old['ms_min'] * 100
+        flag = ''
+        if change > threshold:
+            flag = '  ❌ REGRESSION'
+            regressions.append(label)
+        elif change < -threshold:
+            flag = '  ✅ faster'
+        print(f"   {label:40} {old['ms_min']:>10.2f} -> {result['ms_min']:>10.2f} ms ({change:+.1f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the functions behind the busiest endpoints')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma-separated transaction counts of the synthetic databases')
+    parser.add_argument('--db-dir', help='keep the synthetic databases here and reuse them on later runs')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-rounds', type=int, default=5, help='fewest timed calls per case')
+    parser.add_argument('--min-time', type=float, default=1.0, help='least seconds spent timing each case')
+    parser.add_argument('--no-images', action='store_true', help='skip compress_image and process_and_save_image')
+    parser.add_argument('--json', help='write the results to this file (a baseline for --compare)')
+    parser.add_argument('--compare', help='earlier --json output to compare against')
+    parser.add_argument('--threshold', type=float, default=20.0,
+                        help='percent slower (fastest round) that counts as a regression')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_dir = os.path.expanduser(args.db_dir) if args.db_dir else workdir
+        os.makedirs(db_dir, exist_ok=True)
+        databases = {size: database_for(size, db_dir, args.seed) for size in sizes}
+
+        # Upload folders and the scratch database are relative paths; keep them out of the real ones
+        os.chdir(workdir)
+        # Per-photo log lines would be timed too
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        app.create_app({'DATABASE': databases[sizes[0]], 'DISCOVERY_PORT': 0})
+
+        report = {
+            'meta': {
+                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': args.seed,
+                'min_rounds': args.min_rounds,
+                'min_time': args.min_time,
+            },
+            'databases': {},
+            'images': {},
+        }
+        for size in sizes:
+            print(f"\n▶ {size} transactions")
+            transactions, cases = bench_database(databases[size], args)
+            report['databases'][str(size)] = {'transactions': transactions, 'cases': cases}
+        if not args.no_images:
+            print('\n▶ photos')
+            report['images'] = bench_images(workdir, args)
+
+    print_report(report)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the photo upload pipeline.
+
+Runs process_and_save_image (base64 decode, validation, compress_image and
+the file write) over a corpus of phone-sized photos under every compression
+profile and reports time per image, memory, output size and the number of
+encode attempts compress_image needed. No server is required.
+
+Usage (from the server directory):
+    python bench_image_pipeline.py                        # generated corpus
+    python bench_image_pipeline.py --corpus ~/Pictures    # your own JPEGs/PNGs
+    python bench_image_pipeline.py --json before.json     # save results
+    python bench_image_pipeline.py --compare before.json  # diff against saved results
+"""
+
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from PIL import Image, ImageDraw
+import PIL
+
+import image_processing
+
+# (name, width, height, format, EXIF orientation) - sizes match common phone cameras
+GENERATED_CORPUS = (
+    ('shelf_12mp_landscape', 4032, 3024, 'JPEG', 1),
+    ('shelf_12mp_rot180', 4032, 3024, 'JPEG', 3),
+    ('label_12mp_portrait', 4032, 3024, 'JPEG', 6),
+    ('label_12mp_portrait_ccw', 4032, 3024, 'JPEG', 8),
+    ('product_8mp_portrait', 3264, 2448, 'JPEG', 6),
+    ('customer_5mp', 2592, 1944, 'JPEG', 1),
+    ('gallery_pick_1080p', 1920, 1080, 'JPEG', 1),
+    ('screenshot_png', 1080, 2340, 'PNG', None),
+    ('cutout_png_alpha', 1200, 1200, 'PNG', None),
+)
+
+SUMMARY_METRICS = ('ms_mean', 'ms_p50', 'ms_max', 'output_kb_total', 'attempts_mean', 'max_rss_kb')
+
+
+def synthetic_photo(width, height, seed):
+    """A photo-like test image: sensor noise over gradients with label-like text blocks"""
+    noise = Image.effect_noise((width, height), 24 + seed % 16)
+    gradient = Image.linear_gradient('L')
+    img = Image.merge('RGB', (
+        Image.blend(noise, gradient.resize((width, height)), 0.6),
+        Image.blend(noise, gradient.transpose(Image.Transpose.FLIP_TOP_BOTTOM).resize((width, height)), 0.5),
+        Image.blend(noise, gradient.transpose(Image.Transpose.ROTATE_90).resize((width, height)), 0.4),
+    ))
+    draw = ImageDraw.Draw(img)
+    step = max(width, height) // 12
+    for i in range(8):
+        x = (i * 37 + seed * 11) % max(1, width - step * 3)
+        y = (i * 53 + seed * 7) % max(1, height - step)
+        draw.rectangle((x, y, x + step * 3, y + step), fill=(240, 240, 235))
+        for line in range(4):
+            draw.text((x + 10, y + 10 + line * step // 5), f"SKU {seed}{i}{line} 2342525252", fill=(20, 20, 20))
+    return img
+
+
+def generate_corpus(directory):
+    """Write GENERATED_CORPUS into directory and return the file paths"""
+    paths = []
+    for seed, (name, width, height, fmt, orientation) in enumerate(GENERATED_CORPUS):
+        img = synthetic_photo(width, height, seed)
+        if fmt == 'PNG':
+            path = os.path.join(directory, f"{name}.png")
+            if name.endswith('alpha'):
+                img = img.convert('RGBA')
+                mask = Image.new('L', img.size, 0)
+                ImageDraw.Draw(mask).ellipse((0, 0, width, height), fill=255)
+                img.putalpha(mask)
+            img.save(path, format='PNG')
+        else:
+            path = os.path.join(directory, f"{name}.jpg")
+            exif = Image.Exif()
+            if orientation:
+                # Like a phone camera: pixels stay in sensor order and the tag says how to turn them
+                exif[0x0112] = orientation
+            img.save(path, format='JPEG', quality=92, exif=exif)
+        paths.append(path)
+    return paths
+
+
+def load_corpus(directory):
+    """JPEG and PNG files in directory, sorted by name"""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )
+
+
+def as_upload(path):
+    """Encode a file the way the apps send it: a base64 data URL"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    mime = 'image/png' if path.lower().endswith('.png') else 'image/jpeg'
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}", len(data)
+
+
+def bench_profile(profile, paths, repeats):
+    """Run every corpus image through the pipeline under one profile"""
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for path in paths:
+            upload, input_bytes = as_upload(path)
+            timings = []
+            for _ in range(repeats):
+                stats = {}
+                tracemalloc.start()
+                started = time.perf_counter()
+                success, full_path, error = image_processing.process_and_save_image(
+                    upload, 'bench.jpg', output_dir, profile=profile, stats=stats
+                )
+                timings.append((time.perf_counter() - started) * 1000)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                if not success:
+                    raise RuntimeError(f"{os.path.basename(path)}: {error}")
+            results.append({
+                'image': os.path.basename(path),
+                'input_kb': round(input_bytes / 1024, 1),
+                'ms': round(min(timings), 1),
+                'peak_traced_kb': round(peak / 1024, 1),
+                'output_kb': round(os.path.getsize(full_path) / 1024, 1),
+                'format': stats.get('format', 'original'),
+                'attempts': stats.get('attempts', 0),
+                'quality': stats.get('quality'),
+                'dimensions': f"{stats.get('width')}x{stats.get('height')}",
+            })
+
+    timings = [r['ms'] for r in results]
+    summary = {
+        'ms_mean': round(statistics.mean(timings), 1),
+        'ms_p50': round(statistics.median(timings), 1),
+        'ms_max': round(max(timings), 1),
+        'output_kb_total': round(sum(r['output_kb'] for r in results), 1),
+        'attempts_mean': round(statistics.mean(r['attempts'] for r in results), 2),
+        # Pillow's pixel buffers are not visible to tracemalloc, so also report
+        # the process high-water mark (KB on Linux, bytes on macOS)
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == 'darwin' else 1),
+    }
+    return {'settings': image_processing.COMPRESSION_PROFILES[profile], 'summary': summary, 'images': results}
+
+
+def run_isolated(profile, paths, repeats):
+    """Run one profile in a fresh interpreter so max_rss_kb belongs to that profile alone"""
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(bench_profile, (profile, paths, repeats))
+
+
+def print_report(report):
+    for profile, result in report['profiles'].items():
+        print(f"\n== {profile} {result['settings']}")
+        print(f"{'image':28} {'in KB':>8} {'ms':>8} {'traced KB':>10} {'out KB':>8} {'tries':>6} {'format':>8}  dimensions")
+        for r in result['images']:
+            print(f"{r['image'][:28]:28} {r['input_kb']:>8} {r['ms']:>8} {r['peak_traced_kb']:>10} "
+                  f"{r['output_kb']:>8} {r['attempts']:>6} {r['format']:>8}  {r['dimensions']}")
+        print('   ' + ', '.join(f"{k}={v}" for k, v in result['summary'].items()))
+
+
+def print_comparison(report, baseline):
+    print(f"\n== compared with {baseline['meta'].get('date')} (pillow {baseline['meta'].get('pillow')})")
+    for profile, result in report['profiles'].items():
+        old = baseline['profiles'].get(profile)
+        if old is None:
+            print(f"{profile}: not in baseline")
+            continue
+        changes = []
+        for metric in SUMMARY_METRICS:
+            before, after = old['summary'].get(metric), result['summary'][metric]
+            if before:
+                changes.append(f"{metric} {before} -> {after} ({(after - before) / before * 100:+.1f}%)")
+        print(f"{profile}: " + '; '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark photo compression and saving')
+    parser.add_argument('--corpus', help='folder of JPEG/PNG photos (default: generate a synthetic corpus)')
+    parser.add_argument('--profile', action='append', help='profile to run (repeatable, default: all)')
+    parser.add_argument('--repeats', type=int, default=3, help='runs per image; the fastest is reported')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='earlier --json output to compare against')
+    parser.add_argument('--no-isolate', action='store_true', help='run every profile in this process')
+    args = parser.parse_args()
+
+    profiles = args.profile or list(image_processing.COMPRESSION_PROFILES)
+    unknown = [p for p in profiles if p not in image_processing.COMPRESSION_PROFILES]
+    if unknown:
+        parser.error(f"unknown profile(s): {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        if args.corpus:
+            paths = load_corpus(args.corpus)
+        else:
+            print(f"Generating {len(GENERATED_CORPUS)} synthetic photos...")
+            paths = generate_corpus(corpus_dir)
+        if not paths:
+            print(f"❌ No JPEG or PNG files found in {args.corpus}")
+            return
+
+        report = {
+            'meta': {
+                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'python': platform.python_version(),
+                'pillow': PIL.__version__,
+                'platform': platform.platform(),
+                'corpus': args.corpus or 'generated',
+                'images': len(paths),
+                'repeats': args.repeats,
+            },
+            'profiles': {},
+        }
+        for profile in profiles:
+            print(f"Running profile '{profile}' over {len(paths)} images...")
+            if args.no_isolate:
+                report['profiles'][profile] = bench_profile(profile, paths, args.repeats)
+            else:
+                report['profiles'][profile] = run_isolated(profile, paths, args.repeats)
+
+    print_report(report)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Throughput comparison of the development server and the production runner.
+
+Starts each server on a copy of this directory (so the real inventory.db and
+uploads are never touched), drives the dashboard's read endpoints from a
+number of concurrent keep-alive clients for a fixed time and reports
+requests per second and latency percentiles.
+
+Usage (from the server directory):
+    python bench_server.py
+    python bench_server.py --clients 32 --duration 20
+    python bench_server.py --setup waitress --setup waitress-16
+"""
+
+import argparse
+import http.client
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ENDPOINTS = ('/api/products', '/api/transactions', '/api/stats', '/api/uploads/stats')
+
+# name -> (command, extra environment)
+SETUPS = {
+    'dev': ([sys.executable, 'app.py'], {}),
+    'dev-debug': ([sys.executable, 'app.py'], {'FLASK_DEBUG': '1'}),
+    'waitress': ([sys.executable, 'serve.py'], {}),
+    'waitress-16': ([sys.executable, 'serve.py', '--threads', '16'], {}),
+    'uvicorn': ([sys.executable, 'serve.py', '--server', 'uvicorn'], {}),
+    'gunicorn-4x4': ([sys.executable, 'serve.py', '--server', 'gunicorn', '--workers', '4', '--threads', '4'], {}),
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/products')
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def client(port, stop, latencies, errors):
+    """One simulated client: request the endpoints round-robin over a keep-alive connection"""
+    conn = None
+    i = 0
+    while not stop.is_set():
+        path = ENDPOINTS[i % len(ENDPOINTS)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+            if response.will_close:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            if conn:
+                conn.close()
+            conn = None
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    if conn:
+        conn.close()
+
+
+def bench_setup(name, workdir, clients, duration):
+    command, extra_env = SETUPS[name]
+    port = free_port()
+    env = dict(os.environ, SERVER_PORT=str(port), PYTHONUNBUFFERED='1', **extra_env)
+    process = subprocess.Popen(command, cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_up(port):
+            return {'setup': name, 'error': 'server did not start'}
+        stop = threading.Event()
+        latencies, errors = [], []
+        threads = [threading.Thread(target=client, args=(port, stop, latencies, errors)) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    latencies.sort()
+    percentile = lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 1)
+    return {
+        'setup': name,
+        'requests': len(latencies),
+        'rps': round(len(latencies) / duration, 1),
+        'ms_mean': round(statistics.mean(latencies), 1) if latencies else None,
+        'ms_p50': percentile(0.50) if latencies else None,
+        'ms_p95': percentile(0.95) if latencies else None,
+        'ms_p99': percentile(0.99) if latencies else None,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare request throughput of the server setups')
+    parser.add_argument('--setup', action='append', choices=list(SETUPS),
+                        help='server setup to run (repeatable, default: dev, dev-debug, waitress)')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--duration', type=int, default=10, help='seconds per setup')
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = os.path.join(tmp, 'server')
+        shutil.copytree(here, workdir, ignore=shutil.ignore_patterns(
+            '__pycache__', 'uploads', 'thumbnail_cache', 'upload_sessions'))
+        for name in args.setup or ('dev', 'dev-debug', 'waitress'):
+            print(f"Running {name}: {args.clients} clients for {args.duration}s...")
+            results.append(bench_setup(name, workdir, args.clients, args.duration))
+
+    print(f"\n{'setup':14} {'requests':>9} {'req/s':>8} {'mean ms':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'errors':>7}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['setup']:14} {r['error']}")
+            continue
+        print(f"{r['setup']:14} {r['requests']:>9} {r['rps']:>8} {r['ms_mean']:>8} "
+              f"{r['ms_p50']:>7} {r['ms_p95']:>7} {r['ms_p99']:>7} {r['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
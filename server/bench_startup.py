@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Import and cold-start times of the server.
+
+Each measurement runs in a fresh interpreter on a copy of this directory, so
+nothing is cached in-process and the real inventory.db is never touched:
+
+- import:      `import <module>` for the modules tools and tests import
+- create_app:  import app, then create_app() (folders, database, caches,
+               background threads)
+- cold start:  from launching serve.py to the first answered request
+
+Usage (from the server directory):
+    python bench_startup.py
+    python bench_startup.py --runs 10 --importtime
+"""
+
+import argparse
+import http.client
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_server import free_port
+
+IMPORT_MODULES = ('image_processing', 'records', 'read_queries', 'app')
+
+TIMED_IMPORT = '''
+import time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+{after}
+print(imported - started, time.perf_counter() - imported)
+'''
+
+
+def run_python(code, workdir):
+    result = subprocess.run([sys.executable, '-c', code], cwd=workdir, capture_output=True, text=True,
+                            env=dict(os.environ, DISCOVERY_PORT='0', LOG_LEVEL='WARNING'))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return [float(value) for value in result.stdout.split()[-2:]]
+
+
+def time_import(module, workdir):
+    """Seconds to import module in a fresh interpreter"""
+    return run_python(TIMED_IMPORT.format(module=module, after=''), workdir)[0]
+
+
+def time_create_app(workdir):
+    """(import seconds, create_app seconds) in a fresh interpreter"""
+    return run_python(TIMED_IMPORT.format(module='app', after='app.create_app()'), workdir)
+
+
+def time_cold_start(workdir, timeout=30):
+    """Seconds from launching serve.py until /api/server-status answers"""
+    port = free_port()
+    env = dict(os.environ, SERVER_PORT=str(port), DISCOVERY_PORT='0', LOG_LEVEL='WARNING')
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'serve.py'], cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+                conn.request('GET', '/api/server-status')
+                if conn.getresponse().status == 200:
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError('server did not start')
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def summary(name, samples):
+    ms = sorted(sample * 1000 for sample in samples)
+    return f"{name:28} {statistics.median(ms):>9.1f} {ms[0]:>9.1f} {ms[-1]:>9.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure server import and cold-start times')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per measurement')
+    parser.add_argument('--importtime', action='store_true',
+                        help='also show the slowest imports under `import app` (python -X importtime)')
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = os.path.join(tmp, 'server')
+        shutil.copytree(here, workdir, ignore=shutil.ignore_patterns(
+            '__pycache__', 'uploads', 'thumbnail_cache', 'upload_sessions'))
+        # Compile once so every run measures imports, not bytecode compilation
+        subprocess.run([sys.executable, '-m', 'compileall', '-q', workdir], check=True)
+
+        rows = []
+        for module in IMPORT_MODULES:
+            rows.append(summary(f'import {module}', [time_import(module, workdir) for _ in range(args.runs)]))
+        create_times = [time_create_app(workdir)[1] for _ in range(args.runs)]
+        rows.append(summary('create_app()', create_times))
+        rows.append(summary('cold start (serve.py)', [time_cold_start(workdir) for _ in range(args.runs)]))
+
+        print(f"\n{'':28} {'median ms':>9} {'min':>9} {'max':>9}")
+        for row in rows:
+            print(row)
+
+        if args.importtime:
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=workdir,
+                                    capture_output=True, text=True, env=dict(os.environ, DISCOVERY_PORT='0'))
+            lines = [line for line in result.stderr.splitlines() if line.startswith('import time:')][1:]
+            cumulative = sorted(lines, key=lambda line: int(line.split('|')[1]), reverse=True)
+            print('\nSlowest imports under `import app` (cumulative us):')
+            for line in cumulative[:15]:
+                print('  ' + line.split(':', 1)[1].strip())
+
+
+if __name__ == '__main__':
+    main()
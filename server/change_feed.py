@@ -0,0 +1,176 @@
+"""
+Change feed behind the /api/events Server-Sent Events stream.
+
+Triggers append a compact row to change_events for every change a client
+shows, in the same transaction as the write, whichever endpoint or script
+made it:
+
+    stock_changed     products.quantity changed (barcode, quantity,
+                      reorder_threshold, low)
+    stock_alert       a product crossed its reorder threshold (the
+                      stock_events row from stock_alerts.py)
+    sale_created      an OUT transaction was added
+    sale_updated      one was edited (quantity, customer, photo, notes...)
+    sale_deleted      one was deleted
+    product_added     a product was created
+    product_updated   its name, MRP, photo or threshold changed
+    product_removed   a product was deleted
+    location_updated  a product location or one of its photos was added,
+                      edited or deleted (id is the location's)
+
+Each event's data is a small JSON object with the keys a client needs to
+patch its lists or decide what to re-fetch; the event id is the row id.
+Restocks show up as stock_changed. Backfilling prices (unit_price,
+line_total) is not a sale edit and emits nothing.
+
+Streams poll the table for ids after the last one sent, about once a
+second, so they work the same with several server processes or writers
+outside the server. A reconnecting EventSource sends Last-Event-ID and is
+replayed what it missed; if those events were already pruned (only the
+latest CHANGE_EVENTS_KEPT are kept) it gets a `resync` event and should
+reload everything.
+"""
+
+import sqlite3
+import time
+
+CHANGE_EVENTS_KEPT = 5000
+POLL_SECONDS = 1.0
+KEEPALIVE_SECONDS = 15
+RETRY_MS = 3000  # EventSource reconnect delay after a stream ends
+BATCH_SIZE = 500
+
+SALE_FIELDS = ('id', 'barcode', 'quantity', 'recipient_name', 'recipient_phone', 'transaction_date')
+LOCATION_FIELDS = ('id', 'product_name', 'location_name')
+
+KEEPALIVE = b': keep-alive\n\n'
+
+
+def _json(row, fields, **extra):
+    """json_object(...) SQL over the given columns of NEW or OLD, plus extra key: SQL pairs"""
+    pairs = [f"'{field}', {row}.{field}" for field in fields]
+    pairs += [f"'{key}', {value}" for key, value in extra.items()]
+    return f"json_object({', '.join(pairs)})"
+
+
+def _changed(columns):
+    return ' OR '.join(f'OLD.{column} IS NOT NEW.{column}' for column in columns)
+
+
+# (trigger name, trigger event, WHEN condition or None, event name, data SQL)
+TRIGGERS = (
+    ('change_stock', 'AFTER UPDATE OF quantity ON products', 'OLD.quantity IS NOT NEW.quantity',
+     'stock_changed', _json('NEW', ('barcode', 'quantity', 'reorder_threshold'),
+                            low="json(CASE WHEN NEW.quantity <= NEW.reorder_threshold THEN 'true' ELSE 'false' END)")),
+    ('change_stock_alert', 'AFTER INSERT ON stock_events', None,
+     'stock_alert', _json('NEW', ('barcode', 'event', 'quantity', 'reorder_threshold'))),
+    ('change_sale_created', 'AFTER INSERT ON transactions', "NEW.transaction_type = 'OUT'",
+     'sale_created', _json('NEW', SALE_FIELDS)),
+    ('change_sale_updated',
+     'AFTER UPDATE OF barcode, quantity, recipient_name, recipient_phone, recipient_photo, notes, '
+     'transaction_date ON transactions',
+     "NEW.transaction_type = 'OUT'", 'sale_updated', _json('NEW', SALE_FIELDS)),
+    ('change_sale_deleted', 'AFTER DELETE ON transactions', "OLD.transaction_type = 'OUT'",
+     'sale_deleted', _json('OLD', SALE_FIELDS)),
+    ('change_product_added', 'AFTER INSERT ON products', None,
+     'product_added', _json('NEW', ('barcode', 'name', 'quantity'))),
+    ('change_product_updated', 'AFTER UPDATE OF name, mrp, image_path, reorder_threshold ON products',
+     _changed(('name', 'mrp', 'image_path', 'reorder_threshold')),
+     'product_updated', _json('NEW', ('barcode', 'name', 'mrp', 'image_path', 'reorder_threshold'))),
+    ('change_product_removed', 'AFTER DELETE ON products', None,
+     'product_removed', _json('OLD', ('barcode', 'name'))),
+    ('change_location_added', 'AFTER INSERT ON product_location_photos', None,
+     'location_updated', _json('NEW', LOCATION_FIELDS)),
+    ('change_location_updated', 'AFTER UPDATE ON product_location_photos', None,
+     'location_updated', _json('NEW', LOCATION_FIELDS)),
+    ('change_location_deleted', 'AFTER DELETE ON product_location_photos', None,
+     'location_updated', _json('OLD', LOCATION_FIELDS, deleted='json(\'true\')')),
+    ('change_location_image_added', 'AFTER INSERT ON product_location_images', None,
+     'location_updated', "json_object('id', NEW.location_id)"),
+    ('change_location_image_deleted', 'AFTER DELETE ON product_location_images', None,
+     'location_updated', "json_object('id', OLD.location_id)"),
+)
+
+
+def ensure_schema(cursor):
+    """The change_events table and the triggers that fill it (needs the stock_events table)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for name, on, when, event, data in TRIGGERS:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name} {on}
+            {f'WHEN {when}' if when else ''}
+            BEGIN
+                INSERT INTO change_events (event, data) VALUES ('{event}', {data});
+            END
+        ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS change_events_prune AFTER INSERT ON change_events
+        BEGIN
+            DELETE FROM change_events WHERE id <= NEW.id - {CHANGE_EVENTS_KEPT};
+        END
+    ''')
+
+
+def parse_event_id(value):
+    """A Last-Event-ID header or ?since= value as an int, or None"""
+    try:
+        return int(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def format_event(event_id, event, data):
+    return f'id: {event_id}\nevent: {event}\ndata: {data}\n\n'.encode()
+
+
+def open_stream(cursor, requested_id):
+    """(id to stream after, opening bytes) for a client that last saw requested_id (None: a new client)"""
+    cursor.execute('SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM change_events')
+    oldest, latest = cursor.fetchone()
+    opening = f'retry: {RETRY_MS}\n\n'.encode()
+    if requested_id is None:
+        return latest, opening
+    if requested_id > latest or (oldest and requested_id < oldest - 1):
+        # Missed events were pruned (or the database was replaced): start over from now
+        return latest, opening + format_event(latest, 'resync', '{}')
+    return requested_id, opening
+
+
+def read_events(cursor, after_id):
+    """(last id, SSE bytes) for up to BATCH_SIZE events after after_id"""
+    cursor.execute('''
+        SELECT id, event, data FROM change_events WHERE id > ? ORDER BY id LIMIT ?
+    ''', (after_id, BATCH_SIZE))
+    rows = cursor.fetchall()
+    if not rows:
+        return after_id, b''
+    return rows[-1][0], b''.join(format_event(*row) for row in rows)
+
+
+def stream(database, requested_id, max_seconds):
+    """SSE bytes for one client for up to max_seconds (it then reconnects with Last-Event-ID)"""
+    conn = sqlite3.connect(database, timeout=30)
+    try:
+        cursor = conn.cursor()
+        last_id, opening = open_stream(cursor, requested_id)
+        yield opening
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < max_seconds:
+            time.sleep(POLL_SECONDS)
+            last_id, chunk = read_events(cursor, last_id)
+            if chunk:
+                yield chunk
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= KEEPALIVE_SECONDS:
+                # Keeps proxies from timing the stream out and finds clients that went away
+                yield KEEPALIVE
+                last_sent = time.monotonic()
+    finally:
+        conn.close()
@@ -0,0 +1,219 @@
+"""
+Resumable chunked uploads for large photos.
+
+A client creates a session with the total size (and optionally the SHA-256
+of the whole file), PUTs numbered chunks with a per-chunk SHA-256, asks
+which chunks are still missing after a dropped connection and then
+completes the session. The completed upload is referenced as
+"upload:<id>" in the normal JSON bodies (recipient_photo, image_path,
+image_data) and goes through the usual compression path from there.
+
+Each session is a directory holding meta.json and one file per chunk, so
+sessions survive a server restart. Sessions idle for longer than the
+timeout, completed or not, are removed by collect_idle().
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_REF_PREFIX = 'upload:'
+SESSION_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    """A chunked upload request that cannot be honoured; status is the HTTP status to return"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def is_upload_ref(value):
+    return isinstance(value, str) and value.startswith(UPLOAD_REF_PREFIX)
+
+
+class ChunkedUploadStore:
+    """On-disk upload sessions with checksummed chunks"""
+
+    def __init__(self, root, chunk_size=256 * 1024, max_chunk_size=4 * 1024 * 1024,
+                 max_upload_size=50 * 1024 * 1024, idle_timeout=3600):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.max_upload_size = max_upload_size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._collector = None
+        os.makedirs(root, exist_ok=True)
+
+    def _session_dir(self, upload_id):
+        if not isinstance(upload_id, str) or not SESSION_ID_PATTERN.match(upload_id):
+            raise UploadError('Invalid upload id', 404)
+        path = os.path.join(self.root, upload_id)
+        if not os.path.isdir(path):
+            raise UploadError('Upload not found or expired', 404)
+        return path
+
+    def _load(self, upload_id):
+        path = self._session_dir(upload_id)
+        with open(os.path.join(path, 'meta.json')) as f:
+            return path, json.load(f)
+
+    def _save(self, path, meta):
+        tmp_path = os.path.join(path, 'meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(path, 'meta.json'))
+
+    def create(self, total_size, chunk_size=None, sha256=None, content_type=None):
+        """Start a session; returns its metadata including the upload id"""
+        try:
+            total_size = int(total_size)
+            chunk_size = int(chunk_size or self.chunk_size)
+        except (TypeError, ValueError):
+            raise UploadError('total_size and chunk_size must be integers')
+        if total_size <= 0:
+            raise UploadError('total_size must be positive')
+        if total_size > self.max_upload_size:
+            raise UploadError(f'Upload too large (max {self.max_upload_size} bytes)', 413)
+        if not 0 < chunk_size <= self.max_chunk_size:
+            raise UploadError(f'chunk_size must be between 1 and {self.max_chunk_size} bytes')
+
+        upload_id = uuid.uuid4().hex
+        meta = {
+            'upload_id': upload_id,
+            'total_size': total_size,
+            'chunk_size': chunk_size,
+            'total_chunks': (total_size + chunk_size - 1) // chunk_size,
+            'sha256': sha256.lower() if sha256 else None,
+            'content_type': content_type,
+            'completed': False,
+            'created': time.time(),
+        }
+        path = os.path.join(self.root, upload_id)
+        os.makedirs(path)
+        self._save(path, meta)
+        return meta
+
+    def _received(self, path):
+        return sorted(
+            int(entry.name[:-5]) for entry in os.scandir(path)
+            if entry.name.endswith('.part') and entry.name[:-5].isdigit()
+        )
+
+    def put_chunk(self, upload_id, index, data, sha256):
+        """Store one chunk after checking its size and checksum; re-sending a chunk is harmless"""
+        path, meta = self._load(upload_id)
+        if meta['completed']:
+            raise UploadError('Upload already completed', 409)
+        if not 0 <= index < meta['total_chunks']:
+            raise UploadError(f"Chunk index must be between 0 and {meta['total_chunks'] - 1}")
+        expected_size = min(meta['chunk_size'], meta['total_size'] - index * meta['chunk_size'])
+        if len(data) != expected_size:
+            raise UploadError(f'Chunk {index} should be {expected_size} bytes, got {len(data)}')
+        if not sha256:
+            raise UploadError('Missing chunk checksum (X-Chunk-SHA256 header)')
+        if hashlib.sha256(data).hexdigest() != sha256.lower():
+            raise UploadError(f'Checksum mismatch for chunk {index}', 422)
+
+        chunk_path = os.path.join(path, f'{index}.part')
+        tmp_path = f'{chunk_path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, chunk_path)
+        os.utime(path)  # Chunk activity keeps the session alive
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        """Session metadata plus the chunk indexes received and still missing"""
+        path, meta = self._load(upload_id)
+        received = self._received(path) if not meta['completed'] else list(range(meta['total_chunks']))
+        received_set = set(received)
+        meta['received'] = received
+        meta['missing'] = [i for i in range(meta['total_chunks']) if i not in received_set]
+        return meta
+
+    def complete(self, upload_id):
+        """Join the chunks into the final file, verifying the whole-file checksum if one was given"""
+        with self._lock:
+            status = self.status(upload_id)
+            if status['completed']:
+                return status
+            if status['missing']:
+                raise UploadError(f"Upload is missing {len(status['missing'])} chunk(s)", 409)
+
+            path, meta = self._load(upload_id)
+            digest = hashlib.sha256()
+            data_path = os.path.join(path, 'data')
+            with open(data_path + '.tmp', 'wb') as output:
+                for index in range(meta['total_chunks']):
+                    with open(os.path.join(path, f'{index}.part'), 'rb') as chunk:
+                        data = chunk.read()
+                    digest.update(data)
+                    output.write(data)
+            if meta['sha256'] and digest.hexdigest() != meta['sha256']:
+                os.remove(data_path + '.tmp')
+                raise UploadError('Checksum mismatch for the assembled upload', 422)
+            os.replace(data_path + '.tmp', data_path)
+            for index in range(meta['total_chunks']):
+                os.remove(os.path.join(path, f'{index}.part'))
+
+            meta['completed'] = True
+            self._save(path, meta)
+            os.utime(path)
+        return self.status(upload_id)
+
+    def read(self, upload_ref):
+        """Bytes of a completed upload, given its "upload:<id>" reference"""
+        upload_id = upload_ref[len(UPLOAD_REF_PREFIX):] if is_upload_ref(upload_ref) else upload_ref
+        path, meta = self._load(upload_id)
+        if not meta['completed']:
+            raise UploadError('Upload is not completed yet', 409)
+        with open(os.path.join(path, 'data'), 'rb') as f:
+            return f.read()
+
+    def discard(self, upload_ref):
+        """Delete a session (after its photo has been saved, or when the client gives up)"""
+        upload_id = upload_ref[len(UPLOAD_REF_PREFIX):] if is_upload_ref(upload_ref) else upload_ref
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+
+    def collect_idle(self):
+        """Remove sessions with no activity for idle_timeout seconds; returns how many were removed"""
+        cutoff = time.time() - self.idle_timeout
+        removed = 0
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and SESSION_ID_PATTERN.match(entry.name) and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def start_collecting(self, interval):
+        """Run collect_idle every interval seconds in a daemon thread"""
+        if self._collector is not None or interval <= 0:
+            return
+
+        def collect():
+            while True:
+                time.sleep(interval)
+                try:
+                    removed = self.collect_idle()
+                    if removed:
+                        logger.info('Removed %s idle chunked upload(s)', removed)
+                except Exception as e:
+                    logger.warning('Chunked upload cleanup failed: %s', e)
+
+        self._collector = threading.Thread(target=collect, name='chunked-upload-gc', daemon=True)
+        self._collector.start()
+
+    def stats(self):
+        sessions = [entry for entry in os.scandir(self.root) if entry.is_dir()]
+        return {'sessions': len(sessions), 'idle_timeout': self.idle_timeout}
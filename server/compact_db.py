@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Shrink inventory.db: move inline base64 photos out to the photo store, then
+give the freed pages back to the filesystem.
+
+The first compaction switches the database to incremental auto-vacuum with
+a full VACUUM; later runs only need PRAGMA incremental_vacuum. Use --into to
+write a compacted copy with VACUUM INTO and leave the original untouched.
+
+Run it from the server directory:
+    python compact_db.py --dry-run
+    python compact_db.py
+    python compact_db.py --into inventory-compact.db
+"""
+
+import argparse
+import os
+import sqlite3
+
+from migrate_photos import MIGRATION_TARGETS, PhotoMigration, candidate_condition
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def inline_photo_usage(cursor):
+    """{target: (rows, bytes)} of inline photo data still stored in the database"""
+    usage = {}
+    for target, spec in MIGRATION_TARGETS.items():
+        try:
+            cursor.execute(f'''
+                SELECT COUNT(*), COALESCE(SUM(LENGTH({spec['column']})), 0) FROM {spec['table']}
+                WHERE {candidate_condition(spec['column'])}
+            ''')
+        except sqlite3.OperationalError:
+            continue  # Table not created yet in this database
+        usage[target] = cursor.fetchone()
+    return usage
+
+
+def page_usage(cursor):
+    """(total pages, free pages) of the open database"""
+    cursor.execute('PRAGMA page_count')
+    page_count = cursor.fetchone()[0]
+    cursor.execute('PRAGMA freelist_count')
+    return page_count, cursor.fetchone()[0]
+
+
+def compact(conn, into=None):
+    """Reclaim free pages in place, or write a compacted copy to `into`"""
+    cursor = conn.cursor()
+    if into:
+        cursor.execute('VACUUM INTO ?', (into,))
+        return 'VACUUM INTO'
+    cursor.execute('PRAGMA auto_vacuum')
+    if cursor.fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+        cursor.execute('PRAGMA incremental_vacuum')
+        cursor.fetchall()
+        return 'incremental vacuum'
+    # auto_vacuum can only be changed by a full VACUUM; afterwards freed pages
+    # are tracked so later runs can use incremental_vacuum
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    cursor.execute('VACUUM')
+    return 'VACUUM (switched to incremental auto-vacuum)'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract inline photos and compact the database')
+    parser.add_argument('--database', default='inventory.db')
+    parser.add_argument('--uploads', default='uploads')
+    parser.add_argument('--into', help='write a compacted copy here (VACUUM INTO) instead of compacting in place')
+    parser.add_argument('--workers', type=int, default=None, help='compression processes (default: CPU count)')
+    parser.add_argument('--skip-photos', action='store_true', help='only compact, do not extract inline photos')
+    parser.add_argument('--dry-run', action='store_true', help='only report inline photos and free space')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"❌ {args.database} not found. Make sure you're running this from the server directory.")
+        return
+    if args.into and os.path.exists(args.into):
+        print(f"❌ {args.into} already exists")
+        return
+
+    print("🗜️  Database Compaction Tool")
+    print("=" * 50)
+    size_before = os.path.getsize(args.database)
+    conn = sqlite3.connect(args.database, timeout=30)
+    try:
+        cursor = conn.cursor()
+        for target, (rows, size) in inline_photo_usage(cursor).items():
+            if rows:
+                print(f"  📷 {target}: {rows} rows with inline photos ({size / 1024:.1f}KB)")
+        page_count, free_pages = page_usage(cursor)
+        print(f"  📊 {args.database}: {size_before / 1024:.1f}KB, {free_pages} of {page_count} pages free")
+        if args.dry_run:
+            return
+
+        if not args.skip_photos:
+            PhotoMigration(args.database, args.uploads, workers=args.workers).run()
+
+        method = compact(conn, args.into)
+    finally:
+        conn.close()
+
+    output = args.into or args.database
+    size_after = os.path.getsize(output)
+    print(f"\n🎉 {method}: {output} is {size_after / 1024:.1f}KB "
+          f"(was {size_before / 1024:.1f}KB, saved {(size_before - size_after) / 1024:.1f}KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Negotiated gzip/brotli compression of JSON and text responses.
+
+The product and transaction lists are large arrays of near-identical
+objects, which compress 5-10x. Handhelds on a weak shop Wi-Fi spend far
+longer receiving those bytes than the server spends compressing them, as
+long as the level stays low: gzip level 5 and brotli quality 4 get most of
+the size reduction for a fraction of the CPU of their maximum settings.
+
+Responses below the minimum size, photos and other already-compressed
+types, ranges and responses that already carry a Content-Encoding are
+sent unchanged. Streamed responses are compressed chunk by chunk and
+flushed after each chunk, so a client still sees every part as soon as it
+is produced.
+
+Brotli is used when the optional `brotli` package is installed
+(`pip install brotli`) and the client accepts it; browsers do, the
+Flutter app's HTTP client asks for gzip.
+
+Environment:
+    COMPRESS_MIN_SIZE   smallest body worth compressing, in bytes (default 1024)
+    COMPRESS_LEVEL      gzip level 1-9 (default 5)
+    BROTLI_QUALITY      brotli quality 0-11 (default 4)
+"""
+
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 5))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 4))
+
+COMPRESSIBLE_TYPES = frozenset((
+    'application/json', 'application/javascript', 'application/x-ndjson', 'image/svg+xml',
+    'text/css', 'text/csv', 'text/html', 'text/javascript', 'text/plain',
+))
+
+
+def _accepted(accept_encoding):
+    """{coding: q} from an Accept-Encoding header"""
+    accepted = {}
+    for part in (accept_encoding or '').lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """'br', 'gzip' or None for a request's Accept-Encoding header"""
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get('*', 0)
+    if BROTLI_AVAILABLE and accepted.get('br', wildcard) > 0:
+        return 'br'
+    if accepted.get('gzip', wildcard) > 0:
+        return 'gzip'
+    return None
+
+
+def is_compressible(mimetype):
+    return (mimetype or '').split(';', 1)[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+def compress(body, encoding):
+    """Compress a whole body with 'br' or 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_chunks(chunks, encoding):
+    """Compress an iterable of byte chunks, flushing after each one"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response, accept_encoding, method='GET'):
+    """Compress a Flask/Werkzeug response in place when the client accepts it; returns it"""
+    if not is_compressible(response.mimetype):
+        return response
+    response.vary.add('Accept-Encoding')
+    if (method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers or 'Content-Range' in response.headers):
+        return response
+    if response.direct_passthrough:
+        return response  # File responses (send_file) stay on the zero-copy path
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_chunks(
+            (chunk.encode() if isinstance(chunk, str) else chunk for chunk in response.response), encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < MIN_SIZE:
+            return response
+        response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak=True)
+    return response
@@ -6,6 +6,7 @@ Debug script to check photo storage and database entries
 import sqlite3
 import os
 import json
+from upload_index import UploadIndex
 
 def check_database_photos():
     """Check what photos are stored in the database"""
@@ -75,28 +76,29 @@ def check_file_system():
     print("=" * 50)
     
     upload_folders = [
-        'uploads/customer_photos',
-        'uploads/product_photos', 
-        'uploads/find-photos'
+        'customer_photos',
+        'product_photos', 
+        'find-photos'
     ]
     
+    # One scandir pass per folder gives names and sizes together
+    index = UploadIndex('uploads').build()
     total_files = 0
     
     for folder in upload_folders:
-        if os.path.exists(folder):
-            files = [f for f in os.listdir(folder) if f.endswith(('.jpg', '.jpeg', '.png'))]
+        if os.path.exists(os.path.join('uploads', folder)):
+            files = [f for f in index.list(folder) if f.endswith(('.jpg', '.jpeg', '.png', '.webp'))]
             total_files += len(files)
             
-            print(f"\n📁 {folder}: {len(files)} files")
+            print(f"\n📁 uploads/{folder}: {len(files)} files ({index.total_size(folder)/1024:.1f}KB)")
             for i, file in enumerate(files[:5]):  # Show first 5 files
-                file_path = os.path.join(folder, file)
-                file_size = os.path.getsize(file_path)
+                file_size = index.size(f"{folder}/{file}")
                 print(f"  {i+1}. {file} ({file_size/1024:.1f}KB)")
             
             if len(files) > 5:
                 print(f"  ... and {len(files) - 5} more files")
         else:
-            print(f"\n❌ {folder}: Directory doesn't exist")
+            print(f"\n❌ uploads/{folder}: Directory doesn't exist")
     
     print(f"\n📊 Total photo files: {total_files}")
 
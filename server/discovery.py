@@ -0,0 +1,153 @@
+"""
+Finding the server on the shop network.
+
+The server's LAN address is detected once and cached by LocalAddress;
+/api/server-status and /api/server-info answer from that cache. Detection
+is a UDP connect() that sends no packet, so a background thread can repeat
+it cheaply and pick up a changed address after a Wi-Fi switch or a new
+DHCP lease.
+
+DiscoveryResponder lets the handhelds find the server without guessing
+addresses: the app broadcasts DISCOVERY_PROBE to the discovery port and the
+server answers the sender with one JSON datagram holding its URL. The
+address in the answer is the one the handheld can reach the server on,
+which matters on machines with more than one network adapter.
+"""
+
+import json
+import logging
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_PROBE = b'EOPYSTOCK_DISCOVER'
+SERVICE_NAME = 'eopystock-inventory'
+
+
+def detect_local_ip():
+    """The address this machine uses on the LAN, or 'localhost' when it has none"""
+    try:
+        # connect() on a UDP socket only picks a route; nothing is sent
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(('8.8.8.8', 80))
+            return s.getsockname()[0]
+    except OSError:
+        pass
+    try:
+        for address in socket.gethostbyname_ex(socket.gethostname())[2]:
+            if not address.startswith('127.'):
+                return address
+    except OSError:
+        pass
+    return 'localhost'
+
+
+def route_address(peer_ip):
+    """The local address packets to peer_ip leave from, or None"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect((peer_ip, 9))
+            address = s.getsockname()[0]
+    except OSError:
+        return None
+    return None if address.startswith('127.') or address == '0.0.0.0' else address
+
+
+class LocalAddress:
+    """Cached LAN address of this machine, re-detected in the background"""
+
+    def __init__(self, detect=detect_local_ip):
+        self._detect = detect
+        self._ip = None
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def get(self):
+        if self._ip is None:
+            self.refresh()
+        return self._ip
+
+    def refresh(self):
+        """Detect the address again; returns True when it changed"""
+        ip = self._detect()
+        with self._lock:
+            previous, self._ip = self._ip, ip
+        if previous is not None and ip != previous:
+            logger.info('Local IP changed from %s to %s', previous, ip)
+        return previous is not None and ip != previous
+
+    def start_watching(self, interval):
+        """Re-detect the address every interval seconds in a daemon thread"""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning('Local IP refresh failed: %s', e)
+
+        self._watcher = threading.Thread(target=watch, name='local-ip-watcher', daemon=True)
+        self._watcher.start()
+
+
+class DiscoveryResponder:
+    """Answers discovery broadcasts from the app on a UDP port"""
+
+    def __init__(self, describe, port, host='0.0.0.0'):
+        # describe() -> {'ip', 'port', 'url', ...} for the reply
+        self.describe = describe
+        self.port = port
+        self.host = host
+        self._sock = None
+        self._thread = None
+
+    def reply_for(self, peer_ip):
+        info = dict(self.describe())
+        ip = route_address(peer_ip) or info['ip']
+        info.update(service=SERVICE_NAME, ip=ip, url=f"http://{ip}:{info['port']}")
+        return json.dumps(info, separators=(',', ':')).encode()
+
+    def start(self):
+        """Bind the port and answer probes in a daemon thread; False if the port is taken"""
+        if self._thread is not None or self.port <= 0:
+            return False
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind((self.host, self.port))
+        except OSError as e:
+            # Another worker process, or a second server, already answers on this port
+            logger.info('Discovery responder not started on UDP port %s: %s', self.port, e)
+            sock.close()
+            return False
+        sock.settimeout(1.0)  # Lets stop() end the thread
+        self._sock = sock
+        self._thread = threading.Thread(target=self._serve, name='discovery-responder', daemon=True)
+        self._thread.start()
+        logger.info('Answering discovery probes on UDP port %s', self.port)
+        return True
+
+    def _serve(self):
+        sock = self._sock
+        while self._sock is sock:
+            try:
+                data, peer = sock.recvfrom(512)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if data.strip() != DISCOVERY_PROBE:
+                continue
+            try:
+                sock.sendto(self.reply_for(peer[0]), peer)
+            except Exception as e:
+                logger.debug('Discovery reply to %s failed: %s', peer[0], e)
+
+    def stop(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
@@ -7,12 +7,16 @@ import sqlite3
 import json
 import os
 from datetime import datetime
+from upload_index import UploadIndex
 
 def fix_missing_photos():
     """Remove references to missing photo files from the database"""
     print("🔧 Fixing Missing Customer Photos")
     print("=" * 50)
     
+    # Scan the upload folders once instead of stat-ing every referenced photo
+    index = UploadIndex('uploads').build()
+    
     conn = sqlite3.connect('inventory.db')
     cursor = conn.cursor()
     
@@ -40,9 +44,8 @@ def fix_missing_photos():
                     for photo_path in photos:
                         if photo_path.startswith('customer_photos/'):
                             filename = photo_path.replace('customer_photos/', '')
-                            full_path = os.path.join('uploads', 'customer_photos', filename)
                             
-                            if os.path.exists(full_path):
+                            if index.exists(photo_path):
                                 existing_photos.append(photo_path)
                                 print(f"  ✅ {filename} - exists")
                             else:
@@ -84,9 +87,8 @@ def fix_missing_photos():
                 # Single photo
                 if photo_data.startswith('customer_photos/'):
                     filename = photo_data.replace('customer_photos/', '')
-                    full_path = os.path.join('uploads', 'customer_photos', filename)
                     
-                    if not os.path.exists(full_path):
+                    if not index.exists(photo_data):
                         # Photo doesn't exist, remove reference
                         cursor.execute('''
                             UPDATE transactions 
@@ -0,0 +1,396 @@
+"""
+Photo compression and saving, shared by the upload endpoints and the
+maintenance scripts.
+
+Kept free of Flask and database imports so it can be benchmarked and reused
+offline (see bench_image_pipeline.py). Pillow is imported the first time a
+photo is processed, so importing this module has no cost or output.
+"""
+
+import base64
+import io
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Filled in by load_pillow() on first use
+Image = None
+COMPRESSION_AVAILABLE = None
+WEBP_AVAILABLE = None
+
+
+def load_pillow():
+    """Import Pillow if that has not been tried yet; True if it is installed"""
+    global Image, COMPRESSION_AVAILABLE, WEBP_AVAILABLE
+    if COMPRESSION_AVAILABLE is None:
+        try:
+            from PIL import Image as pil_image, features
+        except ImportError:
+            WEBP_AVAILABLE = False
+            COMPRESSION_AVAILABLE = False
+            logger.warning('Image compression disabled (Pillow not installed). Run: pip install Pillow')
+        else:
+            Image = pil_image
+            WEBP_AVAILABLE = features.check('webp')
+            COMPRESSION_AVAILABLE = True
+            logger.info('Image compression enabled (Pillow available)')
+    return COMPRESSION_AVAILABLE
+
+
+def webp_supported():
+    """True if Pillow is installed and can write WebP"""
+    return load_pillow() and WEBP_AVAILABLE
+
+# Output format -> (Pillow format name, file extension)
+OUTPUT_FORMATS = {
+    'jpeg': ('JPEG', '.jpg'),
+    'webp': ('WEBP', '.webp'),
+}
+
+# Settings passed to compress_image for uploaded photos, by profile name.
+# Each upload site picks the profile for its folder. WebP profiles fall back
+# to progressive JPEG when Pillow was built without WebP support, and
+# subsampling only applies to JPEG output ('4:4:4' keeps small print sharp).
+COMPRESSION_PROFILES = {
+    # Settings used before profiles existed, kept as the benchmark baseline
+    'default': {'format': 'jpeg', 'max_size_kb': 150, 'quality': 80, 'max_width': 1000, 'max_height': 1000,
+                'progressive': True, 'subsampling': '4:2:0', 'strip_metadata': True},
+    # Product shots are read for label text and barcodes
+    'product': {'format': 'webp', 'max_size_kb': 100, 'quality': 80, 'max_width': 1000, 'max_height': 1000,
+                'progressive': True, 'subsampling': '4:4:4', 'strip_metadata': True},
+    # Customer photos are only ever looked at as faces and receipts on a phone screen
+    'customer': {'format': 'webp', 'max_size_kb': 60, 'quality': 75, 'max_width': 800, 'max_height': 800,
+                 'progressive': True, 'subsampling': '4:2:0', 'strip_metadata': True},
+    # Shelf pictures need more pixels so shelf labels stay legible from a distance
+    'location': {'format': 'webp', 'max_size_kb': 150, 'quality': 80, 'max_width': 1280, 'max_height': 1280,
+                 'progressive': True, 'subsampling': '4:4:4', 'strip_metadata': True},
+}
+
+
+def contains_inline_photo(value):
+    """True if a photo column value (a path, data URL or JSON array of them) still holds image data"""
+    if not isinstance(value, str):
+        return False
+    if value.startswith('data:'):
+        return True
+    if value.startswith('['):
+        try:
+            photos = json.loads(value)
+        except ValueError:
+            return False
+        return isinstance(photos, list) and any(isinstance(p, str) and p.startswith('data:') for p in photos)
+    return False
+
+
+def compress_image(image_bytes, max_size_kb=300, quality=75, max_width=800, max_height=800,
+                   format='jpeg', progressive=False, subsampling=None, strip_metadata=True,
+                   min_quality=60, stats=None):
+    """
+    Compress image to reduce file size while maintaining quality
+    
+    Args:
+        image_bytes: Raw image bytes
+        max_size_kb: Maximum file size in KB (default: 500KB)
+        quality: JPEG quality (1-100, default: 85 for good quality)
+        max_width: Maximum width in pixels (default: 1200px)
+        max_height: Maximum height in pixels (default: 1200px)
+        format: 'jpeg' or 'webp' (WebP falls back to JPEG if Pillow lacks it)
+        progressive: Write a progressive JPEG
+        subsampling: JPEG chroma subsampling, e.g. '4:4:4' or '4:2:0'
+        strip_metadata: Drop EXIF (including GPS) and ICC data from the output
+        min_quality: Lowest quality tried while aiming for max_size_kb
+        stats: Optional dict filled in with the output format, dimensions,
+            final quality and the number of encode attempts
+    
+    Returns:
+        Compressed image bytes
+    """
+    # If Pillow is not available, return original bytes
+    if not load_pillow():
+        logger.warning('Compression skipped - Pillow not available')
+        return image_bytes
+        
+    try:
+        # Open image from bytes
+        img = Image.open(io.BytesIO(image_bytes))
+        
+        if format == 'webp' and not WEBP_AVAILABLE:
+            logger.warning('WebP not supported by this Pillow build, saving progressive JPEG instead')
+            format, progressive = 'jpeg', True
+        pil_format = OUTPUT_FORMATS[format][0]
+        icc_profile = img.info.get('icc_profile')
+        
+        # Handle EXIF orientation to fix rotation issues from mobile cameras
+        try:
+            # Use Pillow's built-in EXIF transpose function (most reliable method)
+            from PIL import ImageOps
+            original_size = img.size
+            img = ImageOps.exif_transpose(img)
+            new_size = img.size
+            
+            if original_size != new_size:
+                logger.debug('EXIF orientation corrected: %s → %s', original_size, new_size)
+            else:
+                logger.debug('No EXIF orientation correction needed')
+                
+        except ImportError:
+            logger.debug('ImageOps not available, trying manual EXIF handling')
+            # Fallback to manual method if ImageOps is not available
+            try:
+                exif_dict = img.getexif() if hasattr(img, 'getexif') else None
+                if exif_dict:
+                    orientation = exif_dict.get(274)  # 274 is the EXIF orientation tag
+                    if orientation:
+                        logger.debug('EXIF orientation found: %s', orientation)
+                        if orientation == 3:
+                            img = img.rotate(180, expand=True)
+                            logger.debug('Applied 180° rotation')
+                        elif orientation == 6:
+                            img = img.rotate(270, expand=True)
+                            logger.debug('Applied 270° rotation (correcting 90° CW)')
+                        elif orientation == 8:
+                            img = img.rotate(90, expand=True)
+                            logger.debug('Applied 90° rotation (correcting 90° CCW)')
+                else:
+                    logger.debug('No EXIF data available')
+            except Exception as fallback_e:
+                logger.warning('Fallback EXIF processing failed: %s', fallback_e)
+        except Exception as e:
+            logger.warning('Error processing EXIF orientation: %s - continuing without EXIF correction', e)
+            # Continue without EXIF processing if it fails
+        
+        # exif_transpose already reset the orientation tag to match the pixels
+        exif = img.info.get('exif')
+        
+        # Convert to RGB if necessary (handles PNG with transparency, etc.)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Create white background
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        
+        # Get original dimensions
+        original_width, original_height = img.size
+        original_size_kb = len(image_bytes) / 1024
+        
+        logger.debug('Original image: %sx%s, %.1fKB', original_width, original_height, original_size_kb)
+        
+        # Resize if image is too large
+        if original_width > max_width or original_height > max_height:
+            # Calculate new dimensions maintaining aspect ratio
+            ratio = min(max_width / original_width, max_height / original_height)
+            new_width = int(original_width * ratio)
+            new_height = int(original_height * ratio)
+            
+            # Resize with high-quality resampling
+            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            logger.debug('Resized to: %sx%s', new_width, new_height)
+        
+        save_options = {}
+        if pil_format == 'JPEG':
+            save_options.update(optimize=True, progressive=progressive)
+            if subsampling:
+                save_options['subsampling'] = subsampling
+        else:
+            save_options['method'] = 4  # Good size/speed trade-off for photos
+        if not strip_metadata:
+            if exif:
+                save_options['exif'] = exif
+            if icc_profile:
+                save_options['icc_profile'] = icc_profile
+        
+        # Compress with different quality levels until we reach target size
+        compressed_bytes = None
+        current_quality = quality
+        
+        for attempt in range(5):  # Try up to 5 different quality levels
+            output_buffer = io.BytesIO()
+            
+            # Save with current quality
+            img.save(output_buffer, format=pil_format, quality=current_quality, **save_options)
+            compressed_bytes = output_buffer.getvalue()
+            compressed_size_kb = len(compressed_bytes) / 1024
+            
+            logger.debug('Attempt %s: Quality %s, Size: %.1fKB', attempt + 1, current_quality, compressed_size_kb)
+            
+            # If size is acceptable, break
+            if compressed_size_kb <= max_size_kb or current_quality <= min_quality:
+                break
+            
+            # Reduce quality for next attempt
+            current_quality = max(min_quality, current_quality - 10)
+        
+        if stats is not None:
+            stats['format'] = format
+            stats['width'], stats['height'] = img.size
+            stats['quality'] = current_quality
+            stats['attempts'] = attempt + 1
+        
+        final_size_kb = len(compressed_bytes) / 1024
+        compression_ratio = (original_size_kb / final_size_kb) if final_size_kb > 0 else 1
+        
+        logger.debug('Final compressed image: %.1fKB (compression ratio: %.1fx)', final_size_kb, compression_ratio)
+        
+        return compressed_bytes
+        
+    except Exception as e:
+        logger.error('Error compressing image: %s', e)
+        # Return original bytes if compression fails
+        return image_bytes
+
+def process_and_save_image(base64_data, filename, folder_path, compress=True, profile='default',
+                           on_saved=None, stats=None):
+    """
+    Process base64 image data, compress it intelligently, and save to specified folder
+    
+    Args:
+        base64_data: Base64 encoded image data (with or without data URL prefix)
+        filename: Name for the saved file
+        folder_path: Full path to the folder where image should be saved
+        compress: Whether to compress the image (default: True)
+        profile: Name of the COMPRESSION_PROFILES entry to compress with
+        on_saved: Optional callback called with the full path once the file is written
+        stats: Optional dict filled in by compress_image, plus input_bytes,
+            output_bytes and compress_seconds when the image was compressed
+    
+    The extension of filename is replaced to match the format the profile
+    wrote (e.g. .webp), so callers should take the saved name from file_path.
+    
+    Returns:
+        Tuple: (success: bool, file_path: str, error_message: str)
+    """
+    if stats is None:
+        stats = {}
+    try:
+        logger.debug('Starting image processing for %s', filename)
+        logger.debug('Input data length: %s characters', len(base64_data) if base64_data else 0)
+        
+        if not base64_data or len(base64_data) < 100:
+            error_msg = f"Invalid or too short base64 data: {len(base64_data) if base64_data else 0} characters"
+            logger.error('%s', error_msg)
+            return False, "", error_msg
+        
+        # Remove data URL prefix if present
+        original_data = base64_data
+        if ',' in base64_data:
+            prefix, base64_data = base64_data.split(',', 1)
+            logger.debug('Removed data URL prefix: %s', prefix)
+        
+        logger.debug('Base64 data length after cleanup: %s characters', len(base64_data))
+        
+        # Fix base64 padding - SIMPLE APPROACH
+        base64_data = base64_data.strip()  # Remove any whitespace
+        # Add padding to make it a multiple of 4
+        while len(base64_data) % 4 != 0:
+            base64_data += '='
+        
+        logger.debug('Fixed base64 length: %s characters', len(base64_data))
+        
+        # Decode full base64
+        try:
+            image_bytes = base64.b64decode(base64_data)
+            original_size_kb = len(image_bytes) / 1024
+            logger.debug('Decoded image: %s bytes (%.1fKB)', len(image_bytes), original_size_kb)
+        except Exception as decode_error:
+            error_msg = f"Base64 decode failed: {str(decode_error)}"
+            logger.error('%s', error_msg)
+            return False, "", error_msg
+        
+        return save_image_bytes(image_bytes, filename, folder_path, compress=compress, profile=profile,
+                                on_saved=on_saved, stats=stats)
+        
+    except Exception as e:
+        error_msg = f"Error processing image: {str(e)}"
+        logger.exception('%s', error_msg)
+        return False, "", error_msg
+
+def save_image_bytes(image_bytes, filename, folder_path, compress=True, profile='default',
+                     on_saved=None, stats=None):
+    """
+    Compress raw image bytes with a profile and save them to folder_path
+    
+    Used by process_and_save_image once the base64 is decoded, and directly
+    for uploads that arrive as bytes (chunked uploads). Arguments and return
+    value are the same as process_and_save_image.
+    """
+    if stats is None:
+        stats = {}
+    try:
+        original_size_kb = len(image_bytes) / 1024
+        
+        if len(image_bytes) < 1000:  # Less than 1KB is suspicious
+            error_msg = f"Decoded image too small: {len(image_bytes)} bytes"
+            logger.error('%s', error_msg)
+            return False, "", error_msg
+        
+        # Apply aggressive compression to save space
+        pillow_available = compress and load_pillow()
+        if pillow_available:
+            logger.debug('Applying aggressive compression...')
+            try:
+                # Test if it's a valid image first
+                test_img = Image.open(io.BytesIO(image_bytes))
+                test_img.verify()  # This will raise an exception if not a valid image
+                logger.debug('Image format validation passed: %s', test_img.format)
+                
+                # Apply minimal compression to keep text very clear
+                logger.debug('Compressing image (%.1fKB) with minimal compression for text clarity...', original_size_kb)
+                started = time.perf_counter()
+                stats['input_bytes'] = len(image_bytes)
+                image_bytes = compress_image(image_bytes, stats=stats, **COMPRESSION_PROFILES[profile])
+                stats['compress_seconds'] = time.perf_counter() - started
+                stats['output_bytes'] = len(image_bytes)
+                
+                compressed_size_kb = len(image_bytes) / 1024
+                logger.info('Compressed: %.1fKB → %.1fKB (saved %.1fKB)', original_size_kb, compressed_size_kb, original_size_kb - compressed_size_kb)
+            except Exception as img_error:
+                logger.warning('Image compression failed, saving original image: %s', img_error)
+                # image_bytes still holds the original, which is saved as-is
+        elif compress:
+            logger.warning('Compression requested but Pillow not available. Saving original image: %.1fKB', original_size_kb)
+        else:
+            logger.info('Compression disabled. Saving original image: %.1fKB', original_size_kb)
+        
+        # Final validation before saving
+        if len(image_bytes) < 100:
+            error_msg = f"Final image data too small: {len(image_bytes)} bytes"
+            logger.error('%s', error_msg)
+            return False, "", error_msg
+        
+        # Name the file after the format actually written; originals keep the requested name
+        if 'format' in stats:
+            filename = os.path.splitext(filename)[0] + OUTPUT_FORMATS[stats['format']][1]
+        
+        # Save to file
+        full_path = os.path.join(folder_path, filename)
+        logger.debug('Saving to: %s', full_path)
+        
+        with open(full_path, 'wb') as f:
+            f.write(image_bytes)
+        if on_saved:
+            on_saved(full_path)
+        
+        # Verify file was saved correctly
+        if os.path.exists(full_path):
+            file_size = os.path.getsize(full_path)
+            logger.debug('File saved successfully: %s bytes', file_size)
+            if file_size != len(image_bytes):
+                logger.warning('File size mismatch! Expected: %s, Got: %s', len(image_bytes), file_size)
+        else:
+            error_msg = "File was not created"
+            logger.error('%s', error_msg)
+            return False, "", error_msg
+        
+        return True, full_path, ""
+        
+    except Exception as e:
+        error_msg = f"Error processing image: {str(e)}"
+        logger.exception('%s', error_msg)
+        return False, "", error_msg
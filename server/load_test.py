@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Load test that simulates the shop's handheld scanners and dashboards.
+
+Starts the server on a copy of this directory with a synthetic database
+(see make_synthetic_db.py), so it is reproducible and never touches the
+real inventory.db or uploads, or drives an already running server with
+--url.
+
+Each scanner repeatedly waits a think time and then does one of:
+    lookup          GET /api/products/<barcode>, then that product's transactions
+    sale            one POST /api/transactions, sometimes with a customer photo
+    multi_sale      one POST per item, each carrying the same photo array, as
+                    the app's multi-item checkout does
+    history         GET /api/transactions/grouped (sales history screen)
+    customer_search GET /api/customers/search/<name>
+Each dashboard behaves like index.html: it holds an /api/events stream
+open and, once a burst of change events has gone quiet, re-fetches
+/api/stats, plus /api/transactions/grouped when the sales tab is open.
+When the server refuses the stream (too many open) it polls those every 15
+seconds until a stream is free again.
+
+Scanners open a new connection per request (as the app's http.get does);
+dashboards keep their connection alive like a browser. The report has
+throughput and p50/p95/p99 latency per endpoint; for GET /api/events it
+is the time to open the stream, and refused streams count as errors.
+
+Usage (from the server directory):
+    python load_test.py
+    python load_test.py --scanners 20 --dashboards 3 --duration 60
+    python load_test.py --ramp 5,10,20,40 --duration 30     # capacity table
+    python load_test.py --url http://192.168.1.20:8080 --scanners 5
+"""
+
+import argparse
+import base64
+import http.client
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import quote, urlsplit
+
+from bench_server import free_port, wait_until_up
+from make_synthetic_db import build as build_synthetic_db, make_customers
+
+# Share of scanner actions; a shop does far more lookups than anything else
+SCANNER_MIX = {'lookup': 0.55, 'sale': 0.2, 'multi_sale': 0.1, 'history': 0.1, 'customer_search': 0.05}
+DASHBOARD_POLL_SECONDS = 15
+DASHBOARD_QUIET_SECONDS = 0.5  # index.html refreshes once events stop arriving for this long
+
+
+def make_photo(size_kb, seed=0):
+    """A JPEG data URL of roughly size_kb, like a phone camera photo after the app's resize"""
+    from PIL import Image
+    rng = random.Random(seed)
+    side = 400
+    while True:
+        img = Image.effect_noise((side, side * 3 // 4), 40).convert('RGB')
+        img = Image.blend(img, Image.new('RGB', img.size, (rng.randint(0, 255), 120, 80)), 0.5)
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=90)
+        if buffer.tell() >= size_kb * 1024 or side > 4000:
+            return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+        side = int(side * 1.3)
+
+
+class Recorder:
+    """Latencies and errors per endpoint, shared by all simulated clients"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, ms, ok):
+        with self._lock:
+            self.latencies[name].append(ms)
+            if not ok:
+                self.errors[name] += 1
+
+    def rows(self, duration):
+        rows = []
+        with self._lock:
+            names = sorted(self.latencies)
+            for name in names:
+                latencies = sorted(self.latencies[name])
+                rows.append(endpoint_row(name, latencies, self.errors[name], duration))
+            everything = sorted(ms for name in names for ms in self.latencies[name])
+            rows.append(endpoint_row('TOTAL', everything, sum(self.errors.values()), duration))
+        return rows
+
+
+def endpoint_row(name, latencies, errors, duration):
+    percentile = lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 1)
+    return {
+        'endpoint': name,
+        'requests': len(latencies),
+        'rps': round(len(latencies) / duration, 2),
+        'ms_p50': percentile(0.50) if latencies else None,
+        'ms_p95': percentile(0.95) if latencies else None,
+        'ms_p99': percentile(0.99) if latencies else None,
+        'ms_mean': round(statistics.mean(latencies), 1) if latencies else None,
+        'errors': errors,
+    }
+
+
+class Client:
+    """Minimal HTTP client that times every request into a Recorder"""
+
+    def __init__(self, host, port, recorder, keep_alive):
+        self.host, self.port = host, port
+        self.recorder = recorder
+        self.keep_alive = keep_alive
+        self._conn = None
+
+    def request(self, name, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {'Accept-Encoding': 'gzip'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        if not self.keep_alive:
+            headers['Connection'] = 'close'
+        started = time.perf_counter()
+        ok = False
+        data = None
+        try:
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self._conn.request(method, path, body=body, headers=headers)
+            response = self._conn.getresponse()
+            data = response.read()
+            ok = response.status < 400
+            if response.will_close or not self.keep_alive:
+                self.close()
+        except (OSError, http.client.HTTPException):
+            self.close()
+        self.recorder.record(name, (time.perf_counter() - started) * 1000, ok)
+        return data if ok else None
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class Scanner:
+    """One handheld: think, then do one action from SCANNER_MIX"""
+
+    def __init__(self, index, client, catalogue, options, photos):
+        self.rng = random.Random(options.seed * 1000 + index)
+        self.client = client
+        self.barcodes, self.customers = catalogue
+        self.options = options
+        self.photos = photos
+
+    def run(self, stop):
+        actions = list(SCANNER_MIX)
+        weights = list(SCANNER_MIX.values())
+        # Stagger the start so scanners do not fire in lockstep
+        if stop.wait(self.rng.uniform(0, self.options.think_time)):
+            return
+        while not stop.is_set():
+            getattr(self, self.rng.choices(actions, weights)[0])()
+            if stop.wait(self.rng.expovariate(1 / self.options.think_time)):
+                return
+        self.client.close()
+
+    def _photo_field(self):
+        if self.rng.random() >= self.options.photo_rate:
+            return None
+        return json.dumps(self.rng.sample(self.photos, self.rng.choice((1, 1, 2))))
+
+    def lookup(self):
+        barcode = self.rng.choice(self.barcodes)
+        self.client.request('GET /api/products/<barcode>', 'GET', f'/api/products/{barcode}')
+        self.client.request('GET /api/transactions?barcode=', 'GET', f'/api/transactions?barcode={barcode}')
+
+    def _sell(self, items, photo):
+        name, phone = self.rng.choice(self.customers)
+        notes = 'Multi-item sale - Total: ₹0.00' if len(items) > 1 else 'Single item sale - ₹0.00'
+        for barcode in items:
+            self.client.request('POST /api/transactions', 'POST', '/api/transactions', {
+                'barcode': barcode, 'transaction_type': 'OUT', 'quantity': 1,
+                'recipient_name': name, 'recipient_phone': phone, 'recipient_photo': photo, 'notes': notes,
+            })
+
+    def sale(self):
+        self._sell([self.rng.choice(self.barcodes)], self._photo_field())
+
+    def multi_sale(self):
+        self._sell(self.rng.sample(self.barcodes, self.rng.randint(2, 5)), self._photo_field())
+
+    def history(self):
+        self.client.request('GET /api/transactions/grouped', 'GET', '/api/transactions/grouped')
+
+    def customer_search(self):
+        name = self.rng.choice(self.customers)[0].split()[0]
+        self.client.request('GET /api/customers/search/<query>', 'GET', f'/api/customers/search/{quote(name)}')
+
+
+class Dashboard:
+    """One open dashboard tab following /api/events"""
+
+    def __init__(self, index, client, options):
+        self.rng = random.Random(options.seed * 1000 + 500 + index)
+        self.client = client
+        self.sales_tab = index % 2 == 1  # Half the tabs sit on the sales history
+
+    def run(self, stop):
+        if stop.wait(self.rng.uniform(0, DASHBOARD_POLL_SECONDS)):
+            return
+        self.refresh()
+        while not stop.is_set():
+            stream = self._open_stream()
+            if stream is None:
+                # No stream for us: poll until one is free
+                if stop.wait(DASHBOARD_POLL_SECONDS):
+                    break
+                self.refresh()
+                continue
+            self._follow(*stream, stop)
+        self.client.close()
+
+    def refresh(self):
+        self.client.request('GET /api/stats', 'GET', '/api/stats')
+        if self.sales_tab:
+            self.client.request('GET /api/transactions/grouped', 'GET', '/api/transactions/grouped')
+
+    def _open_stream(self):
+        """A socket positioned after the headers of a new event stream, or None when refused"""
+        started = time.perf_counter()
+        sock = None
+        status = None
+        try:
+            sock = socket.create_connection((self.client.host, self.client.port), timeout=60)
+            sock.sendall(f'GET /api/events HTTP/1.1\r\nHost: {self.client.host}\r\n'
+                         f'Accept: text/event-stream\r\n\r\n'.encode())
+            head = b''
+            while b'\r\n\r\n' not in head:
+                data = sock.recv(4096)
+                if not data:
+                    break
+                head += data
+            status = int(head.split(b' ', 2)[1]) if head.startswith(b'HTTP/') else None
+        except (OSError, ValueError, IndexError):
+            pass
+        ok = status == 200
+        self.client.recorder.record('GET /api/events', (time.perf_counter() - started) * 1000, ok)
+        if not ok:
+            if sock is not None:
+                sock.close()
+            return None
+        return sock, head.split(b'\r\n\r\n', 1)[1]
+
+    def _follow(self, sock, received, stop):
+        """Read events until the server ends the stream, refreshing after each quiet burst"""
+        # Raw socket reads: chunk framing is left in, but every event arrives in one piece
+        changed = b'event:' in received
+        tail = received[-8:]
+        sock.settimeout(DASHBOARD_QUIET_SECONDS)
+        try:
+            while not stop.is_set():
+                try:
+                    data = sock.recv(65536)
+                except socket.timeout:
+                    if changed:
+                        self.refresh()
+                        changed = False
+                    continue
+                if not data:
+                    return  # The server ended the stream; reconnect
+                changed = changed or b'event:' in tail + data
+                tail = data[-8:]
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+
+def read_catalogue(database):
+    conn = sqlite3.connect(database)
+    try:
+        barcodes = [row[0] for row in conn.execute('SELECT barcode FROM products')]
+        customers = [tuple(row) for row in conn.execute('SELECT name, phone FROM customers')]
+    finally:
+        conn.close()
+    return barcodes, customers
+
+
+def fetch_catalogue(host, port, seed):
+    """Barcodes and customers of a running server; made-up customers if it has none"""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        conn.request('GET', '/api/products')
+        products = json.loads(conn.getresponse().read())['Result']
+        conn.request('GET', '/api/customers')
+        customers = [(c['name'], c['phone']) for c in json.loads(conn.getresponse().read())['Result']]
+    finally:
+        conn.close()
+    if not products:
+        raise SystemExit('The server has no products to scan')
+    if not customers:
+        customers = [(name, phone) for name, phone, _, _ in make_customers(random.Random(seed), 50, datetime.now())]
+    return [p['barcode'] for p in products], customers
+
+
+def run_load(host, port, catalogue, options, scanners, photos):
+    recorder = Recorder()
+    stop = threading.Event()
+    actors = [Scanner(i, Client(host, port, recorder, keep_alive=False), catalogue, options, photos)
+              for i in range(scanners)]
+    actors += [Dashboard(i, Client(host, port, recorder, keep_alive=True), options)
+               for i in range(options.dashboards)]
+    threads = [threading.Thread(target=actor.run, args=(stop,), daemon=True) for actor in actors]
+    for thread in threads:
+        thread.start()
+    time.sleep(options.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=60)
+    return recorder.rows(options.duration)
+
+
+def print_rows(rows):
+    print(f"{'endpoint':36} {'requests':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for r in rows:
+        print(f"{r['endpoint']:36} {r['requests']:>8} {r['rps']:>7} {r['ms_p50']!s:>8} {r['ms_p95']!s:>8} "
+              f"{r['ms_p99']!s:>8} {r['errors']:>6}")
+
+
+def start_server(workdir, server):
+    port = free_port()
+    env = dict(os.environ, SERVER_PORT=str(port), DISCOVERY_PORT='0', LOG_LEVEL='WARNING')
+    process = subprocess.Popen([sys.executable, 'serve.py', '--server', server], cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_until_up(port):
+        process.kill()
+        raise RuntimeError('server did not start')
+    return process, port
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate handheld scanners and dashboards against the server')
+    parser.add_argument('--scanners', type=int, default=10, help='simulated handhelds')
+    parser.add_argument('--ramp', help='comma-separated scanner counts to run one after another, e.g. 5,10,20')
+    parser.add_argument('--dashboards', type=int, default=2, help='open dashboard tabs')
+    parser.add_argument('--duration', type=int, default=30, help='seconds per run')
+    parser.add_argument('--think-time', type=float, default=3.0,
+                        help='mean seconds a scanner waits between actions')
+    parser.add_argument('--photo-rate', type=float, default=0.3, help='fraction of sales sent with photos')
+    parser.add_argument('--photo-kb', type=int, default=300, help='size of each uploaded photo')
+    parser.add_argument('--server', choices=('waitress', 'uvicorn', 'gunicorn'), default='waitress')
+    parser.add_argument('--url', help='drive an already running server instead of starting one '
+                                      '(its database is written to)')
+    parser.add_argument('--products', type=int, default=2000, help='synthetic database size')
+    parser.add_argument('--days', type=int, default=90, help='days of synthetic sales history')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.ramp.split(',')] if args.ramp else [args.scanners]
+    photos = [make_photo(args.photo_kb, seed) for seed in range(3)]
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            target = urlsplit(args.url)
+            host, port = target.hostname, target.port or 80
+            catalogue = fetch_catalogue(host, port, args.seed)
+        else:
+            here = os.path.dirname(os.path.abspath(__file__))
+            workdir = os.path.join(tmp, 'server')
+            shutil.copytree(here, workdir, ignore=shutil.ignore_patterns(
+                '__pycache__', 'uploads', 'thumbnail_cache', 'upload_sessions', '*.db'))
+            database = os.path.join(workdir, 'inventory.db')
+            clean_copy = os.path.join(tmp, 'clean.db')
+            counts = build_synthetic_db(clean_copy, products=args.products, days=args.days, seed=args.seed)
+            print(f"Synthetic database: {counts['products']} products, {counts['customers']} customers, "
+                  f"{counts['transactions']} transactions")
+            catalogue = read_catalogue(clean_copy)
+
+        for scanners in levels:
+            process = None
+            if not args.url:
+                # A fresh copy of the database per level, so earlier sales do not skew later runs
+                shutil.copy(clean_copy, database)
+                process, port = start_server(workdir, args.server)
+                host = '127.0.0.1'
+            print(f"\n▶ {scanners} scanners, {args.dashboards} dashboards, {args.duration}s "
+                  f"(think time {args.think_time}s, {args.server if not args.url else args.url})")
+            try:
+                rows = run_load(host, port, catalogue, args, scanners, photos)
+            finally:
+                if process:
+                    stop_server(process)
+            print_rows(rows)
+            results.append({'scanners': scanners, 'dashboards': args.dashboards, 'rows': rows})
+
+    if len(results) > 1:
+        print(f"\n{'scanners':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for result in results:
+            total = result['rows'][-1]
+            print(f"{result['scanners']:>8} {total['rps']:>7} {total['ms_p50']!s:>8} {total['ms_p95']!s:>8} "
+                  f"{total['ms_p99']!s:>8} {total['errors']:>6}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'options': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Logging for the server: levelled, per-module and off the request threads.
+
+Modules log through logging.getLogger(__name__) with %-style arguments, so a
+message below the configured level costs one level check and is never
+formatted. Records that pass go onto a queue and a single listener thread
+writes them, so a request never waits on the console or a log file.
+
+Messages logged once per row or per photo can be sampled: pass
+extra=sample_every(100) and only every 100th record from that call site is
+kept.
+
+Environment:
+    LOG_LEVEL   DEBUG, INFO (default), WARNING or ERROR
+    LOG_FILE    also write to this file (rotated at 10MB, 5 kept)
+"""
+
+import atexit
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+_listener = None
+
+
+def sample_every(n):
+    """`extra` for a log call that should keep only every nth record from its call site"""
+    return {'sample_every': n}
+
+
+class SamplingFilter(logging.Filter):
+    """Keep every nth record of call sites that asked for sampling; pass everything else"""
+
+    def __init__(self):
+        super().__init__()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        every = getattr(record, 'sample_every', None)
+        if not every or every <= 1:
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = itertools.count()
+            seen = next(counter)
+        if seen % every:
+            return False
+        if seen:
+            record.msg = f'{record.msg} [1 of every {every} shown]'
+        return True
+
+
+def configure_logging(level=None, log_file=None):
+    """Send all logging through a queue to the console (and LOG_FILE); safe to call more than once"""
+    global _listener
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    log_file = log_file or os.environ.get('LOG_FILE')
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flush what is still queued on shutdown
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Build a synthetic inventory database for load tests and benchmarks.
+
+The schema comes from app.init_db(), so it always matches the server. The
+data imitates a shop: a product catalogue, regular customers, daily
+restocks and sales spread over shop hours, with multi-item sales recorded
+the way the app records them (one priced OUT transaction per item, sharing
+the customer, timestamp and "Multi-item sale - Total: ..." notes).
+
+Nothing random depends on the clock, so the same --seed always gives the
+same database.
+
+Usage (from the server directory):
+    python make_synthetic_db.py synthetic.db
+    python make_synthetic_db.py synthetic.db --products 5000 --days 365 --sales-per-day 200
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+WORDS = (
+    'Basmati', 'Rice', 'Toor', 'Dal', 'Sunflower', 'Oil', 'Atta', 'Sugar', 'Tea', 'Coffee', 'Biscuits', 'Soap',
+    'Shampoo', 'Toothpaste', 'Detergent', 'Salt', 'Masala', 'Ghee', 'Paneer', 'Noodles', 'Jam', 'Honey', 'Ketchup',
+    'Pickle', 'Poha', 'Rava', 'Besan', 'Jaggery', 'Cashew', 'Almond', 'Raisins', 'Chilli', 'Turmeric', 'Cumin',
+)
+SIZES = ('100g', '200g', '250g', '500g', '1kg', '2kg', '5kg', '500ml', '1L', '5L', 'Pack of 6', 'Family Pack')
+FIRST_NAMES = ('Aarav', 'Priya', 'Rahul', 'Anita', 'Vikram', 'Sneha', 'Arjun', 'Kavya', 'Rohan', 'Meera', 'Karan',
+               'Divya', 'Suresh', 'Lakshmi', 'Imran', 'Fatima', 'Joseph', 'Mary', 'Harpreet', 'Gurpreet')
+LAST_NAMES = ('Sharma', 'Patel', 'Reddy', 'Iyer', 'Khan', 'Singh', 'Nair', 'Das', 'Gupta', 'Joshi', 'Mehta', 'Rao')
+
+# Shop hours (IST, as get_local_timestamp records them)
+OPENING_HOUR = 9
+CLOSING_HOUR = 21
+
+
+def ean13(n):
+    """A valid EAN-13 barcode for the nth product"""
+    digits = f'890{n:09d}'
+    checksum = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    return digits + str(checksum)
+
+
+def make_products(rng, count, start):
+    products = []
+    for n in range(count):
+        name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(SIZES)}"
+        mrp = round(rng.choice((10, 20, 35, 49, 60, 85, 99, 120, 150, 199, 249, 399, 599)) * rng.uniform(0.9, 1.1), 2)
+        created = start - timedelta(days=rng.randint(0, 30), minutes=rng.randint(0, 600))
+        products.append((ean13(n), name, None, mrp, rng.randint(0, 200), created.strftime('%Y-%m-%d %H:%M:%S')))
+    return products
+
+
+def make_customers(rng, count, start):
+    customers, phones = [], set()
+    while len(customers) < count:
+        phone = f'9{rng.randint(0, 999999999):09d}'
+        if phone in phones:
+            continue
+        phones.add(phone)
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        notes = rng.choice(('', '', '', 'Regular', 'Pays monthly', 'Prefers delivery'))
+        customers.append((name, phone, notes, start.strftime('%Y-%m-%d %H:%M:%S')))
+    return customers
+
+
+def make_locations(rng, products, count, start):
+    """Product location rows, each with one to three (path-only) photos"""
+    locations, images = [], []
+    for n in range(count):
+        product_name = rng.choice(products)[1]
+        created = start + timedelta(hours=n)
+        stamp = created.strftime('%Y-%m-%d %H:%M:%S')
+        paths = [f"find_photos/location_{n}_{i}.webp" for i in range(rng.randint(1, 3))]
+        locations.append((product_name, f"Aisle {rng.randint(1, 12)} Shelf {rng.choice('ABCDEF')}", paths[0],
+                          rng.choice(('', 'Top shelf', 'Behind the counter')), stamp, stamp))
+        images.append(paths)
+    return locations, images
+
+
+def make_transactions(rng, products, customers, start, days, sales_per_day, photo_rate):
+    """Restocks and sales for each day, oldest first"""
+    # A few products sell far more than the rest, as in a real shop
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(products))]
+    rows = []
+    for day in range(days):
+        date = start + timedelta(days=day)
+        for _ in range(rng.randint(1, 4)):
+            barcode, name, _, mrp, _, _ = rng.choice(products)
+            when = date.replace(hour=OPENING_HOUR, minute=rng.randint(0, 59), second=rng.randint(0, 59))
+            rows.append((barcode, 'IN', rng.choice((12, 24, 48, 100)), None, None, None,
+                         when.strftime('%Y-%m-%d %H:%M:%S'), 'Restock', None, None))
+        for _ in range(max(0, int(rng.gauss(sales_per_day, sales_per_day / 5)))):
+            name, phone, _, _ = rng.choice(customers)
+            seconds = rng.randint(0, (CLOSING_HOUR - OPENING_HOUR) * 3600 - 1)
+            when = (date.replace(hour=OPENING_HOUR, minute=0, second=0) + timedelta(seconds=seconds))
+            items = rng.choices(products, weights=weights, k=rng.choice((1, 1, 1, 2, 2, 3, 4, 6)))
+            quantities = [rng.choice((1, 1, 1, 2, 3, 5)) for _ in items]
+            total = sum(item[3] * quantity for item, quantity in zip(items, quantities))
+            notes = (f'Multi-item sale - Total: ₹{total:.2f}' if len(items) > 1
+                     else f'Single item sale - ₹{total:.2f}')
+            photo = None
+            if rng.random() < photo_rate:
+                photo = f"customer_photos/customer_{name.replace(' ', '_')}_{phone}_{when:%Y%m%d_%H%M%S}.webp"
+            for item, quantity in zip(items, quantities):
+                rows.append((item[0], 'OUT', quantity, name, phone, photo, when.strftime('%Y-%m-%d %H:%M:%S'), notes,
+                             item[3], round(item[3] * quantity, 2)))
+    rows.sort(key=lambda row: row[6])
+    return rows
+
+
+def build(path, products=2000, customers=300, days=90, sales_per_day=120, photo_rate=0.3, seed=0,
+          locations=200, end=datetime(2026, 1, 1)):
+    """Create a synthetic database at path (replacing any file there); returns row counts"""
+    import app  # Only for init_db(); importing app has no side effects
+
+    if os.path.exists(path):
+        os.remove(path)
+    app.app.config['DATABASE'] = path
+    app.init_db()
+
+    rng = random.Random(seed)
+    start = end - timedelta(days=days)
+    product_rows = make_products(rng, products, start)
+    customer_rows = make_customers(rng, customers, start)
+    transaction_rows = make_transactions(rng, product_rows, customer_rows, start, days, sales_per_day, photo_rate)
+    location_rows, location_images = make_locations(rng, product_rows, locations, start)
+
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany('''
+            INSERT INTO products (barcode, name, image_path, mrp, quantity, created_date) VALUES (?, ?, ?, ?, ?, ?)
+        ''', product_rows)
+        conn.executemany('INSERT INTO customers (name, phone, notes, created_date) VALUES (?, ?, ?, ?)',
+                         customer_rows)
+        conn.executemany('''
+            INSERT INTO transactions (barcode, transaction_type, quantity, recipient_name, recipient_phone,
+                                      recipient_photo, transaction_date, notes, unit_price, line_total)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', transaction_rows)
+        for location, paths in zip(location_rows, location_images):
+            location_id = conn.execute('''
+                INSERT INTO product_location_photos (product_name, location_name, image_path, notes, created_date,
+                                                     updated_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', location).lastrowid
+            conn.executemany(
+                'INSERT INTO product_location_images (location_id, image_path, image_order) VALUES (?, ?, ?)',
+                [(location_id, image_path, order) for order, image_path in enumerate(paths, 1)])
+        conn.execute('DELETE FROM change_events')  # The bulk load is not news to any client
+    conn.execute('ANALYZE')
+    conn.close()
+    return {'products': len(product_rows), 'customers': len(customer_rows), 'transactions': len(transaction_rows),
+            'locations': len(location_rows)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a synthetic inventory database')
+    parser.add_argument('path', help='database file to create (replaced if it exists)')
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--customers', type=int, default=300)
+    parser.add_argument('--days', type=int, default=90, help='days of sales history')
+    parser.add_argument('--sales-per-day', type=int, default=120)
+    parser.add_argument('--photo-rate', type=float, default=0.3, help='fraction of sales with a customer photo')
+    parser.add_argument('--locations', type=int, default=200, help='product location entries')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    counts = build(args.path, args.products, args.customers, args.days, args.sales_per_day, args.photo_rate, args.seed,
+                   args.locations)
+    size_mb = os.path.getsize(args.path) / 1024 / 1024
+    print(f"✅ {args.path}: {counts['products']} products, {counts['customers']} customers, "
+          f"{counts['transactions']} transactions, {counts['locations']} locations ({size_mb:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+In-process request metrics rendered in the Prometheus text format.
+
+Recording is a dict lookup and a few additions under a per-metric lock;
+nothing is formatted until /metrics is scraped, so an unscraped server pays
+almost nothing. Label values must come from a small set (route templates,
+methods, status codes, profile names), never from raw URLs.
+
+SQLite time is measured by TimedConnection, a sqlite3.Connection factory
+whose cursors add the time spent in execute and fetch calls to the current
+thread's request total (see get_db_connection in app.py).
+"""
+
+import bisect
+import sqlite3
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f'{self.name}{_labels(self.labelnames, k)} {_number(v)}' for k, v in values]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        lines = self.header()
+        for labels, counts in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", _number(bound))])} '
+                             f'{cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(counts[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def add_collector(self, collect):
+        """collect() -> [(name, kind, documentation, value)], called only when scraped"""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, documentation, value in collect():
+                lines.extend([f'# HELP {name} {documentation}', f'# TYPE {name} {kind}', f'{name} {_number(value)}'])
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'http_requests_total', 'Requests handled, by route template, method and status', ('route', 'method', 'status'))
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Request latency by route template', ('route', 'method'))
+http_response_size = registry.histogram(
+    'http_response_size_bytes', 'Response body size by route template', ('route',), buckets=SIZE_BUCKETS)
+http_in_flight = registry.gauge('http_requests_in_flight', 'Requests currently being handled')
+sqlite_duration = registry.histogram(
+    'sqlite_request_duration_seconds', 'Time spent in SQLite per request, by route template', ('route',))
+sqlite_statements = registry.counter(
+    'sqlite_statements_total', 'SQL statements executed, by route template', ('route',))
+compression_duration = registry.histogram(
+    'image_compression_duration_seconds', 'Pillow compression time per photo', ('profile',))
+compression_input = registry.counter(
+    'image_compression_input_bytes_total', 'Bytes of photos before compression', ('profile',))
+compression_saved = registry.counter(
+    'image_compression_saved_bytes_total', 'Bytes saved by compression', ('profile',))
+
+_request = threading.local()
+
+
+def observe_request(route, method, status, seconds, size=None):
+    http_requests.inc(route, method, str(status))
+    http_request_duration.observe(seconds, route, method)
+    if size is not None:
+        http_response_size.observe(size, route)
+
+
+def start_request():
+    """Begin timing a request on this thread"""
+    _request.started = time.perf_counter()
+    _request.sqlite_seconds = 0.0
+    _request.sqlite_statements = 0
+    http_in_flight.inc()
+
+
+def finish_request(route, method, status, size):
+    """Record the response of the request started on this thread"""
+    started = getattr(_request, 'started', None)
+    if started is None:
+        return
+    observe_request(route, method, status, time.perf_counter() - started, size)
+    if _request.sqlite_statements:
+        sqlite_duration.observe(_request.sqlite_seconds, route)
+        sqlite_statements.inc(route, amount=_request.sqlite_statements)
+
+
+def end_request():
+    """Stop tracking this thread's request; runs even when no response was produced"""
+    if getattr(_request, 'started', None) is not None:
+        _request.started = None
+        http_in_flight.dec()
+
+
+def record_compression(profile, stats):
+    """Record the compress_seconds/input_bytes/output_bytes that save_image_bytes put in stats"""
+    if 'compress_seconds' not in stats:
+        return
+    compression_duration.observe(stats['compress_seconds'], profile)
+    compression_input.inc(profile, amount=stats['input_bytes'])
+    compression_saved.inc(profile, amount=max(0, stats['input_bytes'] - stats['output_bytes']))
+
+
+def _add_sqlite_time(started, statements=0):
+    if getattr(_request, 'started', None) is not None:
+        _request.sqlite_seconds += time.perf_counter() - started
+        _request.sqlite_statements += statements
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that adds its execute and fetch time to the current request"""
+
+    def execute(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            _add_sqlite_time(started, 1)
+
+    def executemany(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            _add_sqlite_time(started, 1)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _add_sqlite_time(started)
+
+    def fetchmany(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(*args)
+        finally:
+            _add_sqlite_time(started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _add_sqlite_time(started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection factory for sqlite3.connect(..., factory=TimedConnection)"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _add_sqlite_time(started)
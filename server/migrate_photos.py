@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Move photos stored inline as base64 in the database out to the photo store.
+
+Older app versions saved photos straight into the database: customer photos
+in transactions.recipient_photo (as a data:image URL or a JSON array of
+them) and product and shelf-location pictures in the image_path columns.
+This tool streams those rows in batches, decodes and compresses the photos
+on a process pool, writes the new file paths back with executemany and
+checkpoints after every batch, so a run that crashes or is interrupted
+resumes where it stopped.
+
+It does not import the Flask app and can run while the server is up.
+Run it from the server directory:
+    python migrate_photos.py --dry-run
+    python migrate_photos.py --workers 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import image_processing
+import photo_catalog
+
+INLINE_PREFIX = 'data:image'
+
+# Columns that may hold inline photos: the row columns used to name the
+# files, where the files go, the compression profile and the filename pattern
+MIGRATION_TARGETS = {
+    'transactions.recipient_photo': {
+        'table': 'transactions', 'column': 'recipient_photo',
+        'name_columns': ('recipient_name', 'recipient_phone'),
+        'folder': 'customer_photos', 'profile': 'customer',
+        'filename': 'customer_{key}_fixed_{stamp}_{seq}.jpg',
+    },
+    'products.image_path': {
+        'table': 'products', 'column': 'image_path', 'name_columns': ('barcode',),
+        'folder': 'product_photos', 'profile': 'product',
+        'filename': '{barcode}_{stamp}_{seq}.jpg',
+    },
+    'product_location_photos.image_path': {
+        'table': 'product_location_photos', 'column': 'image_path', 'name_columns': ('product_name',),
+        'folder': 'find-photos', 'profile': 'location',
+        'filename': 'location_{product_name}_{stamp}_{seq}.jpg',
+    },
+    'product_location_images.image_path': {
+        'table': 'product_location_images', 'column': 'image_path', 'name_columns': ('location_id',),
+        'folder': 'find-photos', 'profile': 'location',
+        'filename': 'location_{location_id}_{stamp}_{seq}.jpg',
+    },
+}
+
+
+def candidate_condition(column):
+    """Rows are selected if the column holds an inline photo or a JSON array with one"""
+    return f"({column} LIKE '{INLINE_PREFIX}%' OR ({column} LIKE '[%' AND {column} LIKE '%{INLINE_PREFIX}%'))"
+
+
+def ensure_schema(cursor):
+    """Create the checkpoint table (one row per migrated column)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS photo_migration_state (
+            target TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            migrated_rows INTEGER NOT NULL DEFAULT 0,
+            saved_photos INTEGER NOT NULL DEFAULT 0,
+            failed_photos INTEGER NOT NULL DEFAULT 0,
+            updated_date TEXT
+        )
+    ''')
+
+
+def _quiet_worker():
+    """Process pool initializer: failed photos are reported by the parent, not by each worker"""
+    logging.disable(logging.CRITICAL)
+
+
+def save_photo(job):
+    """Decode, compress and save one inline photo (runs in a worker process)"""
+    row_id, index, data, filename, folder, profile = job
+    success, full_path, error = image_processing.process_and_save_image(
+        data, filename, folder, compress=True, profile=profile
+    )
+    return row_id, index, (os.path.basename(full_path) if success else None), error, len(data)
+
+
+class PhotoMigration:
+    """Batched, parallel and resumable migration of inline photos to files"""
+
+    def __init__(self, database, upload_folder, targets=None, batch_size=50, workers=None):
+        self.database = database
+        self.upload_folder = upload_folder
+        self.targets = list(targets or MIGRATION_TARGETS)
+        self.batch_size = batch_size
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.run_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self._sequence = 0  # Keeps filenames unique within a run
+
+    def count_candidates(self, cursor, target, after_id=0):
+        spec = MIGRATION_TARGETS[target]
+        cursor.execute(f'''
+            SELECT COUNT(*) FROM {spec['table']} WHERE id > ? AND {candidate_condition(spec['column'])}
+        ''', (after_id,))
+        return cursor.fetchone()[0]
+
+    def _load_state(self, cursor, target, restart):
+        if restart:
+            cursor.execute('DELETE FROM photo_migration_state WHERE target = ?', (target,))
+        cursor.execute('''
+            SELECT last_id, migrated_rows, saved_photos, failed_photos
+            FROM photo_migration_state WHERE target = ?
+        ''', (target,))
+        row = cursor.fetchone()
+        keys = ('last_id', 'migrated_rows', 'saved_photos', 'failed_photos')
+        return dict(zip(keys, row)) if row else dict.fromkeys(keys, 0)
+
+    def _save_state(self, cursor, target, state):
+        cursor.execute('''
+            INSERT OR REPLACE INTO photo_migration_state
+            (target, last_id, migrated_rows, saved_photos, failed_photos, updated_date)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (target, state['last_id'], state['migrated_rows'], state['saved_photos'],
+              state['failed_photos'], datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+    def _fetch_batch(self, cursor, target, after_id):
+        spec = MIGRATION_TARGETS[target]
+        cursor.execute(f'''
+            SELECT id, {', '.join(spec['name_columns'])}, {spec['column']}
+            FROM {spec['table']}
+            WHERE id > ? AND {candidate_condition(spec['column'])}
+            ORDER BY id
+            LIMIT ?
+        ''', (after_id, self.batch_size))
+        return cursor.fetchall()
+
+    def _plan(self, target, rows):
+        """Turn a batch of rows into photo jobs plus what is needed to rebuild each value"""
+        spec = MIGRATION_TARGETS[target]
+        folder = os.path.join(self.upload_folder, spec['folder'])
+        jobs, plans = [], {}
+        for row in rows:
+            row_id, value = row[0], row[-1]
+            names = {
+                column: str(v if v is not None else 'unknown').replace(' ', '_').replace('/', '_')
+                for column, v in zip(spec['name_columns'], row[1:-1])
+            }
+            if value.startswith(INLINE_PREFIX):
+                photos, is_array = [value], False
+            else:
+                try:
+                    photos, is_array = json.loads(value), True
+                except ValueError:
+                    continue
+                if not isinstance(photos, list):
+                    continue
+            customer_key = None
+            if target == 'transactions.recipient_photo':
+                customer_key = photo_catalog.customer_photo_key(row[1], row[2])
+            plans[row_id] = (customer_key, photos, is_array)
+            for index, photo in enumerate(photos):
+                if isinstance(photo, str) and photo.startswith(INLINE_PREFIX):
+                    self._sequence += 1
+                    filename = spec['filename'].format(key=customer_key, stamp=self.run_stamp,
+                                                       seq=self._sequence, **names)
+                    jobs.append((row_id, index, photo, filename, folder, spec['profile']))
+        return jobs, plans
+
+    def run(self, restart=False, dry_run=False):
+        """Migrate every candidate row of every target; returns {target: final state}"""
+        conn = sqlite3.connect(self.database, timeout=30)
+        cursor = conn.cursor()
+        ensure_schema(cursor)
+        photo_catalog.ensure_schema(cursor)
+        conn.commit()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = {row[0] for row in cursor.fetchall()}
+        targets = [target for target in self.targets if MIGRATION_TARGETS[target]['table'] in tables]
+
+        executor = None
+        if self.workers > 1 and not dry_run:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_quiet_worker)
+        try:
+            return {target: self._migrate(conn, target, executor, restart, dry_run) for target in targets}
+        finally:
+            if executor:
+                executor.shutdown()
+            conn.close()
+
+    def _migrate(self, conn, target, executor, restart, dry_run):
+        """Migrate one column; returns its final state with throughput figures"""
+        spec = MIGRATION_TARGETS[target]
+        cursor = conn.cursor()
+        state = self._load_state(cursor, target, restart)
+        remaining = self.count_candidates(cursor, target, state['last_id'])
+        if state['last_id']:
+            print(f"{target}: resuming after row {state['last_id']} ({state['migrated_rows']} rows already migrated)")
+        print(f"📊 {target}: {remaining} rows with inline photos to migrate")
+        if dry_run or not remaining:
+            return state
+
+        os.makedirs(os.path.join(self.upload_folder, spec['folder']), exist_ok=True)
+        started = time.monotonic()
+        photos_done = bytes_in = 0
+
+        while True:
+            rows = self._fetch_batch(cursor, target, state['last_id'])
+            if not rows:
+                break
+            jobs, plans = self._plan(target, rows)
+
+            if executor:
+                results = list(executor.map(save_photo, jobs, chunksize=max(1, len(jobs) // (self.workers * 4))))
+            else:
+                results = [save_photo(job) for job in jobs]
+
+            saved = {}
+            for row_id, index, filename, error, size in results:
+                bytes_in += size
+                if filename:
+                    saved[(row_id, index)] = f"{spec['folder']}/{filename}"
+                    state['saved_photos'] += 1
+                else:
+                    state['failed_photos'] += 1
+                    print(f"    ❌ {spec['table']} row {row_id} photo {index + 1}: {error}")
+            photos_done += len(results)
+
+            saved_paths = set(saved.values())
+            updates, catalogued = [], []
+            for row_id, (customer_key, photos, is_array) in plans.items():
+                # Photos that failed to convert are kept inline so nothing is lost
+                new_photos = [saved.get((row_id, index), photo) for index, photo in enumerate(photos)]
+                if new_photos == photos:
+                    continue
+                if customer_key:
+                    catalogued.extend((customer_key, path) for path in new_photos if path in saved_paths)
+                updates.append((json.dumps(new_photos) if is_array else new_photos[0], row_id))
+
+            cursor.executemany(f"UPDATE {spec['table']} SET {spec['column']} = ? WHERE id = ?", updates)
+            photo_catalog.register_customer_photos(cursor, catalogued)
+            state['migrated_rows'] += len(updates)
+            state['last_id'] = rows[-1][0]
+            self._save_state(cursor, target, state)
+            conn.commit()
+
+            elapsed = time.monotonic() - started
+            print(f"  ✅ {target} up to row {state['last_id']}: {state['migrated_rows']} rows, "
+                  f"{photos_done / elapsed:.1f} photos/s, {bytes_in / 1024 / 1024 / elapsed:.2f} MB/s")
+
+        elapsed = time.monotonic() - started
+        state['elapsed_seconds'] = round(elapsed, 1)
+        state['photos_per_second'] = round(photos_done / elapsed, 1) if elapsed else 0
+        return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move inline base64 photos out of the database')
+    parser.add_argument('--database', default='inventory.db')
+    parser.add_argument('--uploads', default='uploads')
+    parser.add_argument('--target', action='append', choices=list(MIGRATION_TARGETS),
+                        help='column to migrate (repeatable, default: all)')
+    parser.add_argument('--batch-size', type=int, default=50, help='rows per batch and checkpoint')
+    parser.add_argument('--workers', type=int, default=None, help='compression processes (default: CPU count)')
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint and start from the first row')
+    parser.add_argument('--dry-run', action='store_true', help='only count the rows that need migrating')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"❌ {args.database} not found. Make sure you're running this from the server directory.")
+        return
+
+    print("🔧 Photo Migration Tool")
+    print("=" * 50)
+    migration = PhotoMigration(args.database, args.uploads, targets=args.target,
+                               batch_size=args.batch_size, workers=args.workers)
+    for target, state in migration.run(restart=args.restart, dry_run=args.dry_run).items():
+        if 'elapsed_seconds' in state:
+            print(f"\n🎉 {target}: migrated {state['migrated_rows']} rows, {state['saved_photos']} photos saved, "
+                  f"{state['failed_photos']} failed, {state['elapsed_seconds']}s ({state['photos_per_second']} photos/s)")
+
+
+if __name__ == '__main__':
+    main()
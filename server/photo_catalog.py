@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Database-backed catalogue of customer photos.
+
+Customer photos are saved as customer_<key>_<timestamp>[_n].<ext>. Instead of
+globbing the customer_photos folder on every lookup, each photo is recorded
+in the customer_photo_catalog table when it is written and removed when it
+is deleted, so lookups are a single indexed query.
+
+Run this file directly to reconcile the catalogue with what is on disk:
+    python photo_catalog.py
+"""
+
+import os
+import re
+import sqlite3
+import sys
+
+CUSTOMER_PHOTO_PREFIX = 'customer_photos/'
+
+# customer_<key>_[fixed_]<YYYYmmdd>_<HHMMSS>[_<n>].<ext>
+CUSTOMER_PHOTO_PATTERN = re.compile(
+    r'^customer_(?P<key>.+?)_(?:fixed_)?\d{8}_\d{6}(?:_\d+)?\.[A-Za-z0-9]+$'
+)
+
+# Stay well below SQLite's bound-parameter limit
+QUERY_BATCH_SIZE = 500
+
+
+def customer_photo_key(customer_name, customer_phone):
+    """Key used in customer photo filenames (same rules the upload paths use);
+    a missing name or phone gets the upload paths' defaults, 'Unknown' and ''"""
+    if customer_name is None:
+        customer_name = 'Unknown'
+    if customer_phone is None:
+        customer_phone = ''
+    return f"{customer_name}_{customer_phone}".replace(' ', '_').replace('+', '').replace('(', '').replace(')', '')
+
+
+def parse_customer_photo_filename(filename):
+    """Return the customer key encoded in a photo filename, or None"""
+    match = CUSTOMER_PHOTO_PATTERN.match(filename)
+    return match.group('key') if match else None
+
+
+def ensure_schema(cursor):
+    """Create the catalogue table and its lookup index"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customer_photo_catalog (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_key TEXT NOT NULL,
+            photo_path TEXT UNIQUE NOT NULL,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_customer_photo_catalog_key
+        ON customer_photo_catalog (customer_key, photo_path)
+    ''')
+
+
+def register_customer_photo(cursor, customer_key, photo_path):
+    """Record a newly written customer photo (photo_path is customer_photos/<file>)"""
+    cursor.execute('''
+        INSERT OR IGNORE INTO customer_photo_catalog (customer_key, photo_path)
+        VALUES (?, ?)
+    ''', (customer_key, photo_path))
+
+
+def register_customer_photos(cursor, photos):
+    """Record many customer photos at once from (customer_key, photo_path) pairs"""
+    cursor.executemany('''
+        INSERT OR IGNORE INTO customer_photo_catalog (customer_key, photo_path)
+        VALUES (?, ?)
+    ''', photos)
+
+
+def unregister_photos(cursor, photo_paths):
+    """Forget deleted photos; paths that are not customer photos are ignored"""
+    paths = [p for p in photo_paths if p and p.startswith(CUSTOMER_PHOTO_PREFIX)]
+    for start in range(0, len(paths), QUERY_BATCH_SIZE):
+        batch = paths[start:start + QUERY_BATCH_SIZE]
+        placeholders = ','.join('?' * len(batch))
+        cursor.execute(f'DELETE FROM customer_photo_catalog WHERE photo_path IN ({placeholders})', batch)
+
+
+def photos_for_key(cursor, customer_key):
+    """All catalogued photos for one customer, oldest first"""
+    cursor.execute('''
+        SELECT photo_path FROM customer_photo_catalog
+        WHERE customer_key = ?
+        ORDER BY photo_path
+    ''', (customer_key,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def photos_for_keys(cursor, customer_keys):
+    """Catalogued photos for many customers at once: {customer_key: [photo_path, ...]}"""
+    keys = list(set(customer_keys))
+    photos = {}
+    for start in range(0, len(keys), QUERY_BATCH_SIZE):
+        batch = keys[start:start + QUERY_BATCH_SIZE]
+        placeholders = ','.join('?' * len(batch))
+        cursor.execute(f'''
+            SELECT customer_key, photo_path FROM customer_photo_catalog
+            WHERE customer_key IN ({placeholders})
+            ORDER BY customer_key, photo_path
+        ''', batch)
+        for customer_key, photo_path in cursor.fetchall():
+            photos.setdefault(customer_key, []).append(photo_path)
+    return photos
+
+
+def reconcile(conn, photos_folder):
+    """
+    Bring the catalogue in line with the customer_photos folder
+
+    Scans the folder once with os.scandir, adds files that are missing from
+    the catalogue and drops rows whose files no longer exist.
+
+    Returns:
+        Tuple: (added: int, removed: int)
+    """
+    on_disk = {}
+    if os.path.isdir(photos_folder):
+        with os.scandir(photos_folder) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                customer_key = parse_customer_photo_filename(entry.name)
+                if customer_key:
+                    on_disk[CUSTOMER_PHOTO_PREFIX + entry.name] = customer_key
+
+    cursor = conn.cursor()
+    ensure_schema(cursor)
+    cursor.execute('SELECT photo_path FROM customer_photo_catalog')
+    catalogued = {row[0] for row in cursor.fetchall()}
+
+    missing = [(key, path) for path, key in on_disk.items() if path not in catalogued]
+    stale = [path for path in catalogued if path not in on_disk]
+
+    register_customer_photos(cursor, missing)
+    unregister_photos(cursor, stale)
+    conn.commit()
+    return len(missing), len(stale)
+
+
+def main():
+    database = sys.argv[1] if len(sys.argv) > 1 else 'inventory.db'
+    photos_folder = sys.argv[2] if len(sys.argv) > 2 else os.path.join('uploads', 'customer_photos')
+
+    if not os.path.exists(database):
+        print(f"❌ {database} not found. Make sure you're running this from the server directory.")
+        return
+
+    conn = sqlite3.connect(database)
+    try:
+        added, removed = reconcile(conn, photos_folder)
+    finally:
+        conn.close()
+    print(f"✅ Photo catalogue reconciled: {added} added, {removed} stale entries removed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Incremental garbage collector for orphaned photo files.
+
+Walks the photo folders in filename order, checks each batch of
+filenames against the tables that reference photos (transactions, including
+JSON photo arrays, products and product locations) and deletes files nothing
+points at. Progress is checkpointed in the photo_gc_state table after every
+batch (the last filename checked), so a run that is stopped or interrupted
+resumes after it, even if photos were added or deleted in the meantime.
+
+Run this file directly for a one-off pass from the server directory:
+    python photo_gc.py --dry-run
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import photo_catalog
+
+logger = logging.getLogger(__name__)
+
+# '' is the uploads root, where older builds saved customer photos
+GC_FOLDERS = ('customer_photos', 'product_photos', 'find-photos', '')
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+# Stay well below SQLite's bound-parameter limit
+QUERY_BATCH_SIZE = 500
+
+# (table, column, extra condition matching the column's partial index)
+REFERENCE_COLUMNS = (
+    ('transactions', 'recipient_photo', "AND recipient_photo NOT LIKE 'data:%'"),
+    ('products', 'image_path', ''),
+    ('product_location_photos', 'image_path', ''),
+    ('product_location_images', 'image_path', ''),
+)
+
+
+def ensure_schema(cursor):
+    """Create the checkpoint table and the indexes used for reference checks"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS photo_gc_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            status TEXT NOT NULL,              -- 'running', 'stopped' or 'finished'
+            dry_run INTEGER NOT NULL DEFAULT 0,
+            folder_index INTEGER NOT NULL DEFAULT 0,
+            last_name TEXT NOT NULL DEFAULT '',  -- files up to this name are done in the current folder
+            scanned INTEGER NOT NULL DEFAULT 0,
+            orphaned INTEGER NOT NULL DEFAULT 0,
+            orphaned_bytes INTEGER NOT NULL DEFAULT 0,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            started_date TEXT,
+            updated_date TEXT
+        )
+    ''')
+    cursor.execute('PRAGMA table_info(photo_gc_state)')
+    if 'last_name' not in {column[1] for column in cursor.fetchall()}:
+        # Older builds checkpointed a file count, which doesn't survive folder changes
+        cursor.execute("ALTER TABLE photo_gc_state ADD COLUMN last_name TEXT NOT NULL DEFAULT ''")
+    # Inline base64 photos are excluded so they don't bloat the index
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_recipient_photo
+        ON transactions (recipient_photo) WHERE recipient_photo NOT LIKE 'data:%'
+    ''')
+    # Lets the JSON-array check visit only rows that hold an array
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_photo_arrays
+        ON transactions (recipient_photo) WHERE recipient_photo LIKE '[%'
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_image_path ON products (image_path)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_location_photos_image_path ON product_location_photos (image_path)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_location_images_image_path ON product_location_images (image_path)')
+
+
+def candidate_references(folder, filename):
+    """Every string the database may use to refer to uploads/<folder>/<filename>"""
+    if not folder:
+        return [filename, f"uploads/{filename}"]
+    references = [f"{folder}/{filename}", f"uploads/{folder}/{filename}"]
+    if folder == 'customer_photos':
+        # Bare filenames in recipient_photo are resolved against customer_photos/
+        references.append(filename)
+    return references
+
+
+def find_referenced(cursor, references):
+    """Return the subset of references that some row in the database points at"""
+    found = set()
+    references = list(references)
+    for start in range(0, len(references), QUERY_BATCH_SIZE):
+        batch = references[start:start + QUERY_BATCH_SIZE]
+        placeholders = ','.join('?' * len(batch))
+        for table, column, extra in REFERENCE_COLUMNS:
+            cursor.execute(f'SELECT DISTINCT {column} FROM {table} WHERE {column} IN ({placeholders}) {extra}', batch)
+            found.update(row[0] for row in cursor.fetchall())
+        cursor.execute(f'''
+            SELECT DISTINCT photo.value
+            FROM transactions t, json_each(t.recipient_photo) photo
+            WHERE t.recipient_photo LIKE '[%' AND json_valid(t.recipient_photo)
+            AND photo.value IN ({placeholders})
+        ''', batch)
+        found.update(row[0] for row in cursor.fetchall())
+    return found
+
+
+class PhotoGarbageCollector:
+    """Batched, rate-limited and resumable orphan photo cleanup"""
+
+    def __init__(self, database, upload_folder, batch_size=200, max_files_per_second=500,
+                 min_age_seconds=3600, remove_file=os.remove, report_limit=1000):
+        self.database = database
+        self.upload_folder = upload_folder
+        self.batch_size = batch_size
+        self.max_files_per_second = max_files_per_second
+        # Fresh files may belong to an upload whose database row isn't committed yet
+        self.min_age_seconds = min_age_seconds
+        self.remove_file = remove_file
+        self.report_limit = report_limit
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._orphans = []  # sample of orphaned paths found by the current run
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database)
+        ensure_schema(conn.cursor())
+        conn.commit()
+        return conn
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, dry_run=False, restart=False):
+        """Start (or resume) a run in a background thread; False if one is already running"""
+        with self._lock:
+            if self.is_running():
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, args=(dry_run, restart),
+                                            name='photo-gc', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Ask a background run to stop after its current batch"""
+        self._stop.set()
+
+    def status(self):
+        conn = self._connect()
+        try:
+            state = self._load_state(conn.cursor())
+        finally:
+            conn.close()
+        if state is None:
+            return {'status': 'idle'}
+        state['running'] = self.is_running()
+        state['dry_run'] = bool(state['dry_run'])
+        state['folder'] = GC_FOLDERS[state['folder_index']] if state['folder_index'] < len(GC_FOLDERS) else None
+        state['orphans'] = list(self._orphans)
+        return state
+
+    def _load_state(self, cursor):
+        cursor.execute('SELECT * FROM photo_gc_state WHERE id = 1')
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    def _save_state(self, cursor, state):
+        state['updated_date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        columns = [column for column in state if column != 'id']
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO photo_gc_state (id, {', '.join(columns)})
+            VALUES (1, {', '.join('?' * len(columns))})
+        ''', [state[column] for column in columns])
+
+    def run(self, dry_run=False, restart=False):
+        """Run (or resume) a collection pass in the calling thread; returns the final state"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            state = self._load_state(cursor)
+            if restart or state is None or state['status'] == 'finished' or bool(state['dry_run']) != dry_run:
+                state = {
+                    'status': 'running', 'dry_run': int(dry_run), 'folder_index': 0, 'last_name': '',
+                    'scanned': 0, 'orphaned': 0, 'orphaned_bytes': 0, 'deleted': 0,
+                    'started_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                }
+                self._orphans = []
+            state['status'] = 'running'
+            self._save_state(cursor, state)
+            conn.commit()
+
+            while state['folder_index'] < len(GC_FOLDERS):
+                if not self._collect_folder(cursor, state, dry_run):
+                    state['status'] = 'stopped'
+                    break
+                state['folder_index'] += 1
+                state['last_name'] = ''
+                self._save_state(cursor, state)
+                conn.commit()
+            else:
+                state['status'] = 'finished'
+
+            self._save_state(cursor, state)
+            conn.commit()
+            logger.info('Photo GC %s: scanned %s, orphaned %s, deleted %s%s', state['status'], state['scanned'],
+                        state['orphaned'], state['deleted'], ' (dry run)' if dry_run else '')
+            return state
+        finally:
+            conn.close()
+
+    def _collect_folder(self, cursor, state, dry_run):
+        """Process one folder after the checkpointed filename; False if stopped early"""
+        folder = GC_FOLDERS[state['folder_index']]
+        path = os.path.join(self.upload_folder, folder) if folder else self.upload_folder
+        if not os.path.isdir(path):
+            return True
+
+        # Names already checked by an earlier, interrupted run sort at or before last_name
+        with os.scandir(path) as entries:
+            pending = sorted((entry for entry in entries
+                              if entry.name > state['last_name'] and entry.is_file()
+                              and entry.name.lower().endswith(PHOTO_EXTENSIONS)),
+                             key=lambda entry: entry.name)
+        for start in range(0, len(pending), self.batch_size):
+            if not self._collect_batch(cursor, folder, pending[start:start + self.batch_size], state, dry_run):
+                return False
+        return True
+
+    def _collect_batch(self, cursor, folder, entries, state, dry_run):
+        """Check one batch against the database, delete orphans and checkpoint"""
+        started = time.monotonic()
+        now = time.time()
+        candidates = {}
+        old_entries = []
+        for entry in entries:
+            stat = entry.stat()
+            if now - stat.st_mtime < self.min_age_seconds:
+                continue
+            old_entries.append((entry, stat.st_size))
+            for reference in candidate_references(folder, entry.name):
+                candidates[reference] = entry.name
+
+        referenced = {candidates[reference] for reference in find_referenced(cursor, candidates)}
+
+        deleted_paths = []
+        for entry, size in old_entries:
+            relative_path = f"{folder}/{entry.name}" if folder else entry.name
+            if entry.name in referenced:
+                continue
+            state['orphaned'] += 1
+            state['orphaned_bytes'] += size
+            if len(self._orphans) < self.report_limit:
+                self._orphans.append(relative_path)
+            if dry_run:
+                continue
+            try:
+                self.remove_file(entry.path)
+                deleted_paths.append(relative_path)
+            except OSError as e:
+                logger.warning('Photo GC failed to delete %s: %s', relative_path, e)
+
+        photo_catalog.unregister_photos(cursor, deleted_paths)
+        state['deleted'] += len(deleted_paths)
+        state['scanned'] += len(entries)
+        state['last_name'] = entries[-1].name
+        self._save_state(cursor, state)
+        cursor.connection.commit()
+
+        # Rate limit: spread the work so a large backlog doesn't starve request handling
+        if self.max_files_per_second:
+            remaining = len(entries) / self.max_files_per_second - (time.monotonic() - started)
+            if remaining > 0 and self._stop.wait(remaining):
+                return False
+        return not self._stop.is_set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Delete photo files that nothing in the database references')
+    parser.add_argument('--database', default='inventory.db')
+    parser.add_argument('--uploads', default='uploads')
+    parser.add_argument('--dry-run', action='store_true', help='only report orphaned files')
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint of an unfinished run')
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--rate', type=int, default=0, help='max files checked per second (0 = unlimited)')
+    parser.add_argument('--min-age', type=int, default=3600, help='skip files modified within this many seconds')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if not os.path.exists(args.database):
+        print(f"❌ {args.database} not found. Make sure you're running this from the server directory.")
+        return
+
+    collector = PhotoGarbageCollector(args.database, args.uploads, batch_size=args.batch_size,
+                                      max_files_per_second=args.rate, min_age_seconds=args.min_age)
+    state = collector.run(dry_run=args.dry_run, restart=args.restart)
+    print(f"📊 {state['orphaned']} orphaned photos ({state['orphaned_bytes'] / 1024:.1f}KB)")
+    for path in collector.status()['orphans']:
+        print(f"  {'would delete' if args.dry_run else 'deleted'}: {path}")
+
+
+if __name__ == '__main__':
+    main()
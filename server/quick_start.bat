@@ -19,10 +19,12 @@ echo Python version:
 python --version
 echo.
 
-REM Check if requirements are installed
+REM Check if requirements are installed (older installs have Flask but not waitress)
 echo Checking dependencies...
-pip show flask >nul 2>&1
-if %errorlevel% neq 0 (
+set "NEED_INSTALL="
+pip show flask >nul 2>&1 || set "NEED_INSTALL=1"
+pip show waitress >nul 2>&1 || set "NEED_INSTALL=1"
+if defined NEED_INSTALL (
     echo Installing dependencies...
     pip install -r requirements.txt
     if %errorlevel% neq 0 (
@@ -59,7 +61,7 @@ echo Press Ctrl+C to stop the server
 echo ==========================================
 echo.
 
-REM Start the server
-python app.py
+REM Start the server (waitress; set SERVER_THREADS / SERVER_PORT to tune)
+python serve.py
 
 pause
@@ -0,0 +1,81 @@
+"""
+Read-only queries behind the dashboard's polling endpoints.
+
+Each function takes an open cursor and returns the JSON-ready 'Result'
+payload, so the Flask routes in app.py and the async read path in asgi.py
+serve exactly the same data. Columns are named through the maps in
+records.py.
+"""
+
+import stock_alerts
+from records import PRODUCT, TRANSACTION, RecordMap
+
+PRODUCT_DETAIL = RecordMap('barcode', 'name', 'mrp', 'quantity', 'created_date', 'image_path', 'reorder_threshold')
+TRANSACTION_WITH_NAMES = TRANSACTION.extend('product_name', 'customer_notes')
+RECENT_TRANSACTION = TRANSACTION.extend('product_name')
+
+
+def list_products(cursor):
+    cursor.execute(f'SELECT {PRODUCT.columns()} FROM products ORDER BY created_date DESC')
+    return PRODUCT.records(cursor.fetchall())
+
+
+def get_product(cursor, barcode):
+    """A product by barcode, or None"""
+    cursor.execute(f'''
+        SELECT {PRODUCT_DETAIL.columns()}
+        FROM products
+        WHERE barcode = ?
+    ''', (barcode,))
+    return PRODUCT_DETAIL.record(cursor.fetchone())
+
+
+def list_transactions(cursor, barcode=None):
+    """All transactions, newest first, optionally for one barcode"""
+    where, params = ('WHERE t.barcode = ?', (barcode,)) if barcode else ('', ())
+    cursor.execute(f'''
+        SELECT {TRANSACTION.columns('t')}, p.name as product_name, c.notes as customer_notes
+        FROM transactions t
+        LEFT JOIN products p ON t.barcode = p.barcode
+        LEFT JOIN customers c ON t.recipient_phone = c.phone
+        {where}
+        ORDER BY transaction_date DESC
+    ''', params)
+    return TRANSACTION_WITH_NAMES.records(cursor.fetchall())
+
+
+def list_low_stock(cursor):
+    """Products at or below their reorder threshold (see stock_alerts.py)"""
+    return stock_alerts.low_stock_products(cursor)
+
+
+def get_stats(cursor):
+    """Dashboard counters plus the ten most recent transactions"""
+    cursor.execute('SELECT COUNT(*) FROM products')
+    total_products = cursor.fetchone()[0]
+
+    cursor.execute('SELECT SUM(quantity) FROM products')
+    total_quantity = cursor.fetchone()[0] or 0
+
+    cursor.execute('SELECT COUNT(*) FROM transactions')
+    total_transactions = cursor.fetchone()[0]
+
+    # Low stock items (at or below their reorder threshold; a partial index holds just these)
+    low_stock = stock_alerts.low_stock_count(cursor)
+
+    cursor.execute(f'''
+        SELECT {TRANSACTION.columns('t')}, p.name as product_name
+        FROM transactions t
+        LEFT JOIN products p ON t.barcode = p.barcode
+        ORDER BY transaction_date DESC
+        LIMIT 10
+    ''')
+    transaction_list = RECENT_TRANSACTION.records(cursor.fetchall())
+
+    return {
+        'total_products': total_products,
+        'total_quantity': total_quantity,
+        'total_transactions': total_transactions,
+        'low_stock': low_stock,
+        'recent_transactions': transaction_list
+    }
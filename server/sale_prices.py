@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Prices captured on sale transactions.
+
+Every OUT transaction stores the unit_price it was sold at and its
+line_total (quantity x unit_price), so revenue is a SUM over a column
+instead of parsing the "Multi-item sale - Total: ₹1510.00" text that
+build_transaction_notes() and the apps write into notes. The unit price is
+the one the client charged when it sends one, else the product's MRP at
+the time of the sale. Restocks (IN) carry no price.
+
+Databases from before these columns are backfilled once when init_db()
+adds them. Rows are grouped into sales the way the grouped sales view
+groups them (customer and minute), and:
+
+- when the notes carry a total, it is shared over the sale's items in
+  proportion to their MRP value, so the stored line totals add up to what
+  the customer was charged;
+- otherwise each item is priced at the product's current MRP.
+
+Run this file directly to backfill rows still without a price, e.g. after
+restoring an old backup:
+    python sale_prices.py
+"""
+
+import argparse
+import logging
+import re
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# "₹1510.00" in the first line of the notes; later lines are the user's own notes
+_AMOUNT = re.compile(r'₹\s*([\d,]+(?:\.\d+)?)')
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def ensure_schema(cursor):
+    """Add the price columns to transactions; returns True when they were just added"""
+    cursor.execute('PRAGMA table_info(transactions)')
+    columns = {column[1] for column in cursor.fetchall()}
+    if 'unit_price' in columns and 'line_total' in columns:
+        return False
+    if 'unit_price' not in columns:
+        cursor.execute('ALTER TABLE transactions ADD COLUMN unit_price REAL')
+    if 'line_total' not in columns:
+        cursor.execute('ALTER TABLE transactions ADD COLUMN line_total REAL')
+    return True
+
+
+def parse_notes_total(notes):
+    """The sale total written in transaction notes, or None"""
+    if not notes:
+        return None
+    match = _AMOUNT.search(notes.split('\n', 1)[0])
+    if not match:
+        return None
+    try:
+        return float(match.group(1).replace(',', ''))
+    except ValueError:
+        return None
+
+
+def line_total(quantity, unit_price):
+    if unit_price is None or quantity is None:
+        return None
+    return round(quantity * unit_price, 2)
+
+
+def price_for(cursor, barcode, unit_price=None):
+    """Unit price of a sale: the price the client charged, else the product's MRP (None if unknown)"""
+    if unit_price is not None:
+        return float(unit_price)
+    cursor.execute('SELECT mrp FROM products WHERE barcode = ?', (barcode,))
+    row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else None
+
+
+def _price_sale(items, total):
+    """[(id, unit_price, line_total)] for one sale's (id, quantity, mrp) items"""
+    if total is None or total <= 0:
+        return [(item_id, mrp, line_total(quantity, mrp)) for item_id, quantity, mrp in items]
+    mrp_value = sum((quantity or 0) * (mrp or 0) for _, quantity, mrp in items)
+    if mrp_value > 0:
+        scale = total / mrp_value
+        prices = [(item_id, (mrp or 0) * scale, quantity) for item_id, quantity, mrp in items]
+    else:
+        # No MRPs to weigh by: every unit sold costs the same
+        units = sum(quantity or 0 for _, quantity, _ in items) or 1
+        prices = [(item_id, total / units, quantity) for item_id, quantity, _ in items]
+    # Line totals from the unrounded price, so they add up to the total to within a paisa per item
+    return [(item_id, round(unit_price, 2), line_total(quantity, unit_price)) for item_id, unit_price, quantity in prices]
+
+
+_BACKFILL_COLUMNS = '''
+    SELECT t.id, t.quantity, t.recipient_name, t.recipient_phone, t.transaction_date, t.notes, p.mrp
+    FROM transactions t
+    LEFT JOIN products p ON t.barcode = p.barcode
+    WHERE t.transaction_type = 'OUT' AND t.unit_price IS NULL
+'''
+
+
+def _price_rows(cursor, rows):
+    """Price complete sales from backfill rows; returns (items, sales) priced"""
+    sales = {}
+    for item_id, quantity, name, phone, transaction_date, notes, mrp in rows:
+        # Same grouping as the grouped sales view, plus the notes so each sale keeps its own total
+        key = (name, phone, (transaction_date or '')[:16], (notes or '').split('\n', 1)[0])
+        sales.setdefault(key, []).append((item_id, quantity, mrp))
+    updates = []
+    for key, items in sales.items():
+        updates.extend(_price_sale(items, parse_notes_total(key[3])))
+    cursor.executemany('UPDATE transactions SET unit_price = ?, line_total = ? WHERE id = ?',
+                       [(unit_price, total, item_id) for item_id, unit_price, total in updates])
+    return len(updates), len(sales)
+
+
+def backfill(conn, batch_size=BACKFILL_BATCH_SIZE):
+    """Price every OUT transaction that has no unit_price yet; returns how many were priced
+
+    Walks the sales in (transaction_date, id) order on idx_transactions_type_date,
+    batch_size rows at a time, committing after each batch. A sale is never split
+    over two batches: the rows of a batch's last minute wait for the next one.
+    """
+    cursor = conn.cursor()
+    # Rows without a date only group with each other; there are few, if any
+    cursor.execute(f'{_BACKFILL_COLUMNS} AND t.transaction_date IS NULL')
+    priced, sales = _price_rows(cursor, cursor.fetchall())
+    conn.commit()
+
+    after = ('', 0)
+    while True:
+        cursor.execute(f'''
+            {_BACKFILL_COLUMNS} AND t.transaction_date >= ? AND (t.transaction_date, t.id) > (?, ?)
+            ORDER BY t.transaction_date, t.id
+            LIMIT ?
+        ''', (after[0], *after, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        if len(rows) == batch_size:
+            last_minute = rows[-1][4][:16]
+            complete = [row for row in rows if row[4][:16] < last_minute]
+            if complete:
+                rows = complete
+            else:
+                # The whole batch is one minute: take all of that minute
+                cursor.execute(f'''
+                    {_BACKFILL_COLUMNS} AND t.transaction_date >= ? AND substr(t.transaction_date, 1, 16) = ?
+                    ORDER BY t.transaction_date, t.id
+                ''', (last_minute, last_minute))
+                rows = cursor.fetchall()
+        items, groups = _price_rows(cursor, rows)
+        priced += items
+        sales += groups
+        after = (rows[-1][4], rows[-1][0])
+        conn.commit()
+    logger.info('Backfilled prices on %s sale transactions (%s sales)', priced, sales)
+    return priced
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Store unit prices and line totals on sales without them')
+    parser.add_argument('--database', default='inventory.db')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    try:
+        ensure_schema(conn.cursor())
+        priced = backfill(conn)
+    finally:
+        conn.close()
+    print(f"✅ Priced {priced} sale transactions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Sales analytics for the dashboard charts and the sales summary.
+
+Everything here reads the rollups in sales_rollup.py, never the full
+transactions table. Totals and time series cost one rollup row per day in
+the range, however many sales were recorded, and the all-time best sellers
+are the top rows of a ranked index. Ranked lists over a date range still
+add up one row per product (or customer) per day in it.
+
+transaction_date holds shop-local (IST) time as 'YYYY-MM-DD HH:MM:SS'
+text, the way get_local_timestamp() writes it. Its first ten characters are
+therefore the local date, which is the rollups' `day`. "Today" must come
+from the caller's local clock: SQLite's date('now') is UTC and is a day
+behind before 05:30.
+
+Only OUT transactions are sales. Each sold item is one row, so a multi-item
+sale counts once per item in 'items'.
+"""
+
+from datetime import date, timedelta
+
+BUCKETS = ('day', 'week', 'month')
+GROUPS = ('product', 'customer')
+
+# SQL for the first day of the bucket a rollup day falls in (weeks start on Monday)
+BUCKET_SQL = {
+    'day': "day",
+    'week': "date(day, '-6 days', 'weekday 1')",
+    'month': "substr(day, 1, 7) || '-01'",
+}
+
+MEASURES = ('items', 'units', 'revenue', 'customers')
+IN_RANGE = 'day >= ? AND day <= ?'
+
+# Per group: rollup table, its key column, its (items, units, revenue) sums, the
+# label and its join, and the customer table that holds the key for distinct counts
+GROUP_SOURCES = {
+    'product': {
+        'table': 'sales_daily_product',
+        'key': 'barcode',
+        'items': 'items_out',
+        'sums': 'SUM(r.items_out) AS items, SUM(r.units_out) AS units, SUM(r.revenue) AS revenue',
+        'name': "COALESCE(p.name, 'Unknown Product')",
+        'join': 'LEFT JOIN products p ON p.barcode = r.barcode',
+        'customers': 'sales_daily_customer_product',
+    },
+    'customer': {
+        'table': 'sales_daily_customer',
+        'key': 'phone',
+        'items': 'items',
+        'sums': 'SUM(r.items) AS items, SUM(r.units) AS units, SUM(r.revenue) AS revenue',
+        'name': "COALESCE(c.name, 'Unknown Customer')",
+        'join': 'LEFT JOIN customers c ON c.phone = r.phone',
+        'customers': 'sales_daily_customer',
+    },
+}
+
+
+def ensure_schema(cursor):
+    """Index for reading sales newest first and by date without scanning restocks"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_type_date
+        ON transactions (transaction_type, transaction_date)
+    ''')
+
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_labels(start, end, bucket):
+    """First day of every bucket from start to end (inclusive), as ISO dates"""
+    labels = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        labels.append(current.isoformat())
+        if bucket == 'day':
+            current += timedelta(days=1)
+        elif bucket == 'week':
+            current += timedelta(days=7)
+        else:
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return labels
+
+
+def _series(labels, sums, customers):
+    """{measure: [value per label]} from {label: (items, units, revenue)} and {label: customers}"""
+    empty = (0, 0, 0)
+    series = {
+        measure: [round(sums.get(label, empty)[i] or 0, 2) for label in labels]
+        for i, measure in enumerate(MEASURES[:3])
+    }
+    series['customers'] = [customers.get(label, 0) for label in labels]
+    return series
+
+
+def _bucket_customers(cursor, labels, start, end):
+    """{label: distinct customers} for week or month buckets, one primary key range per bucket"""
+    bounds = [date.fromisoformat(label) for label in labels[1:]] + [end + timedelta(days=1)]
+    customers = {}
+    for label, next_start in zip(labels, bounds):
+        cursor.execute('''
+            SELECT COUNT(DISTINCT phone) FROM sales_daily_customer WHERE day >= ? AND day < ?
+        ''', (max(label, start.isoformat()), next_start.isoformat()))
+        customers[label] = cursor.fetchone()[0]
+    return customers
+
+
+def sales_analytics(cursor, start, end, bucket='day', group=None, limit=5):
+    """
+    Sales from start to end (dates, inclusive) per bucket
+
+    Returns the bucket labels, the totals per bucket, and with group the
+    top `limit` products or customers by units sold with their own series.
+    """
+    labels = bucket_labels(start, end, bucket)
+    params = (start.isoformat(), end.isoformat())
+    bucket_sql = BUCKET_SQL[bucket]
+
+    cursor.execute(f'''
+        SELECT {bucket_sql} AS bucket, SUM(items), SUM(units), SUM(revenue), SUM(customers)
+        FROM sales_daily
+        WHERE {IN_RANGE}
+        GROUP BY bucket
+    ''', params)
+    rows = cursor.fetchall()
+    sums = {row[0]: row[1:4] for row in rows}
+    if bucket == 'day':
+        customers = {row[0]: row[4] for row in rows}
+    else:
+        customers = _bucket_customers(cursor, labels, start, end)
+    result = {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'bucket': bucket,
+        'labels': labels,
+        'totals': _series(labels, sums, customers),
+    }
+    if not group:
+        return result
+
+    source = GROUP_SOURCES[group]
+    key = source['key']
+    # Names are joined to the top rows only, not to every product or customer in the range
+    cursor.execute(f'''
+        SELECT r.{key}, {source['name']}, r.items, r.units, r.revenue
+        FROM (
+            SELECT r.{key}, {source['sums']}
+            FROM {source['table']} r
+            WHERE r.{IN_RANGE}
+            GROUP BY r.{key}
+            HAVING SUM(r.{source['items']}) > 0
+            ORDER BY 3 DESC, 4 DESC, 1
+            LIMIT ?
+        ) r
+        {source['join']}
+        ORDER BY 4 DESC, 5 DESC, 1
+    ''', params + (limit,))
+    top = cursor.fetchall()
+
+    series = []
+    if top:
+        keys = tuple(row[0] for row in top)
+        in_keys = f"{key} IN ({', '.join('?' * len(keys))})"
+        cursor.execute(f'''
+            SELECT r.{key}, {bucket_sql} AS bucket, {source['sums']}
+            FROM {source['table']} r
+            WHERE r.{IN_RANGE} AND r.{in_keys}
+            GROUP BY r.{key}, bucket
+        ''', params + keys)
+        sums_by_key = {}
+        for row in cursor.fetchall():
+            sums_by_key.setdefault(row[0], {})[row[1]] = row[2:]
+        cursor.execute(f'''
+            SELECT {key}, {bucket_sql} AS bucket, COUNT(DISTINCT phone)
+            FROM {source['customers']}
+            WHERE {IN_RANGE} AND {in_keys}
+            GROUP BY {key}, bucket
+        ''', params + keys)
+        customers_by_key = {}
+        for row_key, label, customers in cursor.fetchall():
+            customers_by_key.setdefault(row_key, {})[label] = customers
+        cursor.execute(f'''
+            SELECT {key}, COUNT(DISTINCT phone)
+            FROM {source['customers']}
+            WHERE {IN_RANGE} AND {in_keys}
+            GROUP BY {key}
+        ''', params + keys)
+        total_customers = dict(cursor.fetchall())
+        for row_key, name, items, units, revenue in top:
+            series.append({
+                'key': row_key,
+                'name': name,
+                'total': {'items': items, 'units': units, 'revenue': round(revenue, 2),
+                          'customers': total_customers.get(row_key, 0)},
+                'series': _series(labels, sums_by_key.get(row_key, {}), customers_by_key.get(row_key, {})),
+            })
+    result['group'] = group
+    result['series'] = series
+    return result
+
+
+def day_summary(cursor, day):
+    """(items sold, units sold, distinct customers) on one local date"""
+    cursor.execute('SELECT items, units, customers FROM sales_daily WHERE day = ?', (day.isoformat(),))
+    return cursor.fetchone() or (0, 0, 0)
+
+
+def top_products(cursor, limit=5):
+    """[(barcode, name, units sold)] best sellers over all history, from the running totals"""
+    cursor.execute('''
+        SELECT r.barcode, p.name, r.units_out
+        FROM (
+            SELECT barcode, units_out
+            FROM sales_product_totals
+            ORDER BY units_out DESC
+            LIMIT ?
+        ) r
+        LEFT JOIN products p ON p.barcode = r.barcode
+        ORDER BY r.units_out DESC
+    ''', (limit,))
+    return cursor.fetchall()
+
+
+def parse_date(value, default):
+    """A YYYY-MM-DD query parameter as a date; raises ValueError when malformed"""
+    return date.fromisoformat(value) if value else default
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Daily rollups of sales and stock movement.
+
+Revenue and top-seller questions read these small tables instead of
+scanning all of `transactions`, so their cost grows with the number of
+days and products, not with the number of transactions ever recorded:
+
+    sales_daily                   day: items, units, revenue, customers
+    sales_daily_product           day, barcode: units_in, units_out,
+                                  items_out (OUT rows), revenue
+    sales_daily_customer          day, phone: items, units, revenue
+    sales_daily_customer_product  barcode, day, phone: items
+    sales_product_totals          barcode: units_out, items_out over all
+                                  time, indexed by units_out for the
+                                  best sellers
+
+The two customer tables hold one row per customer who bought that day, so
+distinct customers over any range are a COUNT(DISTINCT phone) over them;
+sales_daily.customers is that count for the single day. The product and
+customer rollups are also indexed key first, covering the sums, for one
+product's or customer's series and for totals over all time. Sales without a
+phone count towards items, units and revenue only, as
+COUNT(DISTINCT recipient_phone) ignores them too.
+
+Triggers on `transactions` keep the rollups in step with every write path
+(sales, restocks, edits, deletes and customer renames), inside the same
+transaction as the write. An update is applied as "remove the old row, add
+the new one". `day` is the local date: the first ten characters of
+transaction_date (see sales_analytics.py).
+
+Rebuild them from the transactions, e.g. after editing the database by
+hand, from the server directory:
+    python sales_rollup.py --rebuild
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLES = ('sales_daily', 'sales_daily_product', 'sales_daily_customer', 'sales_daily_customer_product',
+                 'sales_product_totals')
+ROLLUP_TRIGGERS = ('sales_rollup_insert', 'sales_rollup_delete', 'sales_rollup_update')
+
+# Columns of transactions the rollups depend on; updates of any other column skip the triggers
+TRACKED_COLUMNS = ('barcode', 'transaction_type', 'quantity', 'recipient_phone', 'transaction_date', 'line_total')
+
+PRODUCT_TOTALS_SQL = '''
+    INSERT INTO sales_product_totals (barcode, units_out, items_out)
+    SELECT barcode, SUM(quantity), COUNT(*)
+    FROM transactions
+    WHERE transaction_type = 'OUT'
+    GROUP BY barcode
+'''
+
+
+def _apply(row, sign):
+    """Statements adding (sign '+') or removing (sign '-') one transaction row (NEW or OLD) to the rollups"""
+    day = f"substr(COALESCE({row}.transaction_date, ''), 1, 10)"
+    is_out = f"{row}.transaction_type = 'OUT'"
+    phone_known = f"{is_out} AND {row}.recipient_phone IS NOT NULL"
+    # sales_daily.customers counts a customer's first sale of the day in and their last one out
+    if sign == '+':
+        first_or_last_sale = f"NOT EXISTS (SELECT 1 FROM sales_daily_customer WHERE day = {day} AND phone = {row}.recipient_phone)"
+    else:
+        first_or_last_sale = (f"EXISTS (SELECT 1 FROM sales_daily_customer WHERE day = {day} AND phone = {row}.recipient_phone "
+                        f"AND items <= 1)")
+    return f'''
+        INSERT INTO sales_daily (day, items, units, revenue)
+        SELECT {day}, {sign}1, {sign}{row}.quantity, {sign}COALESCE({row}.line_total, 0)
+        WHERE {is_out}
+        ON CONFLICT (day) DO UPDATE SET
+            items = items + excluded.items,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue;
+
+        INSERT INTO sales_daily_product (day, barcode, units_in, units_out, items_out, revenue)
+        VALUES ({day}, {row}.barcode,
+                {sign}CASE WHEN {row}.transaction_type = 'IN' THEN {row}.quantity ELSE 0 END,
+                {sign}CASE WHEN {is_out} THEN {row}.quantity ELSE 0 END,
+                {sign}CASE WHEN {is_out} THEN 1 ELSE 0 END,
+                {sign}CASE WHEN {is_out} THEN COALESCE({row}.line_total, 0) ELSE 0 END)
+        ON CONFLICT (day, barcode) DO UPDATE SET
+            units_in = units_in + excluded.units_in,
+            units_out = units_out + excluded.units_out,
+            items_out = items_out + excluded.items_out,
+            revenue = revenue + excluded.revenue;
+        DELETE FROM sales_daily_product
+        WHERE day = {day} AND barcode = {row}.barcode AND units_in = 0 AND units_out = 0 AND items_out = 0;
+
+        INSERT INTO sales_product_totals (barcode, units_out, items_out)
+        SELECT {row}.barcode, {sign}{row}.quantity, {sign}1
+        WHERE {is_out}
+        ON CONFLICT (barcode) DO UPDATE SET
+            units_out = units_out + excluded.units_out,
+            items_out = items_out + excluded.items_out;
+        DELETE FROM sales_product_totals WHERE {is_out} AND barcode = {row}.barcode AND items_out <= 0;
+
+        UPDATE sales_daily SET customers = customers {sign} 1
+        WHERE {phone_known} AND day = {day} AND {first_or_last_sale};
+        INSERT INTO sales_daily_customer (day, phone, items, units, revenue)
+        SELECT {day}, {row}.recipient_phone, {sign}1, {sign}{row}.quantity, {sign}COALESCE({row}.line_total, 0)
+        WHERE {phone_known}
+        ON CONFLICT (day, phone) DO UPDATE SET
+            items = items + excluded.items,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue;
+        DELETE FROM sales_daily_customer
+        WHERE {phone_known} AND day = {day} AND phone = {row}.recipient_phone AND items <= 0;
+        DELETE FROM sales_daily WHERE {is_out} AND day = {day} AND items <= 0;
+
+        INSERT INTO sales_daily_customer_product (barcode, day, phone, items)
+        SELECT {row}.barcode, {day}, {row}.recipient_phone, {sign}1
+        WHERE {phone_known}
+        ON CONFLICT (barcode, day, phone) DO UPDATE SET items = items + excluded.items;
+        DELETE FROM sales_daily_customer_product
+        WHERE {phone_known} AND barcode = {row}.barcode AND day = {day} AND phone = {row}.recipient_phone
+        AND items <= 0;
+    '''
+
+
+def ensure_schema(cursor):
+    """Create the rollup tables and triggers; returns True when the tables were just created"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('sales_daily', 'sales_product_totals')")
+    existing = {row[0] for row in cursor.fetchall()}
+    is_new = 'sales_daily' not in existing
+    add_totals = not is_new and 'sales_product_totals' not in existing
+    if add_totals:
+        # Rollups from before the running totals: their triggers don't maintain them yet
+        for trigger in ROLLUP_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    cursor.executescript(f'''
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            day TEXT PRIMARY KEY,
+            items INTEGER NOT NULL DEFAULT 0,
+            units INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            customers INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS sales_daily_product (
+            day TEXT NOT NULL,
+            barcode TEXT NOT NULL,
+            units_in INTEGER NOT NULL DEFAULT 0,
+            units_out INTEGER NOT NULL DEFAULT 0,
+            items_out INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, barcode)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_sales_daily_product_barcode
+        ON sales_daily_product (barcode, day, items_out, units_out, revenue);
+        CREATE TABLE IF NOT EXISTS sales_daily_customer (
+            day TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            items INTEGER NOT NULL DEFAULT 0,
+            units INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, phone)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_sales_daily_customer_phone
+        ON sales_daily_customer (phone, day, items, units, revenue);
+        CREATE TABLE IF NOT EXISTS sales_daily_customer_product (
+            barcode TEXT NOT NULL,
+            day TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            items INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (barcode, day, phone)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS sales_product_totals (
+            barcode TEXT PRIMARY KEY,
+            units_out INTEGER NOT NULL DEFAULT 0,
+            items_out INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_sales_product_totals_units ON sales_product_totals (units_out);
+
+        CREATE TRIGGER IF NOT EXISTS sales_rollup_insert AFTER INSERT ON transactions
+        BEGIN {_apply('NEW', '+')} END;
+        CREATE TRIGGER IF NOT EXISTS sales_rollup_delete AFTER DELETE ON transactions
+        BEGIN {_apply('OLD', '-')} END;
+        CREATE TRIGGER IF NOT EXISTS sales_rollup_update AFTER UPDATE OF {', '.join(TRACKED_COLUMNS)} ON transactions
+        BEGIN {_apply('OLD', '-')} {_apply('NEW', '+')} END;
+    ''')
+    if add_totals:
+        cursor.execute(PRODUCT_TOTALS_SQL)
+    return is_new
+
+
+def rebuild(conn):
+    """Recompute every rollup from the transactions table; returns seconds taken"""
+    started = time.perf_counter()
+    with conn:
+        for table in ROLLUP_TABLES:
+            conn.execute(f'DELETE FROM {table}')
+        conn.execute('''
+            INSERT INTO sales_daily (day, items, units, revenue, customers)
+            SELECT substr(COALESCE(transaction_date, ''), 1, 10) AS day,
+                   COUNT(*), SUM(quantity), SUM(COALESCE(line_total, 0)), COUNT(DISTINCT recipient_phone)
+            FROM transactions
+            WHERE transaction_type = 'OUT'
+            GROUP BY day
+        ''')
+        conn.execute('''
+            INSERT INTO sales_daily_product (day, barcode, units_in, units_out, items_out, revenue)
+            SELECT substr(COALESCE(transaction_date, ''), 1, 10) AS day, barcode,
+                   SUM(CASE WHEN transaction_type = 'IN' THEN quantity ELSE 0 END),
+                   SUM(CASE WHEN transaction_type = 'OUT' THEN quantity ELSE 0 END),
+                   SUM(transaction_type = 'OUT'),
+                   SUM(CASE WHEN transaction_type = 'OUT' THEN COALESCE(line_total, 0) ELSE 0 END)
+            FROM transactions
+            GROUP BY day, barcode
+        ''')
+        conn.execute('''
+            INSERT INTO sales_daily_customer (day, phone, items, units, revenue)
+            SELECT substr(COALESCE(transaction_date, ''), 1, 10) AS day, recipient_phone,
+                   COUNT(*), SUM(quantity), SUM(COALESCE(line_total, 0))
+            FROM transactions
+            WHERE transaction_type = 'OUT' AND recipient_phone IS NOT NULL
+            GROUP BY day, recipient_phone
+        ''')
+        conn.execute('''
+            INSERT INTO sales_daily_customer_product (barcode, day, phone, items)
+            SELECT barcode, substr(COALESCE(transaction_date, ''), 1, 10) AS day, recipient_phone, COUNT(*)
+            FROM transactions
+            WHERE transaction_type = 'OUT' AND recipient_phone IS NOT NULL
+            GROUP BY day, barcode, recipient_phone
+        ''')
+        conn.execute(PRODUCT_TOTALS_SQL)
+    seconds = time.perf_counter() - started
+    logger.info('Rebuilt the daily sales rollups in %.1fs', seconds)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Daily sales rollups')
+    parser.add_argument('--database', default='inventory.db')
+    parser.add_argument('--rebuild', action='store_true', help='recompute the rollups from all transactions')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    try:
+        created = ensure_schema(conn.cursor())
+        if args.rebuild or created:
+            print(f"✅ Rebuilt the daily sales rollups in {rebuild(conn):.1f}s")
+        for table in ROLLUP_TABLES:
+            print(f"   {table}: {conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]} rows")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
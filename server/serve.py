@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Production entry point for the inventory server.
+
+`python app.py` runs Werkzeug's development server: an unbounded thread
+per request, no listen backlog tuning and, with FLASK_DEBUG=1, the
+reloader and the interactive debugger. This runs the same app under a
+production WSGI server:
+
+- waitress (default, pure Python, works on Windows): one process with a
+  pool of --threads request threads. SIGTERM/Ctrl+C stop accepting,
+  finish the requests in flight and exit. On Linux/macOS, SIGHUP reloads
+  gracefully: in-flight requests finish, the process re-executes itself
+  with fresh code and keeps the listening socket, so clients queue in the
+  --backlog instead of being refused.
+- gunicorn (Linux/macOS, `pip install gunicorn`): --workers processes with
+  --threads each; `kill -HUP <master pid>` reloads the workers gracefully.
+- uvicorn (`pip install uvicorn`): the ASGI app from asgi.py, which answers
+  the dashboard's polling reads asynchronously and passes everything else
+  to Flask on --threads threads. With --workers > 1, SIGHUP restarts the
+  workers.
+
+The dashboard's /api/events change stream is a long request (up to
+EVENT_STREAM_SECONDS). Under waitress and gunicorn each open stream holds
+one request thread, so a process lets at most a quarter of its --threads
+stream (2 of the default 8; 1 per worker with --threads 4); the other
+dashboards fall back to polling every 15 seconds. Raise --threads for more
+live dashboards, at a few MB of memory per thread. Under uvicorn streams
+hold no thread and are not limited.
+
+Run it from the server directory:
+    python serve.py
+    python serve.py --threads 16 --backlog 2048
+    python serve.py --server gunicorn --workers 4 --threads 4
+    python serve.py --server uvicorn
+
+Every option can also be set through the environment (SERVER_PORT,
+SERVER_THREADS, SERVER_WORKERS, SERVER_BACKLOG, ...) for the .bat scripts.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+LISTEN_FD_ENV = 'SERVE_LISTEN_FD'  # Set for the re-executed process after a reload
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def load_app():
+    """Import the Flask app; kept out of module scope so gunicorn workers import it themselves"""
+    from app import create_app
+    return create_app()
+
+
+def listening_socket(host, port, backlog):
+    """The socket inherited from before a reload, or a freshly bound one"""
+    inherited = os.environ.pop(LISTEN_FD_ENV, None)
+    if inherited:
+        return socket.socket(fileno=int(inherited)), True
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if os.name != 'nt':
+        # On Windows SO_REUSEADDR would let a second server steal the port
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock, False
+
+
+def drain(server, timeout):
+    """Stop accepting connections and keep serving until in-flight requests are answered"""
+    server.accepting = False  # New connections wait in the listen backlog
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        busy = [channel for channel in list(server.active_channels.values())
+                if channel.requests or channel.total_outbufs_len]
+        if not busy:
+            return True
+        server.asyncore.loop(timeout=0.1, map=server._map, count=1)
+    return False
+
+
+def run_waitress(args):
+    try:
+        from waitress import create_server
+    except ImportError:
+        print("❌ waitress is not installed. Run: pip install -r requirements.txt")
+        sys.exit(1)
+
+    sock, reloaded = listening_socket(args.host, args.port, args.backlog)
+    application = load_app()
+    if not reloaded:
+        from app import print_startup_banner
+        print_startup_banner(args.port)
+    server = create_server(
+        application,
+        sockets=[sock],
+        threads=args.threads,
+        backlog=args.backlog,
+        connection_limit=args.connection_limit,
+        channel_timeout=args.channel_timeout,
+        ident='inventory-server',
+    )
+
+    requested = []
+
+    def on_signal(signum, frame):
+        requested.append('reload' if signum == getattr(signal, 'SIGHUP', None) else 'stop')
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, on_signal)
+
+    print(f"✅ waitress listening on {args.host}:{args.port} "
+          f"({args.threads} threads, backlog {args.backlog}, pid {os.getpid()})")
+    while not requested:
+        server.asyncore.loop(timeout=1, map=server._map, use_poll=True, count=1)
+
+    action = requested[0]
+    print(f"🔄 {'Reloading' if action == 'reload' else 'Stopping'}: finishing requests in flight...")
+    if not drain(server, args.graceful_timeout):
+        print(f"⚠️  Requests still running after {args.graceful_timeout}s, closing anyway")
+    server.task_dispatcher.shutdown(cancel_pending=False, timeout=args.graceful_timeout)
+
+    if action == 'reload':
+        # The new process picks up the same listening socket, so nothing is refused
+        os.set_inheritable(sock.fileno(), True)
+        os.environ[LISTEN_FD_ENV] = str(sock.fileno())
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+    sock.close()
+    print("👋 Server stopped")
+
+
+def run_gunicorn(args):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ gunicorn is not installed (Linux/macOS only). Run: pip install gunicorn")
+        sys.exit(1)
+
+    class InventoryApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                'bind': f"{args.host}:{args.port}",
+                'workers': args.workers,
+                'threads': args.threads,
+                'worker_class': 'gthread',
+                'backlog': args.backlog,
+                'worker_connections': args.connection_limit,
+                'keepalive': 5,
+                'timeout': args.channel_timeout,
+                'graceful_timeout': args.graceful_timeout,
+                'proc_name': 'inventory-server',
+                # create_app() starts background threads, so each worker
+                # must create the app after the fork rather than inherit it
+                'preload_app': False,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    InventoryApplication().run()
+
+
+def run_uvicorn(args):
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ uvicorn is not installed. Run: pip install uvicorn")
+        sys.exit(1)
+
+    uvicorn.run(
+        'asgi:create_asgi_app',
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        backlog=args.backlog,
+        limit_concurrency=args.connection_limit,
+        timeout_keep_alive=5,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level='warning',
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the inventory server under a production WSGI server')
+    parser.add_argument('--server', choices=('waitress', 'gunicorn', 'uvicorn'),
+                        default=os.environ.get('SERVER_BACKEND', 'waitress'))
+    parser.add_argument('--host', default=os.environ.get('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=env_int('SERVER_PORT', 8080))
+    parser.add_argument('--threads', type=int, default=env_int('SERVER_THREADS', 8),
+                        help='request threads (per worker for gunicorn)')
+    parser.add_argument('--workers', type=int, default=env_int('SERVER_WORKERS', 1),
+                        help='worker processes (gunicorn and uvicorn)')
+    parser.add_argument('--backlog', type=int, default=env_int('SERVER_BACKLOG', 1024),
+                        help='connections the OS queues while all threads are busy')
+    parser.add_argument('--connection-limit', type=int, default=env_int('SERVER_CONNECTION_LIMIT', 200),
+                        help='open connections before new ones wait in the backlog')
+    parser.add_argument('--channel-timeout', type=int, default=env_int('SERVER_CHANNEL_TIMEOUT', 120),
+                        help='seconds before an idle or stuck connection is closed')
+    parser.add_argument('--graceful-timeout', type=int, default=env_int('SERVER_GRACEFUL_TIMEOUT', 30),
+                        help='seconds to let requests in flight finish on stop or reload')
+    args = parser.parse_args()
+
+    if args.server == 'waitress' and args.workers != 1:
+        parser.error('waitress runs a single process; raise --threads, or use --server gunicorn for --workers')
+
+    os.environ['SERVER_PORT'] = str(args.port)  # The app reports it to discovery probes
+    # Sizes the event stream limit (and the Flask thread pool inside asgi.py)
+    os.environ['SERVER_THREADS'] = str(args.threads)
+    if args.server == 'gunicorn':
+        run_gunicorn(args)
+    elif args.server == 'uvicorn':
+        run_uvicorn(args)
+    else:
+        run_waitress(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,4 +16,9 @@ echo.
 echo Press Ctrl+C to stop the server
 echo.
 
-python app.py 
\ No newline at end of file
+REM Installs set up before serve.py existed lack waitress
+pip show waitress >nul 2>&1 || pip install -r requirements.txt
+
+REM Production server (waitress); set SERVER_THREADS / SERVER_PORT to tune
+REM Use "python app.py" only for development
+python serve.py 
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Reorder thresholds and the low-stock change feed.
+
+Every product has a reorder_threshold (5 unless set otherwise, the old
+fixed limit); it is low on stock while quantity <= reorder_threshold. A
+partial index holds only those products, so counting or listing them reads
+the short watch list instead of the whole catalogue.
+
+A trigger on products appends to stock_events whenever a product crosses
+its threshold, whichever write path changed the quantity (a sale, a
+restock, an edited or deleted transaction, a manual stock edit) or the
+threshold itself:
+
+    event 'low'        quantity fell to the threshold or below
+    event 'restocked'  quantity rose above it again
+
+Clients keep the id of the last event they saw and ask for the ones after
+it (GET /api/stock-events?since=<id>) instead of polling the catalogue.
+Only the latest STOCK_EVENTS_KEPT events are kept. created_date is UTC, as
+for products.
+"""
+
+from records import RecordMap
+
+DEFAULT_REORDER_THRESHOLD = 5
+STOCK_EVENTS_KEPT = 1000
+
+LOW_STOCK = 'quantity <= reorder_threshold'  # Must match the partial index's WHERE to use it
+
+LOW_STOCK_PRODUCT = RecordMap('barcode', 'name', 'quantity', 'reorder_threshold', 'image_path')
+STOCK_EVENT = RecordMap('id', 'barcode', 'event', 'quantity', 'reorder_threshold', 'created_date')
+
+
+def ensure_schema(cursor):
+    """Threshold column, the low-stock partial index, and the stock_events feed"""
+    cursor.execute('PRAGMA table_info(products)')
+    if 'reorder_threshold' not in {column[1] for column in cursor.fetchall()}:
+        cursor.execute(f'''
+            ALTER TABLE products
+            ADD COLUMN reorder_threshold INTEGER NOT NULL DEFAULT {DEFAULT_REORDER_THRESHOLD}
+        ''')
+    cursor.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_products_low_stock
+        ON products (quantity) WHERE {LOW_STOCK}
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            barcode TEXT NOT NULL,
+            event TEXT NOT NULL,
+            quantity INTEGER,
+            reorder_threshold INTEGER,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stock_alert_crossing
+        AFTER UPDATE OF quantity, reorder_threshold ON products
+        WHEN (OLD.quantity <= OLD.reorder_threshold) IS NOT (NEW.quantity <= NEW.reorder_threshold)
+        BEGIN
+            INSERT INTO stock_events (barcode, event, quantity, reorder_threshold)
+            VALUES (NEW.barcode,
+                    CASE WHEN NEW.quantity <= NEW.reorder_threshold THEN 'low' ELSE 'restocked' END,
+                    NEW.quantity, NEW.reorder_threshold);
+            DELETE FROM stock_events WHERE id <= (SELECT MAX(id) FROM stock_events) - {STOCK_EVENTS_KEPT};
+        END
+    ''')
+
+
+def is_valid_threshold(value):
+    """True for a reorder threshold the column and the low-stock index can hold: an int >= 0"""
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def low_stock_count(cursor):
+    cursor.execute(f'SELECT COUNT(*) FROM products WHERE {LOW_STOCK}')
+    return cursor.fetchone()[0]
+
+
+def low_stock_products(cursor):
+    """Products at or below their reorder threshold, emptiest first"""
+    cursor.execute(f'''
+        SELECT {LOW_STOCK_PRODUCT.columns()}
+        FROM products
+        WHERE {LOW_STOCK}
+        ORDER BY quantity, name
+    ''')
+    return LOW_STOCK_PRODUCT.records(cursor.fetchall())
+
+
+def events_since(cursor, since=0, limit=100):
+    """Up to `limit` stock events after event id `since`, oldest first"""
+    cursor.execute(f'''
+        SELECT {STOCK_EVENT.columns()}
+        FROM stock_events
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (since, limit))
+    return STOCK_EVENT.records(cursor.fetchall())
+
+
+def last_event_id(cursor):
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM stock_events')
+    return cursor.fetchone()[0]
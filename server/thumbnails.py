@@ -0,0 +1,154 @@
+"""
+On-demand thumbnail cache for uploaded photos.
+
+Derivatives are generated the first time a width is requested, written to a
+size-bounded cache directory and served straight from disk afterwards. The
+least recently used derivatives are evicted once the cache grows past its limit.
+"""
+
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from image_processing import load_pillow
+
+logger = logging.getLogger(__name__)
+
+# Requested widths are snapped to one of these so clients cannot fill the
+# cache with one derivative per pixel width.
+THUMBNAIL_WIDTHS = (80, 160, 320, 640)
+
+THUMBNAIL_FORMATS = {
+    'jpeg': ('JPEG', '.jpg', 'image/jpeg'),
+    'webp': ('WEBP', '.webp', 'image/webp'),
+}
+
+
+def snap_width(width):
+    """Round a requested width up to the nearest supported thumbnail width"""
+    for allowed in THUMBNAIL_WIDTHS:
+        if width <= allowed:
+            return allowed
+    return THUMBNAIL_WIDTHS[-1]
+
+
+class ThumbnailCache:
+    """Size-bounded LRU cache of resized copies of uploaded photos"""
+
+    def __init__(self, cache_dir, max_bytes, quality=75):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # cache path -> size in bytes, oldest first
+        self._total_bytes = 0
+        self._load_existing()
+
+    def _load_existing(self):
+        """Index derivatives left over from a previous run, oldest first"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        found = []
+        for width_entry in os.scandir(self.cache_dir):
+            if not width_entry.is_dir():
+                continue
+            for entry in os.scandir(width_entry.path):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._total_bytes += size
+
+    def cache_path(self, relative_path, width, fmt):
+        """Location of the derivative for an uploads-relative source path"""
+        extension = THUMBNAIL_FORMATS[fmt][1]
+        # The source extension stays in the name: x.jpg and x.webp are different photos
+        name = relative_path.replace('\\', '/').replace('/', '__')
+        return os.path.join(self.cache_dir, str(width), name + extension)
+
+    def get(self, source_path, relative_path, width, fmt='jpeg'):
+        """
+        Return the path of a derivative of source_path, generating it if needed
+
+        Args:
+            source_path: Full path of the original photo
+            relative_path: Path of the photo relative to the uploads folder
+            width: Maximum width of the derivative (already snapped)
+            fmt: 'jpeg' or 'webp'
+
+        Returns:
+            Path of the cached derivative, or None if it could not be generated
+        """
+        path = self.cache_path(relative_path, width, fmt)
+
+        with self._lock:
+            if path in self._entries:
+                try:
+                    if os.path.getmtime(path) >= os.path.getmtime(source_path):
+                        self._entries.move_to_end(path)
+                        return path
+                except OSError:
+                    pass
+                # Source replaced or derivative removed behind our back
+                self._total_bytes -= self._entries.pop(path)
+
+        data = self._render(source_path, width, fmt)
+        if data is None:
+            return None
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if path in self._entries:
+                self._total_bytes -= self._entries.pop(path)
+            self._entries[path] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+        return path
+
+    def _render(self, source_path, width, fmt):
+        """Resize the source photo and encode it in the requested format"""
+        if not load_pillow():
+            return None
+        from PIL import Image, ImageOps
+        pil_format = THUMBNAIL_FORMATS[fmt][0]
+        try:
+            with Image.open(source_path) as img:
+                img.draft('RGB', (width, width))  # Let the JPEG decoder downscale for us
+                img = ImageOps.exif_transpose(img)
+                if img.mode not in ('RGB', 'L'):
+                    img = img.convert('RGB')
+                img.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+                output = io.BytesIO()
+                if pil_format == 'JPEG':
+                    img.save(output, format='JPEG', quality=self.quality, optimize=True, progressive=True)
+                else:
+                    img.save(output, format='WEBP', quality=self.quality, method=4)
+                return output.getvalue()
+        except Exception as e:
+            logger.warning('Failed to create %spx thumbnail for %s: %s', width, source_path, e)
+            return None
+
+    def _evict(self):
+        """Drop least recently used derivatives until under the size limit (lock held)"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,174 @@
+"""
+In-process index of the upload folders.
+
+The index is built once with os.scandir and then kept current by the server's
+own writes and deletes (add/remove). External changes, such as files copied
+in by hand or removed by a maintenance script, are picked up by comparing
+directory mtimes, either on demand with refresh() or from a background
+polling thread.
+
+Listing, prefix lookups, counts and sizes are then answered from memory
+instead of hitting the filesystem on every request.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PHOTO_SUBFOLDERS = ('customer_photos', 'product_photos', 'find-photos')
+
+
+class UploadIndex:
+    """Sorted in-memory listing of the files in the uploads folders"""
+
+    def __init__(self, root, subfolders=PHOTO_SUBFOLDERS):
+        self.root = root
+        # '' is the uploads root itself, where older builds saved photos
+        self.folders = ('',) + tuple(subfolders)
+        self._lock = threading.RLock()
+        self._names = {}   # folder -> sorted list of filenames
+        self._sizes = {}   # folder -> {filename: size in bytes}
+        self._totals = {}  # folder -> total bytes
+        self._mtimes = {}  # folder -> directory st_mtime_ns when last scanned
+        self._watcher = None
+
+    def _dir(self, folder):
+        return os.path.join(self.root, folder) if folder else self.root
+
+    def _dir_mtime(self, folder):
+        try:
+            return os.stat(self._dir(folder)).st_mtime_ns
+        except OSError:
+            return None
+
+    def build(self):
+        """Scan every folder from scratch"""
+        for folder in self.folders:
+            self._scan(folder)
+        return self
+
+    def _scan(self, folder):
+        mtime = self._dir_mtime(folder)
+        sizes = {}
+        try:
+            with os.scandir(self._dir(folder)) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        sizes[entry.name] = entry.stat().st_size
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._sizes[folder] = sizes
+            self._names[folder] = sorted(sizes)
+            self._totals[folder] = sum(sizes.values())
+            self._mtimes[folder] = mtime
+
+    def refresh(self):
+        """Rescan folders whose directory mtime changed; returns the folders rescanned"""
+        changed = []
+        for folder in self.folders:
+            if self._dir_mtime(folder) != self._mtimes.get(folder):
+                self._scan(folder)
+                changed.append(folder)
+        return changed
+
+    def start_watching(self, interval):
+        """Poll directory mtimes every interval seconds in a daemon thread"""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning('Upload index refresh failed: %s', e)
+
+        self._watcher = threading.Thread(target=watch, name='upload-index-watcher', daemon=True)
+        self._watcher.start()
+
+    def _locate(self, path):
+        """Split a full or uploads-relative path into (folder, filename)"""
+        if os.path.isabs(path) or path.startswith(self.root + os.sep) or path.startswith(self.root + '/'):
+            path = os.path.relpath(path, self.root)
+        folder, _, name = path.replace('\\', '/').rpartition('/')
+        return folder, name
+
+    def add(self, path):
+        """Record a file the server has just written"""
+        folder, name = self._locate(path)
+        if folder not in self._sizes:
+            return
+        try:
+            size = os.path.getsize(os.path.join(self._dir(folder), name))
+        except OSError:
+            return
+        with self._lock:
+            sizes = self._sizes[folder]
+            if name not in sizes:
+                bisect.insort(self._names[folder], name)
+            self._totals[folder] += size - sizes.get(name, 0)
+            sizes[name] = size
+            # Our own write bumped the directory mtime; don't treat it as external
+            self._mtimes[folder] = self._dir_mtime(folder)
+
+    def remove(self, path):
+        """Forget a file the server has just deleted"""
+        folder, name = self._locate(path)
+        with self._lock:
+            sizes = self._sizes.get(folder)
+            if sizes is None or name not in sizes:
+                return
+            self._totals[folder] -= sizes.pop(name)
+            names = self._names[folder]
+            del names[bisect.bisect_left(names, name)]
+            self._mtimes[folder] = self._dir_mtime(folder)
+
+    def exists(self, relative_path):
+        folder, name = self._locate(relative_path)
+        with self._lock:
+            return name in self._sizes.get(folder, ())
+
+    def size(self, relative_path):
+        """Size in bytes of an indexed file, or None if it is not indexed"""
+        folder, name = self._locate(relative_path)
+        with self._lock:
+            return self._sizes.get(folder, {}).get(name)
+
+    def list(self, folder, prefix='', suffix=None):
+        """Filenames in folder starting with prefix (and ending with suffix), sorted"""
+        with self._lock:
+            names = self._names.get(folder, [])
+            matches = []
+            for i in range(bisect.bisect_left(names, prefix), len(names)):
+                name = names[i]
+                if not name.startswith(prefix):
+                    break
+                if suffix is None or name.endswith(suffix):
+                    matches.append(name)
+            return matches
+
+    def count(self, folder=None):
+        with self._lock:
+            if folder is not None:
+                return len(self._names.get(folder, ()))
+            return sum(len(names) for names in self._names.values())
+
+    def total_size(self, folder=None):
+        with self._lock:
+            if folder is not None:
+                return self._totals.get(folder, 0)
+            return sum(self._totals.values())
+
+    def stats(self):
+        """Per-folder file counts and sizes, keyed by folder name ('' is the uploads root)"""
+        with self._lock:
+            return {
+                folder: {'count': len(self._names.get(folder, ())), 'bytes': self._totals.get(folder, 0)}
+                for folder in self.folders
+            }